@@ -2,6 +2,7 @@ import os
 from fastapi import Request, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt
+from api.utils import ai_usage
 
 
 class RequiredLogin(HTTPBearer):
@@ -22,6 +23,9 @@ class RequiredLogin(HTTPBearer):
                 raise HTTPException(
                     status_code=403, detail="Invalid token or expired token.")
 
+            # Attribute the AI usage of this request to the user
+            ai_usage.set_user_id(payload.get("sub"))
+
             return payload.get("sub")
         else:
             raise HTTPException(
@@ -36,3 +40,21 @@ class RequiredLogin(HTTPBearer):
             payload = None
 
         return payload
+
+
+class RequiredAdmin(RequiredLogin):
+    """
+    Requires a logged in user whose id is listed in the SPELLTRAIN2_ADMIN_IDS environment
+    variable (comma separated).
+    """
+
+    async def __call__(self, request: Request):
+        user_id = await super(RequiredAdmin, self).__call__(request)
+        admin_ids = [admin_id.strip() for admin_id in os.getenv(
+            "SPELLTRAIN2_ADMIN_IDS", "").split(",") if admin_id.strip()]
+
+        if str(user_id) not in admin_ids:
+            raise HTTPException(
+                status_code=403, detail="Admin access required.")
+
+        return user_id
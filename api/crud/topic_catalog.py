@@ -0,0 +1,135 @@
+import os
+import re
+import time
+from typing import Optional
+from rapidfuzz import fuzz, process
+from sqlalchemy.orm import Session
+from api.models import models
+
+# Shared catalog of generated word lists, one per canonical topic. Opt-in.
+TOPIC_CATALOG_ENABLED = os.getenv("SPELLTRAIN2_TOPIC_CATALOG", "False") == "True"
+# Seconds before a catalog entry stops being reused
+TOPIC_CATALOG_MAX_AGE = float(
+    os.getenv("SPELLTRAIN2_TOPIC_CATALOG_MAX_AGE", str(7 * 24 * 3600)))
+# Maximum number of topics kept in the catalog, oldest are dropped first
+TOPIC_CATALOG_SIZE = int(os.getenv("SPELLTRAIN2_TOPIC_CATALOG_SIZE", "1000"))
+# Minimum rapidfuzz ratio for two canonical topics to be considered the same
+TOPIC_CATALOG_MATCH_SCORE = float(
+    os.getenv("SPELLTRAIN2_TOPIC_CATALOG_MATCH_SCORE", "90"))
+
+
+def canonical_topic(topic: str) -> str:
+    """
+    Reduces a topic to its canonical form: lowercase, punctuation and extra whitespace removed,
+    every word singular. "Solar  Systems!" and "solar system" share the canonical topic "solar system".
+    """
+    words = re.sub(r'[^\w\s]', ' ', topic.lower()).split()
+    return ' '.join(_singular(word) for word in words)
+
+
+def _singular(word: str) -> str:
+    if len(word) <= 3 or word.endswith(('ss', 'us', 'is')):
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('ches', 'shes', 'xes', 'sses')):
+        return word[:-2]
+    if word.endswith('s'):
+        return word[:-1]
+    return word
+
+
+def find_word_list(db: Session, topic: str) -> Optional[models.WordList]:
+    """
+    Returns the catalog word list of the topic, matching plural and misspelled variations
+    of the topic, or None if the catalog has no usable entry for it.
+    """
+    _delete_expired_entries(db)
+
+    entries = {entry.topic: entry for entry in db.query(
+        models.TopicCatalogEntry).all()}
+    match = process.extractOne(canonical_topic(topic), list(entries), scorer=fuzz.ratio,
+                               score_cutoff=TOPIC_CATALOG_MATCH_SCORE)
+    if match is None:
+        return None
+
+    entry = entries[match[0]]
+    db_word_list = db.query(models.WordList).filter(
+        models.WordList.id == entry.wordListId).first()
+
+    # Drop entries whose word list was deleted, emptied or renamed to another topic
+    if db_word_list is None or not any(word.isAIGenerated for word in db_word_list.words) or \
+            fuzz.ratio(canonical_topic(db_word_list.title), entry.topic) < TOPIC_CATALOG_MATCH_SCORE:
+        db.delete(entry)
+        db.commit()
+        return None
+
+    return db_word_list
+
+
+def add_word_list(db: Session, topic: str, word_list_id: int):
+    """
+    Makes a generated word list the catalog entry of its canonical topic, dropping the
+    oldest entries once the catalog is full.
+    """
+    canonical = canonical_topic(topic)
+    entry = db.query(models.TopicCatalogEntry).filter(
+        models.TopicCatalogEntry.topic == canonical).first()
+    if entry is None:
+        entry = models.TopicCatalogEntry(topic=canonical)
+        db.add(entry)
+    entry.wordListId = word_list_id
+    entry.createdAt = time.time()
+    db.flush()
+
+    oldest_entries = db.query(models.TopicCatalogEntry).order_by(
+        models.TopicCatalogEntry.createdAt.desc()).offset(max(TOPIC_CATALOG_SIZE, 0)).all()
+    for oldest_entry in oldest_entries:
+        db.delete(oldest_entry)
+    db.commit()
+
+
+def remove_word_list(db: Session, word_list_id: int):
+    """
+    Drops a word list from the catalog, e.g. once its owner edited its words, so that the
+    edits are not copied into other users' word lists. The caller commits.
+    """
+    db.query(models.TopicCatalogEntry).filter(
+        models.TopicCatalogEntry.wordListId == word_list_id).delete()
+
+
+def seed_word_list(db: Session, source: models.WordList, topic: str, user_id: int) -> models.WordList:
+    """
+    Creates a word list for the user by copying the AI generated words of a catalog word list,
+    including their audio files and details, without any AI or text-to-speech call.
+    """
+    db_word_list = models.WordList(title=topic, ownerId=user_id)
+    db.add(db_word_list)
+    db.flush()
+
+    for source_word in source.words:
+        if not source_word.isAIGenerated:
+            continue
+        db_word = models.Word(
+            word=source_word.word,
+            definition=source_word.definition,
+            rootOrigin=source_word.rootOrigin,
+            usage=source_word.usage,
+            languageOrigin=source_word.languageOrigin,
+            partsOfSpeech=source_word.partsOfSpeech,
+            alternatePronunciation=source_word.alternatePronunciation,
+            audioUrl=source_word.audioUrl,
+        )
+        db.add(db_word)
+        db_word_list.words.append(db_word)
+    db.commit()
+    db.refresh(db_word_list)
+
+    return db_word_list
+
+
+def _delete_expired_entries(db: Session):
+    expired = db.query(models.TopicCatalogEntry).filter(
+        models.TopicCatalogEntry.createdAt < time.time() - TOPIC_CATALOG_MAX_AGE).delete()
+    if expired:
+        db.commit()
@@ -2,6 +2,7 @@ from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from api.models import models
 from api.schemas import schemas
+from api.crud.word_lists import unshared_audio_urls
 from api.utils.helpers import delete_audio_file
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -44,10 +45,13 @@ def update_user(db: Session, user_id: str, user: schemas.UserUpdate):
 def delete_user(db: Session, user_id: str):
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     # Extract the audio files from the words
-    for word_list in db_user.wordLists:
-        for word in word_list.words:
-            if word.audioUrl:
-                delete_audio_file(word.audioUrl)
+    audio_urls = [word.audioUrl for word_list in db_user.wordLists
+                  for word in word_list.words]
     db.delete(db_user)
     db.commit()
+
+    # Delete audio files that no other user shares
+    audio_urls = unshared_audio_urls(db, audio_urls)
+    if audio_urls:
+        delete_audio_file(audio_urls)
     return db_user
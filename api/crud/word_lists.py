@@ -1,14 +1,33 @@
-from typing import List
+import asyncio
+import os
+from typing import AsyncIterator, List, Optional, Union
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from api.utils.SpellTrainII_AI import SpellTrain2AI
+from api.utils.SpellTrainII_AI import AsyncSpellTrain2AI
+from api.crud import topic_catalog
 from api.models import models
 from api.schemas import schemas
 from api.utils.helpers import delete_audio_file, get_audio_url, word_dict
+from api.utils.speculation import Speculation
 from thefuzz import fuzz
 
+# Audio files synthesized at the same time while a word list is streamed
+STREAM_AUDIO_CONCURRENCY = int(
+    os.getenv("SPELLTRAIN2_STREAM_AUDIO_CONCURRENCY", "4"))
+# Words missing at most this many details have just those fields requested from the AI,
+# instead of all their details
+SPARSE_ENRICHMENT_MAX_FIELDS = int(
+    os.getenv("SPELLTRAIN2_SPARSE_ENRICHMENT_MAX_FIELDS", "3"))
+
+WORD_INFO_FIELDS = ["definition", "rootOrigin", "usage",
+                    "languageOrigin", "partsOfSpeech", "alternatePronunciation"]
+
+# The fields a game route cannot be played without; the others are filled in the background
+GAME_WORD_FIELDS = ["languageOrigin", "usage", "definition"]
+
 
 def get_all_words(db: Session):
     return db.query(models.Word).all()
@@ -48,11 +67,28 @@ def get_word_list_by_title(db: Session, title: str):
     return None
 
 
-def create_generative_word_list(db: Session, topic: str, user_id: int):
+async def create_generative_word_list(db: Session, topic: str, user_id: int, speculation: Optional[Speculation] = None):
+    """
+    Creates a word list for the topic with the words of the AI, or of the topic catalog.
+
+    Args:
+        speculation (Optional[Speculation]): A get_word_list call already started for the topic.
+    """
+    # Reuse the words another user already generated for the same topic
+    if topic_catalog.TOPIC_CATALOG_ENABLED:
+        catalog_word_list = topic_catalog.find_word_list(db, topic)
+        if catalog_word_list is not None:
+            if speculation is not None:
+                speculation.discard("topicCatalog")
+            return topic_catalog.seed_word_list(db, catalog_word_list, topic, user_id)
+
     try:
         # Try to fetch a list of words from the AI
-        spelltrain2AI = SpellTrain2AI()
-        word_list = spelltrain2AI.get_word_list(topic=topic)
+        if speculation is not None:
+            word_list = await speculation.result()
+        else:
+            spelltrain2AI = AsyncSpellTrain2AI()
+            word_list = await spelltrain2AI.get_word_list(topic=topic)
 
         # Create a new word list
         db_word_list = models.WordList(title=topic, ownerId=user_id)
@@ -63,13 +99,16 @@ def create_generative_word_list(db: Session, topic: str, user_id: int):
         for word in word_list:
             word_to_add = word_dict(word)
             db_word = models.Word(**word_to_add)
-            db_word.audioUrl = get_audio_url(db_word.word)
+            db_word.audioUrl = await run_in_threadpool(get_audio_url, db_word.word)
             db.add(db_word)
             db.flush()
             db_word_list.words.append(db_word)
         db.commit()
         db.refresh(db_word_list)
 
+        if topic_catalog.TOPIC_CATALOG_ENABLED:
+            topic_catalog.add_word_list(db, topic, db_word_list.id)
+
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Integrity Error")
@@ -77,6 +116,85 @@ def create_generative_word_list(db: Session, topic: str, user_id: int):
     return db_word_list
 
 
+async def stream_generative_word_list(db: Session, topic: str, user_id: int) -> AsyncIterator[Union[models.WordList, models.Word]]:
+    """
+    Generates a word list like create_generative_word_list, but persists and yields each word
+    as soon as the AI has written it and its audio is ready.
+
+    The word list is yielded first, without words, then every word in the order of difficulty.
+    Audio for the next words is synthesized while the AI is still writing the list.
+
+    Raises:
+        HTTPException: If the word list cannot be generated or saved. A word list that did not
+            get any word is deleted again.
+    """
+    # Reuse the words another user already generated for the same topic
+    if topic_catalog.TOPIC_CATALOG_ENABLED:
+        catalog_word_list = topic_catalog.find_word_list(db, topic)
+        if catalog_word_list is not None:
+            db_word_list = topic_catalog.seed_word_list(
+                db, catalog_word_list, topic, user_id)
+            yield db_word_list
+            for db_word in db_word_list.words:
+                yield db_word
+            return
+
+    # Commit the word list up front so that every word can be committed as soon as it is ready
+    db_word_list = models.WordList(title=topic, ownerId=user_id)
+    db.add(db_word_list)
+    db.commit()
+    db.refresh(db_word_list)
+    yield db_word_list
+
+    audio_slots = asyncio.Semaphore(STREAM_AUDIO_CONCURRENCY)
+    pending = asyncio.Queue()
+
+    async def synthesize(word: str) -> str:
+        async with audio_slots:
+            return await run_in_threadpool(get_audio_url, word)
+
+    async def read_words():
+        try:
+            async for word in AsyncSpellTrain2AI().stream_word_list(topic=topic):
+                pending.put_nowait((word, asyncio.create_task(synthesize(word))))
+        finally:
+            pending.put_nowait(None)
+
+    reader = asyncio.create_task(read_words())
+    added = 0
+    completed = False
+    try:
+        while (item := await pending.get()) is not None:
+            word, audio = item
+            db_word = models.Word(**word_dict(word))
+            db_word.audioUrl = await audio
+            db_word_list.words.append(db_word)
+            db.commit()
+            db.refresh(db_word)
+            added += 1
+            yield db_word
+        # Raises the error that ended the stream, if any
+        await reader
+        completed = True
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="Integrity Error")
+    finally:
+        reader.cancel()
+        while not pending.empty():
+            item = pending.get_nowait()
+            if item is not None:
+                item[1].cancel()
+        # Also runs when the client goes away before the first word
+        if not completed:
+            db.rollback()
+            if added == 0:
+                db.delete(db_word_list)
+                db.commit()
+
+    if topic_catalog.TOPIC_CATALOG_ENABLED:
+        topic_catalog.add_word_list(db, topic, db_word_list.id)
+
+
 def update_custom_word_list(db: Session, word_list_id: str, word_objs: List[schemas.CustomWord]):
     try:
         # Get existing word list from db
@@ -132,9 +250,9 @@ def create_custom_word_list(db: Session, topic: str, user_id: int, words: List[s
     return db_word_list
 
 
-def get_more_words(db: Session, word_list_id: int):
+async def get_more_words(db: Session, word_list_id: int):
     existing_words = []
-    spelltrain2AI = SpellTrain2AI()
+    spelltrain2AI = AsyncSpellTrain2AI()
 
     # Get the topic of the word list
     db_word_list = get_word_list_by_id(db, word_list_id)
@@ -145,14 +263,14 @@ def get_more_words(db: Session, word_list_id: int):
         existing_words.append(word.word)
 
     # Get additional words from AI
-    additional_word_list = spelltrain2AI.get_word_list(
+    additional_word_list = await spelltrain2AI.get_word_list(
         topic=topic, existing_words=existing_words)
 
     # Add more words to db
     for word in additional_word_list:
         word_to_add = word_dict(word)
         db_word = models.Word(**word_to_add)
-        db_word.audioUrl = get_audio_url(db_word.word)
+        db_word.audioUrl = await run_in_threadpool(get_audio_url, db_word.word)
         db.add(db_word)
         db.flush()
         db_word_list.words.append(db_word)
@@ -184,28 +302,26 @@ def delete_word_list(db: Session, word_list_id: int):
     db.delete(db_word_list)
     db.commit()
 
-    # Delete audio files
+    # Delete audio files that no other word list shares
+    audio_urls = unshared_audio_urls(db, audio_urls)
     if audio_urls:
         delete_audio_file(audio_urls)
 
     return db_word_list
 
 
-def get_word_info(db: Session, word_id: int):
-    spelltrain2AI = SpellTrain2AI()
+async def get_word_info(db: Session, word_id: int):
+    spelltrain2AI = AsyncSpellTrain2AI()
 
     db_word = get_word_by_id(db, word_id)
     db_word_list = get_word_list_by_id(db, db_word.wordListId)
     topic = db_word_list.title
-    word_by_AI = spelltrain2AI.get_word_details(db_word.word, topic)
+    if is_word_sparse(db_word):
+        word_by_AI = await spelltrain2AI.complete_word_details(db_word.word, topic, get_known_word_info(db_word))
+    else:
+        word_by_AI = await spelltrain2AI.get_word_details(db_word.word, topic)
 
-    db_word.definition = word_by_AI.definition
-    db_word.rootOrigin = word_by_AI.rootOrigin
-    db_word.usage = word_by_AI.usage
-    db_word.languageOrigin = word_by_AI.languageOrigin
-    db_word.partsOfSpeech = word_by_AI.partsOfSpeech
-    db_word.alternatePronunciation = word_by_AI.alternatePronunciation.encode(
-        'utf-8')
+    set_word_info(db_word, word_by_AI)
 
     db.commit()
     db.refresh(db_word)
@@ -213,6 +329,108 @@ def get_word_info(db: Session, word_id: int):
     return db_word
 
 
+async def enrich_words(db: Session, words: List[models.Word]):
+    """
+    Fills in the details of every incomplete word using batched AI requests, one batch per
+    word list, and commits once at the end. Words missing only a few fields have just those
+    fields requested.
+
+    Returns:
+        List[models.Word]: The same words, enriched.
+    """
+    spelltrain2AI = AsyncSpellTrain2AI()
+
+    # Group incomplete words by word list, since the topic is the word list title.
+    words_by_list = {}
+    for db_word in words:
+        if is_word_incomplete(db_word):
+            words_by_list.setdefault(db_word.wordListId, []).append(db_word)
+
+    semaphore = asyncio.Semaphore(max(spelltrain2AI.words_details_concurrency, 1))
+
+    async def complete_word_details(db_word: models.Word, topic: str):
+        async with semaphore:
+            return await spelltrain2AI.complete_word_details(db_word.word, topic, get_known_word_info(db_word))
+
+    for word_list_id, db_words in words_by_list.items():
+        topic = get_word_list_by_id(db, word_list_id).title
+        sparse_words = [db_word for db_word in db_words if is_word_sparse(db_word)]
+        batched_words = [db_word for db_word in db_words if not is_word_sparse(db_word)]
+
+        words_by_AI, *sparse_words_by_AI = await asyncio.gather(
+            spelltrain2AI.get_words_details(
+                [db_word.word for db_word in batched_words], topic),
+            *(complete_word_details(db_word, topic) for db_word in sparse_words),
+            return_exceptions=True)
+        if isinstance(words_by_AI, Exception):
+            raise words_by_AI
+
+        for db_word, word_by_AI in zip(batched_words + sparse_words, words_by_AI + sparse_words_by_AI):
+            # A word that failed stays incomplete and is enriched again on its next read
+            if isinstance(word_by_AI, Exception):
+                print(f"Failed to complete {db_word.word}: {word_by_AI}")
+                continue
+            set_word_info(db_word, word_by_AI)
+
+    if words_by_list:
+        db.commit()
+        for db_word in words:
+            db.refresh(db_word)
+
+    return words
+
+
+def unshared_audio_urls(db: Session, audio_urls: List[str]) -> List[str]:
+    """
+    Returns the audio files that are no longer used by any word. Word lists seeded from the
+    topic catalog share the audio files of the original words.
+    """
+    audio_urls = [audio_url for audio_url in dict.fromkeys(audio_urls) if audio_url]
+    shared_audio_urls = {word.audioUrl for word in db.query(models.Word).filter(
+        models.Word.audioUrl.in_(audio_urls)).all()}
+    return [audio_url for audio_url in audio_urls if audio_url not in shared_audio_urls]
+
+
+def missing_word_fields(db_word: models.Word) -> List[str]:
+    return [field for field in WORD_INFO_FIELDS if not getattr(db_word, field)]
+
+
+def is_word_incomplete(db_word: models.Word):
+    return len(missing_word_fields(db_word)) > 0
+
+
+def lacks_game_details(db_word: models.Word):
+    return any(not getattr(db_word, field) for field in GAME_WORD_FIELDS)
+
+
+def is_word_sparse(db_word: models.Word):
+    # Only a few fields are missing, cheaper to ask for one by one than all the details again
+    return 0 < len(missing_word_fields(db_word)) <= SPARSE_ENRICHMENT_MAX_FIELDS
+
+
+def get_known_word_info(db_word: models.Word) -> schemas.WordInfo:
+    """
+    Returns the details the word already has, with the missing fields empty.
+    """
+    word_info = {}
+    for field in WORD_INFO_FIELDS:
+        value = getattr(db_word, field) or ""
+        word_info[field] = value.decode('utf-8') if isinstance(value, bytes) else value
+    return schemas.WordInfo(**word_info)
+
+
+def set_word_info(db_word: models.Word, word_info: schemas.WordInfo):
+    # Only missing fields are filled: fields already filled, e.g. edited by the user, are kept,
+    # and a partial result, e.g. cut short by a request deadline, never clears a field
+    for field in missing_word_fields(db_word):
+        value = getattr(word_info, field)
+        if not value:
+            continue
+        if field == "alternatePronunciation":
+            value = value.encode('utf-8')
+        setattr(db_word, field, value)
+
+
 def add_words(db: Session, words: List[schemas.Word]):
     try:
         added_words = []
@@ -247,6 +465,9 @@ def update_words(db: Session, words_to_update: List[schemas.Word]) -> List[schem
                 raise HTTPException(
                     status_code=404, detail=f"Word ID {word.id} not found")
 
+            # The edited word list is no longer the words as generated for its topic
+            topic_catalog.remove_word_list(db, db_word.wordListId)
+
             db_word.word = word.word
             db_word.definition = word.definition
             db_word.rootOrigin = word.rootOrigin
@@ -283,7 +504,8 @@ def delete_words(db: Session, word_ids: List[int]):
         db.rollback()
         raise e
 
-    audio_urls = [word.audioUrl for word in deleted_words]
+    audio_urls = unshared_audio_urls(
+        db, [word.audioUrl for word in deleted_words])
     delete_audio_file(audio_urls)
 
     return deleted_words
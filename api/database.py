@@ -1,9 +1,14 @@
 import os
+from typing import Dict, Tuple
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 
 Base = declarative_base()
 
+# One engine, and so one connection pool, per database URL for the whole process
+_sessions: Dict[str, Tuple[sessionmaker, Engine]] = {}
+
 
 def get_db_session():
     if os.getenv("TEST_MODE") == "True":
@@ -13,8 +18,11 @@ def get_db_session():
         SQLALCHEMY_DATABASE_URL = os.getenv(
             "SPELLTRAIN2_DATABASE_URL", "sqlite:///./api/spelltrain2.db")
 
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-    )
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    return SessionLocal, engine
+    if SQLALCHEMY_DATABASE_URL not in _sessions:
+        engine = create_engine(
+            SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+        )
+        SessionLocal = sessionmaker(
+            autocommit=False, autoflush=False, bind=engine)
+        _sessions[SQLALCHEMY_DATABASE_URL] = SessionLocal, engine
+    return _sessions[SQLALCHEMY_DATABASE_URL]
@@ -1,32 +1,25 @@
 import os
 from fastapi import HTTPException, Request
-from openai import OpenAI, OpenAIError
-import google.generativeai as genai
+from api.utils import ai_usage
+from api.utils.ai_clients import client_registry
 
 
 def get_db(request: Request):
     return request.state.db
 
 
-def openai_client():
-    try:
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+async def track_ai_usage(request: Request):
+    # Attribute the AI usage of this request to its route, e.g. "/word-lists/{word_list_id}/more"
+    route = request.scope.get("route")
+    ai_usage.set_route(getattr(route, "path", request.url.path))
+
 
-        return client
-    except OpenAIError:
-        raise HTTPException(
-            status_code=500, detail="Error configuring OpenAI API Key")
+def openai_client():
+    return client_registry.openai()
 
 
 def google_gemini_client(model='gemini-pro'):
-    try:
-        genai.configure(api_key=os.getenv("GOOGLE_GEMINI_API_KEY"))
-        gemini = genai.GenerativeModel(model)
-
-        return gemini
-    except Exception:
-        raise HTTPException(
-            status_code=500, detail="Error configuring Google Gemini API Key")
+    return client_registry.gemini(model)
 
 
 def check_env():
@@ -1,23 +1,30 @@
+from dotenv import load_dotenv
+# Load the environment before importing modules that read settings at import time
+load_dotenv()
 from fastapi import Depends, FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
 from fastapi.staticfiles import StaticFiles
 
-from api.routers import games
+from api.routers import admin, games
 from api.utils import delete_orphaned_audio_files
+from api.utils.ai_clients import client_registry
+from api.utils.ai_usage import usage_recorder
+from api.utils.jobs import job_queue
+from api.utils.lexicon import lexical_filter
+from api.utils.pronunciation import pronunciation_resolver
 from .models import models
 from .database import get_db_session
 from .routers import users, word_lists
-from .dependencies import check_env
+from .dependencies import check_env, track_ai_usage
+import asyncio
 import os
 
-load_dotenv()
 check_env()
 # Create database tables
 SessionLocal, engine = get_db_session()
 models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+app = FastAPI(dependencies=[Depends(track_ai_usage)])
 # Create audio directory if it doesn't exist
 if not os.path.exists("audio"):
     os.makedirs("audio")
@@ -25,6 +32,7 @@ app.mount("/audio", StaticFiles(directory="audio"), name="audio")
 app.include_router(users.router)
 app.include_router(word_lists.router)
 app.include_router(games.router)
+app.include_router(admin.router)
 
 
 app.add_middleware(
@@ -39,6 +47,24 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     delete_orphaned_audio_files.delete_orphaned_audio_files()
+    # Load the word index used to pre-check words before AI validation
+    lexical_filter.load()
+    # Map the pronunciation index shared by every worker
+    pronunciation_resolver.load()
+    # Write the recorded AI usage to the database in the background
+    app.state.usage_flush_task = asyncio.create_task(
+        usage_recorder.run_periodic_flush())
+    # Run queued background jobs, e.g. enriching new words and preparing the next route
+    job_queue.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_queue.stop()
+    # Close the pooled AI provider connections
+    await client_registry.aclose()
+    app.state.usage_flush_task.cancel()
+    usage_recorder.flush()
 
 
 @app.middleware("http")
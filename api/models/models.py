@@ -1,4 +1,4 @@
-from sqlalchemy import JSON, Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import JSON, Column, Float, Integer, String, Boolean, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
@@ -87,3 +87,59 @@ class Station(Base):
         Integer,
         ForeignKey('games.id', ondelete="CASCADE"))
     game = relationship("Game", back_populates="stations")
+
+
+class AICacheEntry(Base):
+    __tablename__ = 'ai_cache'
+    __table_args__ = (UniqueConstraint('namespace', 'key'),)
+
+    id = Column(Integer, primary_key=True)
+    namespace = Column(String, index=True)
+    key = Column(String)
+    value = Column(JSON)
+    expiresAt = Column(Float)
+
+
+class TopicCatalogEntry(Base):
+    __tablename__ = 'topic_catalog'
+
+    id = Column(Integer, primary_key=True)
+    topic = Column(String, unique=True, index=True)
+    wordListId = Column(Integer)
+    createdAt = Column(Float)
+
+
+class AIUsageRecord(Base):
+    __tablename__ = 'ai_usage'
+
+    id = Column(Integer, primary_key=True)
+    createdAt = Column(Float, index=True)
+    day = Column(String, index=True)
+    provider = Column(String)
+    model = Column(String)
+    task = Column(String)
+    route = Column(String)
+    userId = Column(String)
+    promptTokens = Column(Integer)
+    completionTokens = Column(Integer)
+    latency = Column(Float)
+    outcome = Column(String)
+    cost = Column(Float)
+
+
+class Job(Base):
+    __tablename__ = 'jobs'
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, index=True)
+    # At most one job per key; a finished job is reused when its key is queued again
+    key = Column(String, unique=True)
+    payload = Column(JSON)
+    status = Column(String, index=True, default="queued")
+    priority = Column(Integer, default=0)
+    attempts = Column(Integer, default=0)
+    runAt = Column(Float, index=True)
+    lockedAt = Column(Float)
+    lastError = Column(String)
+    createdAt = Column(Float)
+    updatedAt = Column(Float)
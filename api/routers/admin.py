@@ -0,0 +1,184 @@
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from api.auth.auth_bearer import RequiredAdmin
+from api.dependencies import get_db
+from api.utils.ai_backend import ai_backend
+from api.utils.ai_cache import topic_cache, word_info_cache, word_topic_cache
+from api.utils.ai_clients import client_registry
+from api.utils.ai_governor import ai_governor
+from api.utils.ai_health import provider_health
+from api.utils.ai_singleflight import single_flight
+from api.utils.ai_usage import usage_recorder
+from api.utils.enrichment import enrichment_scheduler
+from api.utils.jobs import job_queue
+from api.utils.lexicon import lexical_filter
+from api.utils.pronunciation import pronunciation_resolver
+from api.utils.speculation import speculator
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(RequiredAdmin())],
+)
+
+
+@router.get("/ai-clients")
+async def get_ai_client_stats():
+    return client_registry.stats()
+
+
+@router.get("/ai-governor")
+async def get_ai_governor_stats():
+    """
+    Returns per AI provider the calls in flight, queue depth per priority, wait times and
+    rate limits.
+    """
+    return ai_governor.stats()
+
+
+@router.get("/ai-health")
+async def get_ai_health():
+    """
+    Returns the circuit state, rolling success rate and p50/p95 latency of each word details model.
+    """
+    return provider_health.stats()
+
+
+@router.get("/ai-backend")
+async def get_ai_backend():
+    """
+    Returns the AI backend mode (live, fake, record or replay) and its recorded, replayed and injected calls.
+    """
+    return ai_backend.stats()
+
+
+@router.get("/ai-single-flight")
+async def get_ai_single_flight():
+    """
+    Returns per task the AI calls made, the calls that shared a provider call already in flight, and the calls in flight now.
+    """
+    return single_flight.stats()
+
+
+@router.get("/lexicon")
+async def get_lexicon_stats():
+    """
+    Returns how many words the local pre-check accepted, rejected (per reason) and passed on to the AI, and its latency.
+    """
+    return lexical_filter.stats()
+
+
+@router.get("/pronunciations")
+async def get_pronunciation_stats():
+    """
+    Returns how many pronunciations the offline index answered instead of the AI, and its lookup latency.
+    """
+    return pronunciation_resolver.stats()
+
+
+@router.get("/enrichment")
+async def get_enrichment_stats():
+    """
+    Returns the background enrichment jobs per status.
+    """
+    return enrichment_scheduler.stats()
+
+
+@router.get("/speculation")
+async def get_speculation_stats():
+    """
+    Returns per task the AI calls started speculatively, used and wasted (per reason), and the share wasted.
+    """
+    return speculator.stats()
+
+
+@router.get("/jobs")
+async def get_jobs(
+    status: Optional[Literal["queued", "running", "done", "dead"]] = None,
+    kind: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    """
+    Returns the background jobs per status, and the latest jobs, e.g. the dead letters with
+    `status=dead`, along with their last error.
+    """
+    return {
+        **job_queue.stats(),
+        "items": [{"id": job.id, "kind": job.kind, "key": job.key, "payload": job.payload,
+                   "status": job.status, "priority": job.priority, "attempts": job.attempts,
+                   "runAt": job.runAt, "lastError": job.lastError, "updatedAt": job.updatedAt}
+                  for job in job_queue.jobs(db, status=status, kind=kind, limit=limit)],
+    }
+
+
+@router.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: int):
+    """
+    Queues a dead or finished job again.
+    """
+    job = job_queue.retry(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {"id": job.id, "status": job.status}
+
+
+@router.get("/cache")
+async def get_cache_stats():
+    return {
+        "wordInfo": word_info_cache.stats(),
+        "topics": topic_cache.stats(),
+        "wordTopics": word_topic_cache.stats(),
+    }
+
+
+@router.delete("/cache/word-info")
+async def invalidate_word_info_cache(word: Optional[str] = None, topic: Optional[str] = None):
+    """
+    Removes cached word details. Leaving out the word or the topic acts as a wildcard, so
+    leaving out both clears the whole word info cache.
+    """
+    removed = await run_in_threadpool(word_info_cache.invalidate, word, topic)
+
+    return {"removed": removed}
+
+
+@router.delete("/cache/topics")
+async def invalidate_topic_cache(topic: Optional[str] = None):
+    """
+    Removes cached topic verdicts, or all of them when no topic is given.
+    """
+    removed = await run_in_threadpool(topic_cache.invalidate, topic)
+
+    return {"removed": removed}
+
+
+@router.delete("/cache/word-topics")
+async def invalidate_word_topic_cache(word: Optional[str] = None, topic: Optional[str] = None):
+    """
+    Removes cached word-topic verdicts. Leaving out the word or the topic acts as a wildcard.
+    """
+    removed = await run_in_threadpool(word_topic_cache.invalidate, word, topic)
+
+    return {"removed": removed}
+
+
+@router.get("/ai-usage")
+async def get_ai_usage(
+    group_by: Literal["day", "user", "route", "model", "task"] = "day",
+    days: int = Query(30, ge=1),
+    db: Session = Depends(get_db),
+):
+    """
+    Returns the AI calls, errors, tokens, cost and average latency of the last `days` days
+    grouped by day, user, route, model or task, along with the totals per model since the
+    process started.
+    """
+    return {
+        "groupBy": group_by,
+        "rows": await run_in_threadpool(usage_recorder.summary, db, group_by=group_by, days=days),
+        "process": usage_recorder.stats(),
+    }
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from api.dependencies import get_db
 from api.auth.auth_bearer import RequiredLogin
-from api.crud.word_lists import get_word_info, get_word_list_by_id, get_more_words
+from api.crud.word_lists import enrich_words, get_word_list_by_id, get_more_words, lacks_game_details
 from api.schemas.schemas import GameCreate, StationCreate
 from api.utils.game import Game
 from api.crud import games as games_crud
-from api.database import get_db_session
+from api.utils.ai_governor import background_priority
+from api.utils.enrichment import enrichment_scheduler
+from api.utils.jobs import job_queue
 import json
 
 
@@ -18,6 +20,7 @@ router = APIRouter(
 LEVEL_MAX = 8
 MAX_ROUTES_ALLOWED = 5
 WORDS_PER_ROUTE = 6
+PREPARE_NEXT_ROUTE = "prepare_next_route"
 
 
 @router.post("/")
@@ -45,15 +48,10 @@ async def retrieve_games(word_list_id: int, db: Session = Depends(get_db), user_
     # Select words from the range of indices
     words = word_list_db.words[:end]
 
-    db_words = []
-    for word in words:
-        # If any of the fields are empty, fetch the word from the database
-        if word.languageOrigin == "" or word.usage == "" or word.definition == "":
-            db_words.append(get_word_info(db, word.id))
-        else:
-            db_words.append(word)
+    # Fetch the details the games need for the route's words in batched requests
+    await enrich_words(db, [word for word in words if lacks_game_details(word)])
 
-    game_object = Game(words=db_words)
+    game_object = Game(words=words)
     game_bank = game_object.generate_games()
 
     # Create a new game model
@@ -72,11 +70,17 @@ async def retrieve_games(word_list_id: int, db: Session = Depends(get_db), user_
         )
         stations_models.append(station_to_save)
 
-    return games_crud.create_game_and_stations(db, game_model, stations_models)
+    db_stations = games_crud.create_game_and_stations(
+        db, game_model, stations_models)
+
+    # Get the next routes' words ready while the user plays this one
+    await enrichment_scheduler.aenqueue(word_list_db.words, start=-end)
+
+    return db_stations
 
 
 @router.patch("/stations/{station_id}")
-async def mark_station_as_completed(station_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db), user_id=Depends(RequiredLogin())):
+async def mark_station_as_completed(station_id: int, db: Session = Depends(get_db), user_id=Depends(RequiredLogin())):
     station_db = games_crud.find_station_by_id(db, station_id)
 
     if not station_db:
@@ -89,8 +93,9 @@ async def mark_station_as_completed(station_id: int, background_tasks: Backgroun
         raise HTTPException(
             status_code=401, detail="Unauthorized access")
 
-    # Run the background task to prepare the next route
-    background_tasks.add_task(prepare_next_route, station_db, user_id,)
+    # Queue a job to prepare the next route, once per station
+    await job_queue.aenqueue(PREPARE_NEXT_ROUTE, {"stationId": station_id, "userId": user_id},
+                             key=f"{PREPARE_NEXT_ROUTE}:{station_id}")
 
     return games_crud.mark_station_as_completed(db, station_id)
 
@@ -143,15 +148,10 @@ async def retrieve_games_for_next_route(game_id: int, db: Session = Depends(get_
             status_code=400, detail="Word list not found")
     words = word_list_db.words[start:end]
 
-    db_words = []
-    for word in words:
-        # If any of the fields are empty, fetch the word from the database
-        if word.languageOrigin == "" or word.usage == "" or word.definition == "":
-            db_words.append(get_word_info(db, word.id))
-        else:
-            db_words.append(word)
+    # Fetch the details the games need for the route's words in batched requests
+    await enrich_words(db, [word for word in words if lacks_game_details(word)])
 
-    game_object = Game(words=db_words)
+    game_object = Game(words=words)
     game_bank = game_object.generate_games()
 
     # Create 8 station models
@@ -164,36 +164,45 @@ async def retrieve_games_for_next_route(game_id: int, db: Session = Depends(get_
         )
         stations_models.append(station_to_save)
 
-    # Return the updated game and stations for the next route
-    return games_crud.update_game_and_stations(
+    db_stations = games_crud.update_game_and_stations(
         db=db, game_id=game_db.id, stations=stations_models)
 
+    # Get the following routes' words ready while the user plays this one
+    await enrichment_scheduler.aenqueue(word_list_db.words, start=-end)
+
+    # Return the updated game and stations for the next route
+    return db_stations
+
+
+@job_queue.handler(PREPARE_NEXT_ROUTE)
+async def prepare_next_route(db: Session, payloads: list):
+    # Let interactive requests go ahead of this background work
+    with background_priority():
+        for payload in payloads:
+            await _prepare_next_route(db, payload["stationId"], payload["userId"])
+
+
+async def _prepare_next_route(db: Session, station_id: int, user_id):
+    # Errors are raised so that the job queue retries the job
+    station_db = games_crud.find_station_by_id(db, station_id)
+    if station_db is None or station_db.route >= MAX_ROUTES_ALLOWED:
+        return
+
+    game_db = games_crud.find_game_by_id(db, station_db.gameId)
+    index = game_db.endingIndex + station_db.level - 1
+    word_list_db = get_word_list_by_id(db, game_db.wordListId, user_id)
+
+    # If no more words are available, fetch more words
+    if index >= len(word_list_db.words):
+        word_list_db = await get_more_words(
+            db=db, word_list_id=game_db.wordListId)
+        if not word_list_db:
+            raise RuntimeError("Failed to fetch more words")
+        await enrichment_scheduler.aenqueue(
+            word_list_db.words, start=-game_db.endingIndex)
+
+    word = word_list_db.words[index]
 
-def prepare_next_route(station_db, user_id):
-    try:
-        SessionLocal, _ = get_db_session()
-        db = SessionLocal()
-        if station_db.route < MAX_ROUTES_ALLOWED:
-            game_db = games_crud.find_game_by_id(db, station_db.gameId)
-            index = game_db.endingIndex + station_db.level - 1
-            word_list_db = get_word_list_by_id(db, game_db.wordListId, user_id)
-
-            # If no more words are available, fetch more words
-            if index >= len(word_list_db.words):
-                word_list_db = get_more_words(
-                    db=db, word_list_id=game_db.wordListId)
-
-            if not word_list_db:
-                print("Failed to fetch more words")
-                return
-
-            word = word_list_db.words[index]
-
-            # Fetch the word information if not already fetched.
-            if word.languageOrigin == "" or word.usage == "" or word.definition == "":
-                fetch_word = get_word_info(db, word.id)
-                if not fetch_word:
-                    print("Failed to fetch word information")
-                    return
-    except Exception as e:
-        print(f"Failed to prepare next route: {e}")
+    # Fetch the word information if not already fetched.
+    if lacks_game_details(word):
+        await enrich_words(db, [word])
@@ -1,38 +1,152 @@
+import json
+import os
 import re
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Path
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Annotated, List
+from typing import Annotated, AsyncIterator, List, Literal, Optional
 from api.auth.auth_bearer import RequiredLogin
 from api.crud import word_lists as crud
+from api.crud.games import find_game_by_word_list_id
 from api.dependencies import get_db
-from api.schemas.schemas import CustomWordList, WordCreate, WordList, Word, WordListUpdate
-from api.utils.SpellTrainII_AI import SpellTrain2AI
+from api.models import models
+from api.schemas.schemas import CustomWordList, WordCreate, WordDetails, WordList, Word, WordListUpdate
+from api.utils.SpellTrainII_AI import AsyncSpellTrain2AI
+from api.utils.deadline import deadline
+from api.utils.enrichment import enrichment_scheduler
+from api.utils.speculation import speculator
 
 router = APIRouter(
     prefix="/word-lists",
     tags=["word-lists"],
 )
 
+# Seconds a word read may spend on AI calls before it returns the details found so far
+WORD_INFO_DEADLINE = float(os.getenv("SPELLTRAIN2_WORD_INFO_DEADLINE", "20"))
+# "wait" fills in missing details before answering, "stale" answers with the word as it is
+WORD_INFO_MODE = os.getenv("SPELLTRAIN2_WORD_INFO_MODE", "wait")
+# Seconds a "stale" word read may still spend on AI calls before serving what it has
+WORD_INFO_SLO = float(os.getenv("SPELLTRAIN2_WORD_INFO_SLO", "0"))
+
 
 @router.get("/", response_model=WordList)
 async def create_generative_word_list(topic: Annotated[str, Query(min_length=2)], db: Session = Depends(get_db), user_id=Depends(RequiredLogin())):
     sanitized_topic = re.sub(r'\s+', ' ', topic).strip().title()
-    spelltrain2AI = SpellTrain2AI()
+    spelltrain2AI = AsyncSpellTrain2AI()
+
+    # Check for repeated word list.
+    word_list_exists = crud.get_user_word_list_by_title(
+        db=db, title=sanitized_topic, uid=user_id)
+
+    # With SPELLTRAIN2_SPECULATIVE_WORD_LISTS, generate the words while the topic is evaluated
+    speculation = None if word_list_exists else speculator.start(
+        "get_word_list", spelltrain2AI.get_word_list(topic=sanitized_topic))
+    try:
+        # If topic is invalid, raise an exception with the reason
+        evaluated_topic = await spelltrain2AI.evaluate_topic(sanitized_topic)
+        if not evaluated_topic.isValid:
+            if speculation is not None:
+                speculation.discard("invalidTopic")
+            raise HTTPException(
+                status_code=400, detail=evaluated_topic.reason)
+
+        if word_list_exists:
+            return word_list_exists
+
+        # Ask AI models to generate one, and fill in its words' details in the background.
+        db_word_list = await crud.create_generative_word_list(
+            db=db, topic=sanitized_topic, user_id=user_id, speculation=speculation)
+    finally:
+        if speculation is not None:
+            speculation.discard("error")
+    await enrichment_scheduler.aenqueue(db_word_list.words)
+
+    return db_word_list
+
+
+@router.get("/stream")
+async def stream_generative_word_list(topic: Annotated[str, Query(min_length=2)],
+                                      format: Optional[Literal["ndjson", "sse"]] = None,
+                                      accept: Annotated[Optional[str], Header()] = None,
+                                      db: Session = Depends(get_db), user_id=Depends(RequiredLogin())):
+    """
+    Streaming variant of `GET /word-lists/`: each word is sent as soon as it is saved with
+    its audio, instead of once the whole list is ready.
+
+    The response is newline delimited JSON, or Server-Sent Events with `format=sse` or
+    `Accept: text/event-stream`. Events, in order:
+    - wordList: the word list without its words
+    - word: one per word, in the order of difficulty
+    - done: the word list id and number of words
+    - error: the detail of an error that ended the stream early
+    """
+    sanitized_topic = re.sub(r'\s+', ' ', topic).strip().title()
+    spelltrain2AI = AsyncSpellTrain2AI()
+    sse = format == "sse" or (format is None and "text/event-stream" in (accept or ""))
 
     # If topic is invalid, raise an exception with the reason
-    evaluated_topic = spelltrain2AI.evaluate_topic(sanitized_topic)
+    evaluated_topic = await spelltrain2AI.evaluate_topic(sanitized_topic)
     if not evaluated_topic.isValid:
         raise HTTPException(
             status_code=400, detail=evaluated_topic.reason)
 
-    # Check for repeated word list.
+    # Check for repeated word list and stream it as is.
     word_list_exists = crud.get_user_word_list_by_title(
         db=db, title=sanitized_topic, uid=user_id)
     if word_list_exists:
-        return word_list_exists
+        events = _existing_word_list_events(
+            WordList.model_validate(word_list_exists, from_attributes=True))
+    else:
+        events = _generated_word_list_events(
+            db.get_bind(), sanitized_topic, user_id)
+
+    return StreamingResponse(
+        (_format_event(event, data, sse) async for event, data in events),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+async def _existing_word_list_events(word_list: WordList) -> AsyncIterator[tuple]:
+    yield "wordList", word_list.model_dump(exclude={"words"})
+    for word in word_list.words:
+        yield "word", word.model_dump()
+    yield "done", {"id": word_list.id, "words": len(word_list.words)}
+
+
+async def _generated_word_list_events(bind, topic: str, user_id: int) -> AsyncIterator[tuple]:
+    # The request session is closed once the response starts, so the stream uses its own
+    db = Session(bind=bind)
+    word_list_id, count = None, 0
+    try:
+        async for item in crud.stream_generative_word_list(db=db, topic=topic, user_id=user_id):
+            if isinstance(item, models.WordList):
+                word_list_id = item.id
+                yield "wordList", WordList.model_validate(item, from_attributes=True).model_dump(exclude={"words"})
+            else:
+                await enrichment_scheduler.aenqueue([item], start=count)
+                count += 1
+                yield "word", Word.model_validate(item).model_dump()
+        yield "done", {"id": word_list_id, "words": count}
+    except HTTPException as e:
+        yield "error", {"detail": e.detail}
+    except Exception as e:
+        print(e)
+        yield "error", {"detail": "Error generating word list. Please try again later."}
+    finally:
+        db.close()
+
+
+async def _enqueue_enrichment(db: Session, db_word_list: models.WordList):
+    # Positions count from the next word to play in the word list's game
+    game_db = find_game_by_word_list_id(db, db_word_list.id)
+    await enrichment_scheduler.aenqueue(
+        db_word_list.words, start=-game_db.endingIndex if game_db else 0)
+
 
-    # Ask AI models to generate one.
-    return crud.create_generative_word_list(db=db, topic=sanitized_topic, user_id=user_id)
+def _format_event(event: str, data: dict, sse: bool) -> str:
+    if sse:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, "data": data}) + "\n"
 
 
 @router.put("/", response_model=WordList)
@@ -41,19 +155,19 @@ async def create_custom_word_list(custom_word_list: CustomWordList, db: Session
         r'\s+', ' ', custom_word_list.title).strip().title()
     words = custom_word_list.words
 
-    spelltrain2AI = SpellTrain2AI()
+    spelltrain2AI = AsyncSpellTrain2AI()
 
     # If topic is invalid, raise an exception with the reason
-    evaluated_topic = spelltrain2AI.evaluate_topic(sanitized_topic)
+    evaluated_topic = await spelltrain2AI.evaluate_topic(sanitized_topic)
     if not evaluated_topic.isValid:
         raise HTTPException(
             status_code=400, detail=evaluated_topic.reason)
 
-    # If words are not empty, validate each word
+    # If words are not empty, validate all of them at once
     if words:
-        for word in words:
-            result = spelltrain2AI.evaluate_word_topic(
-                word=word.word, topic=sanitized_topic)
+        results = await spelltrain2AI.evaluate_words_topic(
+            words=[word.word for word in words], topic=sanitized_topic)
+        for word, result in zip(words, results):
             if not result.isValid:
                 raise HTTPException(
                     status_code=400, detail=f"{word.word} is not a valid word.")
@@ -62,10 +176,17 @@ async def create_custom_word_list(custom_word_list: CustomWordList, db: Session
     word_list_exists = crud.get_user_word_list_by_title(
         db=db, title=sanitized_topic, uid=user_id)
     if word_list_exists:
-        return crud.update_custom_word_list(db=db, word_list_id=word_list_exists.id, word_objs=words)
+        db_word_list = crud.update_custom_word_list(
+            db=db, word_list_id=word_list_exists.id, word_objs=words)
+    else:
+        # Create a new word list
+        db_word_list = crud.create_custom_word_list(
+            db=db, topic=sanitized_topic, user_id=user_id, words=words)
 
-    # Create a new word list
-    return crud.create_custom_word_list(db=db, topic=sanitized_topic, user_id=user_id, words=words)
+    # Words without details are filled in in the background
+    await _enqueue_enrichment(db, db_word_list)
+
+    return db_word_list
 
 
 @router.patch("/", response_model=WordList)
@@ -88,16 +209,16 @@ async def update_word_list_title(word_list: WordListUpdate, db: Session = Depend
             status_code=400, detail="Word list with the same title already exists.")
 
     # Validate the new title
-    spelltrain2AI = SpellTrain2AI()
-    result = spelltrain2AI.evaluate_topic(word_list.title)
+    spelltrain2AI = AsyncSpellTrain2AI()
+    result = await spelltrain2AI.evaluate_topic(word_list.title)
     if not result.isValid:
         raise HTTPException(
             status_code=400, detail=result.reason)
 
-    # For each word in the word list, check if the word is related to the new title
-    for word in db_word_list.words:
-        result = spelltrain2AI.evaluate_word_topic(
-            word=word.word, topic=word_list.title)
+    # Check if every word in the word list is related to the new title
+    results = await spelltrain2AI.evaluate_words_topic(
+        words=[word.word for word in db_word_list.words], topic=word_list.title)
+    for word, result in zip(db_word_list.words, results):
         if not result.isValid:
             raise HTTPException(
                 status_code=400, detail=f"The new title {word_list.title} does not match the word {word.word} in the word list.")
@@ -147,7 +268,10 @@ async def get_more_words(word_list_id: int, db: Session = Depends(get_db), user_
     if db_word_list is None:
         raise HTTPException(status_code=404, detail="Word list not found")
 
-    return crud.get_more_words(db=db, word_list_id=word_list_id)
+    db_word_list = await crud.get_more_words(db=db, word_list_id=word_list_id)
+    await _enqueue_enrichment(db, db_word_list)
+
+    return db_word_list
 
 
 @router.post("/words", response_model=WordList)
@@ -160,33 +284,41 @@ async def add_words(words: List[WordCreate], db: Session = Depends(get_db), user
     if db_word_list is None:
         raise HTTPException(status_code=404, detail="Word list not found")
 
-    # Check if words are valid
-    spelltrain2AI = SpellTrain2AI()
-    for word in words:
-        sanitized_word = re.sub(r'\s+', ' ', word.word).strip()
-        result = spelltrain2AI.evaluate_word_topic(
-            word=sanitized_word, topic=db_word_list.title)
-        if not result.isValid:
-            raise HTTPException(
-                status_code=400, detail=f"{sanitized_word} is not a valid word.")
+    sanitized_words = [re.sub(r'\s+', ' ', word.word).strip()
+                       for word in words]
 
-        # Check for repeat word in word list
+    # Check for repeat word in word list
+    for word, sanitized_word in zip(words, sanitized_words):
         for db_word in db_word_list.words:
             if db_word.word.lower() == sanitized_word.lower():
                 raise HTTPException(
                     status_code=400, detail=f"{word.word} already exists in the word list.")
 
+    # Check if words are valid
+    spelltrain2AI = AsyncSpellTrain2AI()
+    results = await spelltrain2AI.evaluate_words_topic(
+        words=sanitized_words, topic=db_word_list.title)
+    for sanitized_word, result in zip(sanitized_words, results):
+        if not result.isValid:
+            raise HTTPException(
+                status_code=400, detail=f"{sanitized_word} is not a valid word.")
+
     try:
-        return crud.add_words(db=db, words=words)
+        db_word_list = crud.add_words(db=db, words=words)
     except Exception as e:
         print(e)
         raise HTTPException(
             status_code=400, detail="Error adding words")
 
+    await _enqueue_enrichment(db, db_word_list)
+
+    return db_word_list
+
 
 @router.patch("/words", response_model=List[Word])
 async def update_words(words: List[Word], db: Session = Depends(get_db), user_id=Depends(RequiredLogin())):
-    spelltrain2AI = SpellTrain2AI()
+    # Words to validate, grouped by the title of their word list
+    words_by_topic = {}
 
     for word in words:
         # Check if word list exists
@@ -212,9 +344,15 @@ async def update_words(words: List[Word], db: Session = Depends(get_db), user_id
                     raise HTTPException(
                         status_code=400, detail=f"{word.word} already exists in the word list.")
 
-            # Check if word is valid
-            result = spelltrain2AI.evaluate_word_topic(
-                word=sanitized_word, topic=db_word_list.title)
+            words_by_topic.setdefault(db_word_list.title, []).append(
+                (word, sanitized_word))
+
+    # Check if the new words are valid, one batch per word list title
+    spelltrain2AI = AsyncSpellTrain2AI()
+    for topic, topic_words in words_by_topic.items():
+        results = await spelltrain2AI.evaluate_words_topic(
+            words=[sanitized_word for _, sanitized_word in topic_words], topic=topic)
+        for (word, _), result in zip(topic_words, results):
             if not result.isValid:
                 raise HTTPException(
                     status_code=400, detail=f"{word.word} is not a valid word.")
@@ -226,8 +364,18 @@ async def update_words(words: List[Word], db: Session = Depends(get_db), user_id
             status_code=400, detail="Error updating word")
 
 
-@router.get("/words/{word_id}", response_model=Word)
-async def get_word_info(word_id: int, db: Session = Depends(get_db), user_id=Depends(RequiredLogin())):
+@router.get("/words/{word_id}", response_model=WordDetails)
+async def get_word_info(word_id: int, mode: Optional[Literal["wait", "stale"]] = None,
+                        db: Session = Depends(get_db), user_id=Depends(RequiredLogin())):
+    """
+    Returns a word with its details, filling in the missing ones.
+
+    - wait: asks the AI for the missing details, for up to SPELLTRAIN2_WORD_INFO_DEADLINE seconds.
+    - stale: answers right away, or after at most SPELLTRAIN2_WORD_INFO_SLO seconds of AI calls.
+
+    The mode defaults to SPELLTRAIN2_WORD_INFO_MODE. A word returned with `isComplete` false is
+    enriched in the background, so a later read gets its full details.
+    """
     db_word = crud.get_word_by_id(db, word_id=word_id)
 
     if db_word is None:
@@ -242,17 +390,29 @@ async def get_word_info(word_id: int, db: Session = Depends(get_db), user_id=Dep
         raise HTTPException(status_code=404, detail="Word list not found")
 
     # Check if definition, rootOrigin, usage, languageOrigin, partsOfSpeech, alternatePronunciation are empty
-    if db_word.definition == '' or db_word.rootOrigin == '' or db_word.usage == '' or db_word.languageOrigin == '' or db_word.partsOfSpeech == '' or db_word.alternatePronunciation == '':
-        try:
-            word_info = crud.get_word_info(db=db, word_id=word_id)
+    if not crud.is_word_incomplete(db_word):
+        return WordDetails.model_validate(db_word)
 
-            return word_info
+    wait = (mode or WORD_INFO_MODE) == "wait"
+    if wait or WORD_INFO_SLO > 0:
+        try:
+            with deadline(WORD_INFO_DEADLINE if wait else WORD_INFO_SLO):
+                db_word = await crud.get_word_info(db=db, word_id=word_id)
         except Exception as e:
             print(e)
-            raise HTTPException(
-                status_code=400, detail="Error retrieving word info")
+            if wait:
+                raise HTTPException(
+                    status_code=400, detail="Error retrieving word info")
+            db.rollback()
+            db.refresh(db_word)
+
+    # Out of time: the fields found so far are returned, the rest are left empty and
+    # filled in the background
+    is_complete = not crud.is_word_incomplete(db_word)
+    if not is_complete:
+        await enrichment_scheduler.aenqueue([db_word])
 
-    return db_word
+    return WordDetails.model_validate(db_word).model_copy(update={"isComplete": is_complete})
 
 
 @router.delete("/words", response_model=List[Word])
@@ -55,6 +55,11 @@ class Word(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class WordDetails(Word):
+    # False while some details are still being filled in the background
+    isComplete: bool = True
+
+
 class CustomWord(BaseModel):
     word: str = Field(..., max_length=50, min_length=1)
     definition: str = Field(..., max_length=50)
@@ -3,3 +3,14 @@ import os
 
 load_dotenv(".env.test")  # load environment variables from .env.test file
 os.environ["TEST_MODE"] = "True"  # set TEST_MODE environment variable to True
+
+import pytest
+
+
+@pytest.fixture
+def live_ai_backend(monkeypatch):
+    # Tests that stub the provider clients need their calls to reach them, whatever
+    # SPELLTRAIN2_AI_BACKEND is set to
+    from api.utils.ai_backend import LIVE, ai_backend
+    monkeypatch.setattr(ai_backend, "mode", LIVE)
+    return ai_backend
@@ -0,0 +1,147 @@
+import asyncio
+import os
+from openai.types.chat import ChatCompletion
+from api.utils import SpellTrainII_AI as spelltrain_ai
+from api.utils import helpers
+from api.utils.ai_backend import FAKE, RECORD, REPLAY, AIBackend, InjectedProviderError, ReplayMissError
+from api.utils.ai_governor import is_rate_limit_error
+from api.utils.SpellTrainII_AI import AsyncSpellTrain2AI, SpellTrain2AI
+
+MESSAGES = [{"role": "user", "content": 'Is "Planets" a valid Spelling Bee topic? Why or why not?'}]
+
+
+def offline_ai(ai_class, monkeypatch, backend):
+    monkeypatch.setattr(spelltrain_ai, "ai_backend", backend)
+    ai = ai_class()
+    ai.word_info_cache = None
+    ai.topic_cache = None
+    ai.word_topic_cache = None
+    ai.provider_health = None
+    ai.pronunciations = None
+    return ai
+
+
+def completion(content):
+    return ChatCompletion.model_validate({
+        "id": "live", "object": "chat.completion", "created": 0, "model": "gpt-3.5-turbo-1106",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+    })
+
+
+def test_fake_backend_answers_every_task(monkeypatch):
+    ai = offline_ai(SpellTrain2AI, monkeypatch, AIBackend(mode=FAKE))
+
+    assert ai.evaluate_topic("Planets").isValid is True
+    assert ai.evaluate_word_topic("galaxy", "Planets").isValid is True
+    assert [result.isValid for result in ai.evaluate_words_topic(
+        ["galaxy", "comet"], "Planets")] == [True, True]
+
+    words = ai.get_word_list("Planets")
+    assert len(words) == ai._NUMB_OF_WORDS
+    # Deterministic per topic
+    assert ai.get_word_list("Planets") == words
+    more_words = ai.get_word_list("Planets", existing_words=words)
+    assert len(more_words) == ai._NUMB_OF_EXTRA_WORDS
+    assert not set(more_words) & set(words)
+
+    details = ai.get_word_details("galaxy", "Planets")
+    assert details.usage == "The galaxy belongs to Planets."
+    assert ai.get_words_details(["galaxy", "comet"], "Planets")[1].alternatePronunciation == "/comet/"
+
+
+def test_fake_backend_rejects_invalid_input(monkeypatch):
+    ai = offline_ai(SpellTrain2AI, monkeypatch, AIBackend(mode=FAKE))
+
+    for topic in ["at", "xyz", "Unknown", "Drug Abuse"]:
+        assert ai.evaluate_topic(topic).isValid is False, topic
+    assert ai.evaluate_topic("Science and Technology").isValid is True
+
+    assert ai.evaluate_word_topic("abcxyz", "Planets").isValid is False
+    assert [result.isValid for result in ai.evaluate_words_topic(
+        ["Hardware", "Mother Board", "Tree", "galaxy"], "Technology")] == [True, True, False, True]
+
+
+def test_fake_backend_streams_word_list(monkeypatch):
+    ai = offline_ai(AsyncSpellTrain2AI, monkeypatch, AIBackend(mode=FAKE))
+
+    async def collect():
+        return [word async for word in ai.stream_word_list("Planets")], await ai.get_word_list("Planets")
+
+    streamed_words, words = asyncio.run(collect())
+    assert streamed_words == words
+
+
+def test_record_then_replay(tmp_path):
+    recorder = AIBackend(mode=RECORD, recordings_dir=str(tmp_path))
+    request = {"model": "gpt-3.5-turbo-1106", "messages": MESSAGES}
+    answer = '{"isValid": true, "reason": "recorded"}'
+
+    recorder.chat_completion("evaluate_topic", request,
+                             lambda **kwargs: completion(answer))
+
+    player = AIBackend(mode=REPLAY, recordings_dir=str(tmp_path))
+    replayed = player.chat_completion(
+        "evaluate_topic", request, lambda **kwargs: 1 / 0)
+    assert replayed.choices[0].message.content == answer
+
+    try:
+        player.chat_completion(
+            "evaluate_topic", {**request, "model": "gpt-4-1106-preview"}, lambda **kwargs: 1 / 0)
+        assert False, "an unrecorded call should not replay"
+    except ReplayMissError:
+        pass
+    assert player.stats()["replayed"] == 1
+    assert player.stats()["replayMisses"] == 1
+
+
+def test_record_then_replay_speech(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("audio")
+
+    def save(word, audio_file):
+        with open(audio_file, "wb") as file:
+            file.write(b"real speech")
+
+    AIBackend(mode=RECORD, recordings_dir="recordings").synthesize(
+        "galaxy", "audio/recorded.mp3", save)
+    monkeypatch.setattr(helpers, "ai_backend", AIBackend(
+        mode=REPLAY, recordings_dir="recordings"))
+
+    with open(helpers.get_audio_url("galaxy"), "rb") as file:
+        assert file.read() == b"real speech"
+
+
+def test_injected_errors():
+    request = {"model": "gemini-pro", "messages": MESSAGES}
+
+    try:
+        AIBackend(mode=FAKE, failing_models=["gemini-pro"]).chat_completion(
+            "evaluate_topic", request, None)
+        assert False, "failing models should always fail"
+    except InjectedProviderError as e:
+        assert not is_rate_limit_error(e)
+
+    try:
+        AIBackend(mode=FAKE, rate_limit_rate=1).chat_completion(
+            "evaluate_topic", request, None)
+        assert False, "the call should be rate limited"
+    except InjectedProviderError as e:
+        assert is_rate_limit_error(e)
+
+
+def test_injected_tail_latency():
+    backend = AIBackend(mode=FAKE, latency=0.001, tail_latency=0.05, tail_rate=0.5, seed=1)
+    request = {"model": "gpt-3.5-turbo-1106", "messages": MESSAGES}
+
+    for _ in range(20):
+        backend.chat_completion("evaluate_topic", request, None)
+
+    # Some calls took the tail latency
+    injected = backend.stats()["injectedLatency"]
+    assert 20 * 0.001 < injected < 20 * 0.05
+
+    # Same seed, same latencies
+    same_seed = AIBackend(mode=FAKE, latency=0.001, tail_latency=0.05, tail_rate=0.5, seed=1)
+    for _ in range(20):
+        same_seed.chat_completion("evaluate_topic", request, None)
+    assert same_seed.stats()["injectedLatency"] == injected
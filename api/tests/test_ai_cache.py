@@ -0,0 +1,136 @@
+import asyncio
+import json
+import time
+import uuid
+import pytest
+from types import SimpleNamespace
+from api.schemas.schemas import EvaluatedTopic, WordInfo
+from api.utils.ai_cache import AICache
+from api.utils.SpellTrainII_AI import SpellTrain2AI
+
+# The provider clients are stubbed, so the calls must not go to a fake or replay backend
+pytestmark = pytest.mark.usefixtures("live_ai_backend")
+
+
+def new_cache(namespace=None, ttl=60):
+    return AICache(namespace=namespace or f"test_{uuid.uuid4().hex}", schema=WordInfo, maxsize=10, ttl=ttl)
+
+
+def word_info(definition="A domesticated feline"):
+    return WordInfo(definition=definition, rootOrigin="Latin cattus", usage="The cat sleeps.",
+                    languageOrigin="Latin", partsOfSpeech="noun", alternatePronunciation="/kæt/")
+
+
+def test_keys_are_normalized():
+    cache = new_cache()
+    cache.set(word_info(), "Cat", "Animals")
+
+    assert cache.get("  cat ", "animals") == word_info()
+    assert cache.get("cat", "Space") is None
+    assert cache.stats()["memoryHits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_persist_across_processes():
+    namespace = f"test_{uuid.uuid4().hex}"
+    new_cache(namespace).set(word_info(), "cat", "animals")
+
+    # A fresh cache has an empty LRU and reads through to the database
+    cache = new_cache(namespace)
+    assert cache.get("cat", "animals") == word_info()
+    assert cache.get("cat", "animals") == word_info()
+    assert cache.stats()["dbHits"] == 1
+    assert cache.stats()["memoryHits"] == 1
+
+
+def test_entries_expire():
+    cache = new_cache(ttl=0.05)
+    cache.set(word_info(), "cat", "animals")
+    time.sleep(0.1)
+
+    assert cache.get("cat", "animals") is None
+
+
+def test_cached_values_are_copies():
+    cache = new_cache()
+    cache.set(word_info(), "cat", "animals")
+
+    cache.get("cat", "animals").definition = "changed"
+
+    assert cache.get("cat", "animals").definition == "A domesticated feline"
+
+
+def test_invalidate_with_wildcards():
+    namespace = f"test_{uuid.uuid4().hex}"
+    cache = new_cache(namespace)
+    cache.set(word_info(), "cat", "animals")
+    cache.set(word_info(), "dog", "animals")
+    cache.set(word_info(), "mars", "space")
+
+    assert cache.invalidate(None, "Animals") == 2
+    assert cache.get("cat", "animals") is None
+    assert new_cache(namespace).get("dog", "animals") is None
+    assert cache.get("mars", "space") is not None
+
+    assert cache.invalidate() == 1
+    assert cache.get("mars", "space") is None
+
+
+def test_entries_can_expire_sooner():
+    namespace = f"test_{uuid.uuid4().hex}"
+    cache = new_cache(namespace)
+    cache.set(word_info(), "cat", "animals", ttl=0.05)
+    cache.set(word_info(), "dog", "animals")
+    time.sleep(0.1)
+
+    assert cache.get("cat", "animals") is None
+    assert new_cache(namespace).get("cat", "animals") is None
+    assert cache.get("dog", "animals") is not None
+
+
+def test_rejected_verdicts_are_cached():
+    ai = SpellTrain2AI()
+    ai.topic_cache = AICache(namespace=f"test_{uuid.uuid4().hex}", schema=EvaluatedTopic, maxsize=10, ttl=60)
+    calls = []
+
+    def fake_openai_client():
+        def create(**kwargs):
+            calls.append(kwargs)
+            content = json.dumps({"topic": "asdf", "isValid": False, "reason": "Not a topic"})
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    ai._openai_client = fake_openai_client
+
+    assert ai.evaluate_topic("asdf").isValid is False
+    assert ai.evaluate_topic("ASDF ").isValid is False
+    assert len(calls) == 1
+
+
+def test_async_lookups_read_through_to_the_database():
+    namespace = f"test_{uuid.uuid4().hex}"
+
+    async def main():
+        await new_cache(namespace).aset(word_info(), "cat", "animals")
+        cache = new_cache(namespace)
+        assert await cache.aget("Cat", "animals") == word_info()
+        assert await cache.aget("cat", "animals") == word_info()
+        assert await cache.aget("dog", "animals") is None
+        return cache.stats()
+
+    stats = asyncio.run(main())
+
+    assert (stats["dbHits"], stats["memoryHits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_invalidate_only_matches_whole_parts():
+    namespace = f"test_{uuid.uuid4().hex}"
+    cache = new_cache(namespace)
+    cache.set(word_info(), "cat", "animals")
+    cache.set(word_info(), "cat", "animals_2")
+    cache.set(word_info(), "cats", "animals")
+
+    assert cache.invalidate("cat", "animals") == 1
+    assert new_cache(namespace).get("cat", "animals_2") is not None
+    assert cache.invalidate("cat") == 1
+    assert new_cache(namespace).get("cats", "animals") is not None
@@ -0,0 +1,26 @@
+from api.utils.ai_clients import AIClientRegistry
+
+
+def test_openai_client_is_shared(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    registry = AIClientRegistry()
+
+    first = registry.openai()
+    second = registry.openai()
+
+    assert first is second
+    stats = registry.stats()["openai"]
+    assert stats["clientsCreated"] == 1
+    assert stats["clientsReused"] == 1
+
+    registry.close()
+    assert registry.openai() is not first
+
+
+def test_gemini_client_is_shared_per_model(monkeypatch):
+    monkeypatch.setenv("GOOGLE_GEMINI_API_KEY", "test")
+    registry = AIClientRegistry()
+
+    assert registry.gemini("gemini-pro") is registry.gemini("gemini-pro")
+    assert registry.gemini("gemini-pro") is not registry.gemini("gemini-pro-vision")
+    assert registry.stats()["gemini"]["clientsCreated"] == 2
@@ -0,0 +1,71 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from api.utils import ai_usage
+from api.utils.ai_governor import AIGovernor, TokenBucket, _ProviderBudget, background_priority
+
+
+def new_governor(max_concurrency=1, requests_per_minute=0, tokens_per_minute=0):
+    return AIGovernor({"openai": _ProviderBudget(max_concurrency, requests_per_minute, tokens_per_minute)})
+
+
+def rate_limit_error():
+    return type("RateLimitError", (Exception,), {"status_code": 429,
+                                                  "response": SimpleNamespace(headers={"retry-after": "0.05"})})()
+
+
+def test_token_bucket_wait_time():
+    bucket = TokenBucket(per_minute=60)
+    now = bucket.updated
+
+    assert bucket.wait_time(60, now) == 0
+    bucket.take(60)
+    assert abs(bucket.wait_time(1, now) - 1.0) < 1e-6
+    assert bucket.wait_time(1, now + 1) == 0
+
+
+def test_interactive_calls_go_first_and_users_take_turns():
+    governor = new_governor(max_concurrency=1)
+    order = []
+
+    async def call(name, user, background=False):
+        ai_usage.set_user_id(user)
+        if background:
+            with background_priority():
+                async with governor.aslot("openai", 10):
+                    order.append(name)
+        else:
+            async with governor.aslot("openai", 10):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+    async def main():
+        # Hold the only slot while the other calls queue up
+        async with governor.aslot("openai", 10):
+            tasks = [asyncio.create_task(call("background", "1", background=True))]
+            for name, user in [("a1", "a"), ("a2", "a"), ("b1", "b")]:
+                tasks.append(asyncio.create_task(call(name, user)))
+            await asyncio.sleep(0.01)
+            assert governor.stats()["openai"]["queueDepth"] == {"interactive": 3, "background": 1}
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+
+    assert order == ["a1", "b1", "a2", "background"]
+    assert governor.stats()["openai"]["granted"] == 5
+
+
+def test_rate_limit_pauses_provider():
+    governor = new_governor(max_concurrency=0)
+
+    try:
+        with governor.slot("openai", 10):
+            raise rate_limit_error()
+    except Exception:
+        pass
+    assert governor.stats()["openai"]["rateLimited"] == 1
+
+    start = time.monotonic()
+    with governor.slot("openai", 10):
+        pass
+    assert time.monotonic() - start >= 0.04
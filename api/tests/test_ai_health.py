@@ -0,0 +1,46 @@
+from api.utils.ai_health import CLOSED, OPEN, ProviderHealth
+
+MODELS = ["gemini-pro", "gpt-3.5-turbo-1106", "gpt-4-1106-preview"]
+
+
+def new_health(cooldown=60):
+    return ProviderHealth(window=10, min_samples=4, min_success_rate=0.5, degraded_success_rate=0.8,
+                          slow_p95=5, max_consecutive_failures=3, cooldown=cooldown)
+
+
+def test_configured_order_without_data():
+    assert new_health().order(MODELS) == MODELS
+
+
+def test_degraded_model_moves_back():
+    health = new_health()
+    for success in (True, True, True, False, True):
+        health.record("gemini-pro", success, 1)
+    for _ in range(5):
+        health.record("gpt-3.5-turbo-1106", True, 8)
+
+    # 80% success is fine, but a p95 of 8s is too slow
+    assert health.order(MODELS) == ["gemini-pro", "gpt-4-1106-preview", "gpt-3.5-turbo-1106"]
+    assert health.stats()["gpt-3.5-turbo-1106"]["degraded"] is True
+
+
+def test_circuit_opens_and_probe_closes_it():
+    health = new_health(cooldown=0)
+    for _ in range(3):
+        health.record("gemini-pro", False, 1)
+    assert health.stats()["gemini-pro"]["state"] == OPEN
+
+    # Cooldown over: a single probe goes first
+    assert health.order(MODELS)[0] == "gemini-pro"
+    health.record("gemini-pro", True, 1)
+    assert health.stats()["gemini-pro"]["state"] == CLOSED
+
+
+def test_open_circuit_is_skipped():
+    health = new_health()
+    for _ in range(3):
+        health.record("gemini-pro", False, 1)
+
+    assert health.order(MODELS) == ["gpt-3.5-turbo-1106", "gpt-4-1106-preview"]
+    # Never leave get_word_details without a model
+    assert health.order(["gemini-pro"]) == ["gemini-pro"]
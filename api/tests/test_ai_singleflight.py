@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import time
+from api.schemas.schemas import WordInfo
+from api.utils.ai_singleflight import SingleFlight
+from api.utils.deadline import deadline, has_time, time_left
+from api.utils.SpellTrainII_AI import AsyncSpellTrain2AI
+
+
+class SlowWordDetailsAI(AsyncSpellTrain2AI):
+    def __init__(self):
+        super().__init__()
+        self.word_info_cache = None
+        self.provider_health = None
+        self.single_flight = SingleFlight()
+        self.fetches = 0
+
+    async def _fetch_word_details(self, word, topic, mode=None):
+        self.fetches += 1
+        await asyncio.sleep(0.05)
+        return WordInfo(definition="a definition", rootOrigin="a root", usage="a usage",
+                        languageOrigin="Latin", partsOfSpeech="noun", alternatePronunciation="/ipa/")
+
+
+def test_concurrent_identical_async_calls_share_one_fetch():
+    ai = SlowWordDetailsAI()
+
+    async def run():
+        return await asyncio.gather(*[ai.get_word_details(word, "Plants")
+                                      for word in ["Leaf"] * 30 + [" leaf ", "Stem"]])
+
+    results = asyncio.run(run())
+
+    assert ai.fetches == 2
+    assert all(result.definition == "a definition" for result in results)
+    # Every caller gets its own copy
+    assert results[0] is not results[1]
+    assert ai.single_flight.stats()["get_word_details"] == {
+        "calls": 32, "coalesced": 30, "inFlight": 0}
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    ai = SlowWordDetailsAI()
+
+    async def run():
+        first = asyncio.ensure_future(ai.get_word_details("Leaf", "Plants"))
+        second = asyncio.ensure_future(ai.get_word_details("Leaf", "Plants"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()).usage == "a usage"
+    assert ai.fetches == 1
+
+
+def test_threads_share_result_and_error():
+    flight = SingleFlight()
+    calls = []
+
+    def slow_call():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError("provider down")
+
+    errors = []
+
+    def worker():
+        try:
+            flight.do(("get_word_list", "plants"), slow_call)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(errors) == 5
+    # Finished calls are not reused
+    assert flight.do(("get_word_list", "plants"), lambda: ["leaf"]) == ["leaf"]
+    assert flight.stats()["get_word_list"]["coalesced"] == 4
+
+
+def test_caller_with_more_time_does_not_take_a_result_cut_short():
+    flight = SingleFlight()
+    calls = []
+
+    async def get_word_list():
+        calls.append(time_left())
+        await asyncio.sleep(0.01)
+        # Out of time for the second half of the words
+        return ["leaf", "stem"] if has_time(0.05) else ["leaf"]
+
+    async def call(seconds):
+        with deadline(seconds):
+            return await flight.ado(("get_word_list", "plants"), get_word_list)
+
+    async def run():
+        return await asyncio.gather(call(0.03), call(0.02), call(None))
+
+    assert asyncio.run(run()) == [["leaf"], ["leaf"], ["leaf", "stem"]]
+    # The caller without a deadline made the call again, the sooner deadline shared the result
+    assert len(calls) == 2 and calls[1] is None
+    assert flight.stats()["get_word_list"] == {"calls": 3, "coalesced": 1, "inFlight": 0}
+
+
+def test_complete_results_are_shared_under_later_deadlines():
+    flight = SingleFlight()
+    calls = []
+
+    async def get_word_list():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return ["leaf", "stem"]
+
+    async def call():
+        # Every request sets the same deadline, so each arrives with a later one
+        with deadline(20):
+            return await flight.ado(("get_word_list", "plants"), get_word_list)
+
+    async def run():
+        return await asyncio.gather(*(call() for _ in range(10)))
+
+    start = time.monotonic()
+    assert asyncio.run(run()) == [["leaf", "stem"]] * 10
+
+    assert time.monotonic() - start < 0.5
+    assert len(calls) == 1
+    assert flight.stats()["get_word_list"]["coalesced"] == 9
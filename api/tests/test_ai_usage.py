@@ -0,0 +1,86 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from api.models import models
+from api.utils import ai_usage
+from api.utils.ai_usage import UsageRecorder
+
+
+def new_recorder(flush_size=100):
+    # One shared connection, so that flushes in other threads see the same in-memory database
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    recorder = UsageRecorder(flush_size=flush_size, flush_interval=60,
+                             prices={"gpt-3.5-turbo-1106": (0.001, 0.002)})
+    recorder._session_local = sessionmaker(bind=engine)
+    return recorder
+
+
+def completion(prompt_tokens, completion_tokens):
+    return SimpleNamespace(usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens))
+
+
+def test_track_records_tokens_cost_and_outcome():
+    recorder = new_recorder()
+
+    with recorder.track("openai", "gpt-3.5-turbo-1106", "evaluate_topic") as usage:
+        usage.add_completion(completion(1000, 500))
+    try:
+        with recorder.track("openai", "gpt-3.5-turbo-1106", "evaluate_topic"):
+            raise TimeoutError()
+    except TimeoutError:
+        pass
+
+    totals = recorder.stats()["models"]["gpt-3.5-turbo-1106"]
+    assert totals["calls"] == 2
+    assert totals["errors"] == 1
+    assert totals["promptTokens"] == 1000
+    assert abs(totals["cost"] - 0.002) < 1e-9
+
+
+def test_records_are_flushed_in_bulk_and_aggregated():
+    recorder = new_recorder(flush_size=3)
+
+    ai_usage.set_route("/word-lists/")
+    ai_usage.set_user_id(7)
+    for _ in range(2):
+        with recorder.track("openai", "gpt-3.5-turbo-1106", "get_word_list") as usage:
+            usage.add_completion(completion(100, 100))
+    ai_usage.set_route("/games/{game_id}")
+    with recorder.track("gemini", "gemini-pro", "get_word_details") as usage:
+        usage.add_text("a" * 40, "b" * 80)
+
+    # The third call reached the flush size
+    assert recorder.stats()["pending"] == 0
+
+    db = recorder._session_local()
+    rows = recorder.summary(db, group_by="route")
+    assert [(row["route"], row["calls"], row["completionTokens"]) for row in rows] == \
+        [("/games/{game_id}", 1, 20), ("/word-lists/", 2, 200)]
+    assert recorder.summary(db, group_by="user")[0]["user"] == "7"
+
+
+def test_calls_recorded_on_the_event_loop_are_flushed_in_the_threadpool():
+    recorder = new_recorder(flush_size=1)
+    flush_threads = []
+    flush = recorder.flush
+
+    def record_flush_thread():
+        flush_threads.append(threading.current_thread())
+        return flush()
+
+    recorder.flush = record_flush_thread
+
+    async def call():
+        with recorder.track("openai", "gpt-3.5-turbo-1106", "evaluate_topic") as usage:
+            usage.add_completion(completion(10, 10))
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(call())
+
+    assert len(flush_threads) == 1 and flush_threads[0] is not loop_thread
+    assert recorder.stats()["pending"] == 0
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from api.tests.test_ai_backend import completion, offline_ai
+from api.utils import helpers
+from api.utils.ai_backend import FAKE, AIBackend
+from api.utils.ai_governor import AIGovernor, _ProviderBudget
+from api.utils.deadline import DeadlineExceeded, check_deadline, deadline, expired, has_time, time_left
+from api.utils.SpellTrainII_AI import AsyncSpellTrain2AI, SpellTrain2AI
+
+
+def test_deadline_keeps_the_sooner_one():
+    assert time_left() is None
+    assert has_time(1000)
+
+    with deadline(10):
+        assert 9 < time_left() <= 10
+        with deadline(60):
+            assert time_left() <= 10
+        with deadline(0):
+            assert expired()
+            try:
+                check_deadline()
+                assert False, "an expired deadline should raise"
+            except DeadlineExceeded:
+                pass
+        assert not has_time(20)
+
+    assert time_left() is None
+
+
+def test_provider_call_gets_time_left_as_timeout(monkeypatch):
+    ai = offline_ai(SpellTrain2AI, monkeypatch, AIBackend())
+    requests = []
+
+    def create(**request):
+        requests.append(request)
+        return completion('{"isValid": true, "reason": "ok"}')
+
+    client = SimpleNamespace(chat=SimpleNamespace(
+        completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(ai, "_openai_client", lambda: client)
+
+    ai.evaluate_topic("Planets")
+    with deadline(5):
+        ai.evaluate_topic("Oceans")
+
+    assert "timeout" not in requests[0]
+    assert 4 < requests[1]["timeout"] <= 5
+
+
+def test_word_details_return_partial_result_when_time_runs_out(monkeypatch):
+    backend = AIBackend(mode=FAKE, latency=1)
+    ai = offline_ai(AsyncSpellTrain2AI, monkeypatch, backend)
+    ai.min_call_budget = 0.1
+
+    for mode in ("sequential", "race"):
+        start = time.monotonic()
+        with deadline(0.2):
+            result = asyncio.run(ai.get_word_details("galaxy", "Planets", mode=mode))
+
+        assert time.monotonic() - start < 0.6
+        assert result == ai.default_word_details
+    # The first model ran out of time, so the other models and the refetches were not tried
+    assert backend.stats()["calls"] == 1 + 3
+
+
+def test_queued_call_gives_up_at_deadline():
+    governor = AIGovernor({"openai": _ProviderBudget(1, 0, 0)})
+
+    with governor.slot("openai", 10):
+        start = time.monotonic()
+        try:
+            with deadline(0.1):
+                with governor.slot("openai", 10):
+                    pass
+            assert False, "the queued call should give up"
+        except DeadlineExceeded:
+            pass
+
+    assert time.monotonic() - start < 0.5
+    assert governor.stats()["openai"]["queueDepth"] == {"interactive": 0, "background": 0}
+
+
+def test_no_speech_after_deadline(monkeypatch):
+    monkeypatch.setattr(helpers, "ai_backend", AIBackend(mode=FAKE))
+
+    with deadline(0):
+        try:
+            helpers.get_audio_url("galaxy")
+            assert False, "no audio should be made after the deadline"
+        except DeadlineExceeded:
+            pass
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from api.crud import word_lists
+from api.models import models
+from api.schemas.schemas import WordInfo
+from api.utils.enrichment import EnrichmentScheduler
+from api.utils.jobs import JobQueue
+
+
+def new_word_list(tmp_path, count):
+    engine = create_engine(f"sqlite:///{tmp_path / 'enrichment.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+    db = SessionLocal()
+    db_word_list = models.WordList(title="Planets", ownerId=1)
+    db.add(db_word_list)
+    db.flush()
+    for index in range(count):
+        db_word_list.words.append(models.Word(**word_lists.word_dict(f"word{index}")))
+    db.commit()
+    return SessionLocal, db, db_word_list
+
+
+async def run_jobs(jobs: JobQueue):
+    while await jobs.run_once():
+        pass
+
+
+def test_words_are_enriched_soonest_first(tmp_path, monkeypatch):
+    SessionLocal, db, db_word_list = new_word_list(tmp_path, 6)
+    batches = []
+
+    async def enrich_words(db, words):
+        batches.append([db_word.word for db_word in words])
+        for db_word in words:
+            db_word.definition = db_word.rootOrigin = db_word.usage = "filled"
+            db_word.languageOrigin = db_word.partsOfSpeech = db_word.alternatePronunciation = "filled"
+        db.commit()
+
+    monkeypatch.setattr(word_lists, "enrich_words", enrich_words)
+    jobs = JobQueue(session_factory=SessionLocal)
+    scheduler = EnrichmentScheduler(jobs, batch_size=2)
+    words = db_word_list.words
+
+    scheduler.enqueue(words, start=2)
+    # The last two words are played next
+    scheduler.enqueue(words[4:], start=0)
+    asyncio.run(run_jobs(jobs))
+
+    assert batches == [["word4", "word5"], ["word0", "word1"], ["word2", "word3"]]
+    assert scheduler.stats() == {"queued": 0, "running": 0, "done": 6, "dead": 0}
+    db.expire_all()
+    assert not any(word_lists.is_word_incomplete(db_word) for db_word in db_word_list.words)
+
+    # Complete words are not queued again
+    scheduler.enqueue(db_word_list.words)
+    assert scheduler.stats()["queued"] == 0
+
+
+def test_disabled_scheduler_queues_nothing(tmp_path):
+    SessionLocal, _, db_word_list = new_word_list(tmp_path, 2)
+    jobs = JobQueue(session_factory=SessionLocal)
+    scheduler = EnrichmentScheduler(jobs, enabled=False)
+
+    scheduler.enqueue(db_word_list.words)
+
+    assert scheduler.stats()["queued"] == 0
+
+
+def test_async_enqueue_writes_off_the_event_loop(tmp_path):
+    SessionLocal, _, db_word_list = new_word_list(tmp_path, 3)
+    jobs = JobQueue(session_factory=SessionLocal)
+    scheduler = EnrichmentScheduler(jobs)
+    insert_threads = []
+    insert = jobs._insert
+
+    def record_insert_thread(kind, queued):
+        insert_threads.append(threading.current_thread())
+        return insert(kind, queued)
+
+    jobs._insert = record_insert_thread
+
+    async def main():
+        await scheduler.aenqueue(db_word_list.words, start=1)
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(main())
+
+    assert len(insert_threads) == 1 and insert_threads[0] is not loop_thread
+    assert scheduler.stats()["queued"] == 3
+
+
+def test_partial_word_info_keeps_filled_fields(tmp_path):
+    _, db, db_word_list = new_word_list(tmp_path, 1)
+    db_word = db_word_list.words[0]
+    db_word.definition = "kept"
+
+    word_lists.set_word_info(db_word, WordInfo(
+        definition="", rootOrigin="Greek", usage="", languageOrigin="", partsOfSpeech="",
+        alternatePronunciation=""))
+
+    assert db_word.definition == "kept"
+    assert db_word.rootOrigin == "Greek"
+    assert db_word.usage == ""
+
+
+def test_enrich_words_requests_only_missing_fields(tmp_path, monkeypatch):
+    _, db, db_word_list = new_word_list(tmp_path, 2)
+    sparse_word, new_word = db_word_list.words
+    for field in word_lists.WORD_INFO_FIELDS:
+        setattr(sparse_word, field, "known")
+    sparse_word.definition = "edited by the user"
+    sparse_word.usage = ""
+    calls = []
+
+    class StubAI:
+        words_details_concurrency = 2
+
+        async def get_words_details(self, words, topic):
+            calls.append(("get_words_details", words))
+            return [WordInfo(definition="ai", rootOrigin="ai", usage="ai", languageOrigin="ai",
+                             partsOfSpeech="ai", alternatePronunciation="ai") for _ in words]
+
+        async def complete_word_details(self, word, topic, word_details):
+            calls.append(("complete_word_details", word, word_details.definition))
+            return word_details.model_copy(update={"usage": "refetched", "definition": "ai"})
+
+    monkeypatch.setattr(word_lists, "AsyncSpellTrain2AI", StubAI)
+
+    asyncio.run(word_lists.enrich_words(db, [sparse_word, new_word]))
+
+    assert calls == [("get_words_details", [new_word.word]),
+                     ("complete_word_details", sparse_word.word, "edited by the user")]
+    assert sparse_word.usage == "refetched"
+    assert sparse_word.definition == "edited by the user"
+    assert new_word.definition == "ai"
+    assert not word_lists.is_word_incomplete(new_word)
+
+
+def test_games_wait_only_for_the_fields_they_use(tmp_path):
+    _, _, db_word_list = new_word_list(tmp_path, 1)
+    db_word = db_word_list.words[0]
+    db_word.definition = db_word.usage = db_word.languageOrigin = "filled"
+
+    # The other fields are left to background enrichment
+    assert word_lists.is_word_incomplete(db_word)
+    assert not word_lists.lacks_game_details(db_word)
+
+    db_word.usage = ""
+    assert word_lists.lacks_game_details(db_word)
@@ -0,0 +1,117 @@
+import asyncio
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from api.models import models
+from api.utils.jobs import DEAD, DONE, QUEUED, JobQueue
+
+
+def new_queue(tmp_path, **kwargs):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    return JobQueue(session_factory=sessionmaker(bind=engine), **kwargs)
+
+
+def job(jobs, key):
+    db = jobs._session()
+    try:
+        return db.query(models.Job).filter(models.Job.key == key).first()
+    finally:
+        db.close()
+
+
+def test_jobs_run_once_per_key_in_priority_order(tmp_path):
+    jobs = new_queue(tmp_path)
+    ran = []
+
+    @jobs.handler("greet", batch_size=2)
+    async def greet(db, payloads):
+        ran.append([payload["name"] for payload in payloads])
+
+    jobs.enqueue("greet", {"name": "later"}, key="later", priority=5)
+    jobs.enqueue("greet", {"name": "soon"}, key="soon", priority=1)
+    jobs.enqueue("greet", {"name": "soon"}, key="soon", priority=1)
+    # Queued again with a sooner priority
+    jobs.enqueue("greet", {"name": "last"}, key="last", priority=9)
+    jobs.enqueue("greet", {"name": "last"}, key="last", priority=0)
+
+    async def run():
+        while await jobs.run_once():
+            pass
+
+    asyncio.run(run())
+
+    assert ran == [["last", "soon"], ["later"]]
+    assert jobs.stats()["jobs"] == {"queued": 0, "running": 0, "done": 3, "dead": 0}
+
+    # A finished key runs again when queued again
+    jobs.enqueue("greet", {"name": "soon"}, key="soon")
+    asyncio.run(run())
+    assert ran[-1] == ["soon"]
+
+
+def test_failing_jobs_back_off_then_die(tmp_path):
+    jobs = new_queue(tmp_path, max_attempts=2, backoff=60)
+
+    @jobs.handler("fail")
+    async def fail(db, payloads):
+        raise RuntimeError("provider down")
+
+    jobs.enqueue("fail", {}, key="fail")
+
+    assert asyncio.run(jobs.run_once())
+    failed = job(jobs, "fail")
+    assert (failed.status, failed.attempts, failed.lastError) == (QUEUED, 1, "RuntimeError: provider down")
+    # Not due before the backoff is over
+    assert not asyncio.run(jobs.run_once())
+
+    db = jobs._session()
+    db.query(models.Job).update({"runAt": 0})
+    db.commit()
+    db.close()
+    assert asyncio.run(jobs.run_once())
+    assert job(jobs, "fail").status == DEAD
+
+    retried = jobs.retry(failed.id)
+    assert (retried.status, retried.attempts) == (QUEUED, 0)
+
+
+def test_jobs_of_a_stopped_worker_run_again_after_the_lease(tmp_path):
+    jobs = new_queue(tmp_path, lease=30)
+    ran = []
+
+    @jobs.handler("work")
+    async def work(db, payloads):
+        ran.append(payloads)
+
+    jobs.enqueue("work", {"n": 1}, key="work")
+    # A worker claimed the job and stopped
+    assert jobs._claim() is not None
+    assert not asyncio.run(jobs.run_once())
+
+    db = jobs._session()
+    db.query(models.Job).update({"lockedAt": 0})
+    db.commit()
+    db.close()
+    assert asyncio.run(jobs.run_once())
+    assert ran == [[{"n": 1}]]
+    assert (job(jobs, "work").status, job(jobs, "work").attempts) == (DONE, 2)
+
+
+def test_workers_run_queued_jobs(tmp_path):
+    jobs = new_queue(tmp_path, workers=2, poll_interval=0.01)
+    ran = []
+
+    @jobs.handler("work")
+    async def work(db, payloads):
+        ran.extend(payload["n"] for payload in payloads)
+
+    async def run():
+        jobs.start()
+        for n in range(5):
+            jobs.enqueue("work", {"n": n})
+        while len(ran) < 5:
+            await asyncio.sleep(0.01)
+        await jobs.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert sorted(ran) == [0, 1, 2, 3, 4]
@@ -0,0 +1,70 @@
+from api.utils.lexicon import LexicalFilter, WordIndex, build_index
+from api.utils.SpellTrainII_AI import SpellTrain2AI
+
+
+def test_word_index_lookup():
+    index = WordIndex(["planet", "comet", "star", "comet"])
+
+    assert len(index) == 3
+    assert "comet" in index
+    assert "planet" in index
+    assert "come" not in index
+    assert "stars" not in index
+
+
+def test_bundled_index_knows_common_words_and_inflections():
+    lexical_filter = LexicalFilter()
+
+    for word in ["Volcano", "planets", "running", "stopped", "cities", "ice cream"]:
+        assert lexical_filter.is_known(word), word
+    assert not lexical_filter.is_known("asdfgh")
+
+
+def test_garbage_is_rejected_and_real_words_passed_on():
+    lexical_filter = LexicalFilter()
+
+    for word in ["123", "abc123", "", "   ", "x" * 46, "aaargh", "hello!", "snake_case"]:
+        assert lexical_filter.check(word) is False, word
+    for word in ["volcano", "Photosynthesis", "asdfgh", "o'clock", "café", "piñata", "Résumé",
+                 "cwm", "crwth", "hmm"]:
+        assert lexical_filter.check(word) is None, word
+
+    stats = lexical_filter.stats()
+    assert stats["checks"] == 18
+    assert stats["rejected"] == {"notLetters": 4, "empty": 2, "tooLong": 1,
+                                 "repeatedLetters": 1}
+    assert stats["aiCallsSavedRate"] == 8 / 18
+
+
+def test_policies_decide_dictionary_words_locally():
+    lexical_filter = LexicalFilter(accept_known=True, reject_unknown=True)
+
+    assert lexical_filter.check("volcanoes") is True
+    assert lexical_filter.check("asdfgh") is False
+    assert lexical_filter.stats()["rejected"] == {"unknown": 1}
+
+
+def test_build_index(tmp_path):
+    source = tmp_path / "words"
+    source.write_text("Paris\nplanet\ncan't\nplanet\nx\nsaturn\n")
+
+    assert build_index(str(source), str(tmp_path / "index.txt")) == 2
+    assert (tmp_path / "index.txt").read_text() == "planet\nsaturn\n"
+
+
+class NoAI(SpellTrain2AI):
+    def _generate_content(self, client, prompt, task, **kwargs):
+        raise AssertionError("the AI should not be asked")
+
+    def _chat_completion(self, task, **kwargs):
+        raise AssertionError("the AI should not be asked")
+
+
+def test_rejected_words_skip_the_ai():
+    ai = NoAI()
+    ai.lexical_filter = LexicalFilter()
+    ai.word_topic_cache = None
+
+    assert ai.evaluate_word_topic("12345", "Planets").isValid is False
+    assert [result.isValid for result in ai.evaluate_words_topic(
+        ["asdf1", "zzzz"], "Planets")] == [False, False]
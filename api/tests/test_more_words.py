@@ -0,0 +1,51 @@
+import json
+from types import SimpleNamespace
+from api.utils.SpellTrainII_AI import SpellTrain2AI, _WordDeduper
+
+
+def test_deduper_ignores_case_plurals_and_near_spellings():
+    deduper = _WordDeduper(["Photosynthesis", "comet"], similarity=94)
+
+    assert not deduper.add(" photosynthesis ")
+    assert not deduper.add("Comets")
+    assert not deduper.add("photosyntesis")
+    assert deduper.add("galaxy")
+    assert not deduper.add("GALAXY")
+    assert deduper.add("nebula")
+    assert len(deduper) == 2
+
+
+def test_more_words_prompt_stays_the_same_size():
+    ai = SpellTrain2AI()
+    ai.more_words_exclusions = 4
+    existing_words = [f"word{index}" for index in range(1000)]
+
+    messages = ai._word_list_messages("Animals", existing_words)
+
+    assert 'Provide 12 spelling bee words' in messages[-2]["content"]
+    assert messages[-1]["content"] == "Do not repeat these words: word0, word1, word998, word999"
+    assert ai._word_list_messages("Animals", existing_words[:500]) != messages
+    assert len(str(ai._word_list_messages("Animals", existing_words[:500]))) == len(str(messages))
+
+
+class StubAI(SpellTrain2AI):
+    def __init__(self, words):
+        super().__init__()
+        self.single_flight = None
+        self.words = words
+        self.messages = None
+
+    def _chat_completion(self, task, **kwargs):
+        self.messages = kwargs["messages"]
+        content = json.dumps({"words": self.words})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_more_words_removes_repeats_locally():
+    existing_words = ["Lion", "tiger", "elephant"] + [f"animal{index}" for index in range(100)]
+    ai = StubAI(["lion", "Tigers", "zebra", "zebra", "giraffe", "hippo",
+                 "rhino", "otter", "badger", "ferret", "walrus"])
+
+    assert ai.get_word_list("Animals", existing_words=existing_words) == [
+        "zebra", "giraffe", "hippo", "rhino", "otter", "badger"]
+    assert "animal50" not in ai.messages[-1]["content"]
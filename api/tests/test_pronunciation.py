@@ -0,0 +1,57 @@
+from api.schemas.schemas import WordInfo
+from api.utils.pronunciation import PronunciationIndex, PronunciationResolver, arpabet_to_ipa, build_index
+from api.utils.SpellTrainII_AI import SpellTrain2AI
+
+
+def test_arpabet_to_ipa():
+    assert arpabet_to_ipa("G AE1 L AH0 K S IY0".split()) == "/ˈɡæləksi/"
+    assert arpabet_to_ipa("AE1 S T R AH0 N AO2 T".split()) == "/ˈæstɹəˌnɔt/"
+    assert arpabet_to_ipa("F OW2 T OW0 S IH1 N TH AH0 S IH0 S".split()) == "/ˌfoʊtoʊˈsɪnθəsɪs/"
+
+
+def test_build_and_look_up_index(tmp_path):
+    source = tmp_path / "cmudict"
+    source.write_text(";;; comment\nTOMATO  T AH0 M EY1 T OW2\nTOMATO(1)  T AH0 M AA1 T OW2\n"
+                      "COMET  K AA1 M AH0 T\nBAD  B AE1 QQ\nICE  AY1 S\nCREAM  K R IY1 M\n")
+    output = str(tmp_path / "index")
+
+    assert build_index(str(source), output) == 4
+    index = PronunciationIndex(output)
+    # The first pronunciation is kept
+    assert index.get("tomato") == "/təˈmeɪˌtoʊ/"
+    assert index.get("comet") == "/ˈkɑmət/"
+    assert index.get("bad") is None
+    assert index.get("comets") is None
+    index.close()
+
+    resolver = PronunciationResolver(output)
+    assert resolver.lookup(" Ice  Cream") == "/ˈaɪs ˈkɹim/"
+    assert resolver.lookup("ice tea") is None
+    stats = resolver.stats()
+    assert (stats["indexWords"], stats["lookups"], stats["hits"], stats["misses"]) == (4, 2, 1, 1)
+
+
+def test_missing_index_leaves_words_to_the_ai(tmp_path):
+    resolver = PronunciationResolver(str(tmp_path / "missing"))
+
+    assert resolver.lookup("comet") is None
+    assert resolver.stats()["indexWords"] is None
+
+
+class NoAI(SpellTrain2AI):
+    def _chat_completion(self, task, **kwargs):
+        raise AssertionError("the AI should not be asked")
+
+
+def test_known_pronunciations_skip_the_ai():
+    ai = NoAI()
+    ai.pronunciations = PronunciationResolver()
+
+    assert ai._get_word_field("alternatePronunciation", "galaxy", "Space") == "/ˈɡæləksi/"
+
+    # Only the other unknown fields are refetched
+    details = WordInfo(definition="a star system", rootOrigin="Greek galaxias", usage="unknown",
+                       languageOrigin="Greece", partsOfSpeech="noun", alternatePronunciation="")
+    ai._get_word_fields = lambda fields, word, topic: {field: "filled" for field in fields}
+    details = ai._refetch_word_details("galaxy", details, "Space")
+    assert (details.usage, details.alternatePronunciation) == ("filled", "/ˈɡæləksi/")
@@ -0,0 +1,69 @@
+import asyncio
+from api.utils.speculation import Speculator
+
+
+def test_speculative_calls_are_used_or_wasted():
+    speculator = Speculator(enabled=True)
+    cancelled = []
+
+    async def get_word_list(words):
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            cancelled.append(words)
+            raise
+        return words
+
+    async def main():
+        used = speculator.start("get_word_list", get_word_list(["comet"]))
+        invalid = speculator.start("get_word_list", get_word_list(["nope"]))
+        finished = speculator.start("get_word_list", get_word_list(["moon"]))
+
+        await asyncio.sleep(0)
+        invalid.discard("invalidTopic")
+        assert await used.result() == ["comet"]
+        finished.discard("topicCatalog")
+        # Settled speculations are not counted again
+        used.discard("error")
+        finished.discard("error")
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+    assert cancelled == [["nope"]]
+    assert speculator.stats() == {"get_word_list": {
+        "started": 3, "used": 1, "wasted": {"invalidTopic": 1, "topicCatalog": 1},
+        "wastedCompleted": 1, "wastedRate": 2 / 3}}
+
+
+def test_disabled_speculator_makes_no_call():
+    speculator = Speculator(enabled=False)
+    calls = []
+
+    async def get_word_list():
+        calls.append(1)
+
+    async def main():
+        assert speculator.start("get_word_list", get_word_list()) is None
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+    assert calls == []
+    assert speculator.stats() == {}
+
+
+def test_discarded_errors_are_not_reported():
+    speculator = Speculator(enabled=True)
+
+    async def get_word_list():
+        raise RuntimeError("provider down")
+
+    async def main():
+        speculation = speculator.start("get_word_list", get_word_list())
+        await asyncio.sleep(0.01)
+        speculation.discard("invalidTopic")
+
+    asyncio.run(main())
+
+    assert speculator.stats()["get_word_list"]["wastedCompleted"] == 1
@@ -0,0 +1,88 @@
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from api.crud import topic_catalog
+from api.crud.word_lists import delete_word_list, unshared_audio_urls, update_words
+from api.models import models
+from api.schemas import schemas
+
+
+def new_db():
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def add_generated_word_list(db, title, words=("Mercury", "Venus")):
+    db_word_list = models.WordList(title=title, ownerId=1)
+    for word in words:
+        db_word_list.words.append(models.Word(word=word, definition=f"{word} definition",
+                                              audioUrl=f"audio/{word}.mp3"))
+    db.add(db_word_list)
+    db.commit()
+    topic_catalog.add_word_list(db, title, db_word_list.id)
+    return db_word_list
+
+
+def test_canonical_topic():
+    assert topic_catalog.canonical_topic("  Solar   Systems! ") == "solar system"
+    assert topic_catalog.canonical_topic("Butterflies") == "butterfly"
+    assert topic_catalog.canonical_topic("Boxes") == "box"
+    assert topic_catalog.canonical_topic("Glass") == "glass"
+
+
+def test_find_word_list_matches_variations():
+    db = new_db()
+    db_word_list = add_generated_word_list(db, "Solar System")
+
+    assert topic_catalog.find_word_list(db, "solar systems").id == db_word_list.id
+    assert topic_catalog.find_word_list(db, "Solar Sytem").id == db_word_list.id
+    assert topic_catalog.find_word_list(db, "Dinosaurs") is None
+
+
+def test_seed_word_list_copies_words_and_shares_audio():
+    db = new_db()
+    source = add_generated_word_list(db, "Solar System")
+
+    seeded = topic_catalog.seed_word_list(db, source, "Solar Systems", user_id=2)
+
+    assert seeded.id != source.id
+    assert [(word.word, word.definition, word.audioUrl) for word in seeded.words] == \
+        [(word.word, word.definition, word.audioUrl) for word in source.words]
+
+    # The audio files are still used by the seeded list
+    delete_word_list(db, source.id)
+    assert unshared_audio_urls(db, ["audio/Mercury.mp3", "audio/Venus.mp3"]) == []
+    # The catalog drops the entry of the deleted list
+    assert topic_catalog.find_word_list(db, "Solar System") is None
+
+
+def test_edited_word_list_leaves_the_catalog():
+    db = new_db()
+    source = add_generated_word_list(db, "Solar System")
+    edited = schemas.Word.model_validate(source.words[0]).model_copy(
+        update={"definition": "my own definition"})
+
+    update_words(db, [edited])
+
+    # Another user gets freshly generated words instead of the edited ones
+    assert topic_catalog.find_word_list(db, "Solar System") is None
+
+
+def test_catalog_limits(monkeypatch):
+    db = new_db()
+    monkeypatch.setattr(topic_catalog, "TOPIC_CATALOG_SIZE", 2)
+    add_generated_word_list(db, "Oceans")
+    add_generated_word_list(db, "Dinosaurs")
+    add_generated_word_list(db, "Volcanoes")
+
+    assert topic_catalog.find_word_list(db, "Oceans") is None
+    assert topic_catalog.find_word_list(db, "Volcanoes") is not None
+
+    monkeypatch.setattr(topic_catalog, "TOPIC_CATALOG_MAX_AGE", 60)
+    entry = db.query(models.TopicCatalogEntry).filter(
+        models.TopicCatalogEntry.topic == "dinosaur").first()
+    entry.createdAt = time.time() - 120
+    db.commit()
+
+    assert topic_catalog.find_word_list(db, "Dinosaurs") is None
@@ -0,0 +1,313 @@
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+from api.schemas.schemas import EvaluatedInput, WordInfo
+from api.utils.SpellTrainII_AI import AsyncSpellTrain2AI
+
+# The provider clients are stubbed, so the calls must not go to a fake or replay backend
+pytestmark = pytest.mark.usefixtures("live_ai_backend")
+
+
+def word_info(usage="a usage"):
+    return WordInfo(definition="a definition", rootOrigin="a root", usage=usage,
+                    languageOrigin="Latin", partsOfSpeech="noun", alternatePronunciation="/ipa/")
+
+
+class StubAI(AsyncSpellTrain2AI):
+    """Simulates providers with fixed latencies so provider ordering can be tested offline."""
+
+    def __init__(self, responses):
+        super().__init__()
+        self.word_info_cache = None
+        self.topic_cache = None
+        self.word_topic_cache = None
+        self.provider_health = None
+        # model -> (latency in seconds, WordInfo or Exception)
+        self.responses = responses
+        self.started = []
+        self.cancelled = []
+
+    async def _simulate(self, model):
+        self.started.append(model)
+        latency, response = self.responses[model]
+        try:
+            await asyncio.sleep(latency)
+        except asyncio.CancelledError:
+            self.cancelled.append(model)
+            raise
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def _get_word_details_from_GEMINI_AI(self, word, topic, default_model='gemini-pro'):
+        return await self._simulate(default_model)
+
+    async def _get_word_details_from_OPENAI(self, word, topic, model):
+        return await self._simulate(model)
+
+    async def _get_word_field(self, field, word, topic):
+        return "refetched"
+
+
+def test_race_returns_first_valid_result_and_cancels_the_rest():
+    ai = StubAI({
+        "gemini-pro": (0.3, word_info()),
+        "gpt-3.5-turbo-1106": (0.01, word_info(usage="fast")),
+        "gpt-4-1106-preview": (0.3, word_info()),
+    })
+
+    result = asyncio.run(ai.get_word_details("cell", "Science", mode="race"))
+
+    assert result.usage == "fast"
+    assert sorted(ai.cancelled) == ["gemini-pro", "gpt-4-1106-preview"]
+
+
+def test_hedged_starts_next_model_after_delay():
+    ai = StubAI({
+        "gemini-pro": (0.5, word_info(usage="slow")),
+        "gpt-3.5-turbo-1106": (0.01, word_info(usage="hedge")),
+        "gpt-4-1106-preview": (0.01, word_info()),
+    })
+    ai.hedge_delay = 0.05
+
+    result = asyncio.run(ai.get_word_details("cell", "Science", mode="hedged"))
+
+    assert result.usage == "hedge"
+    assert ai.started == ["gemini-pro", "gpt-3.5-turbo-1106"]
+
+
+def test_hedged_falls_through_failures_and_merges_partial_results():
+    ai = StubAI({
+        "gemini-pro": (0.01, RuntimeError("blocked")),
+        "gpt-3.5-turbo-1106": (0.01, word_info(usage="Unknown")),
+        "gpt-4-1106-preview": (0.01, word_info(usage="n/a")),
+    })
+    ai.hedge_delay = 10
+
+    result = asyncio.run(ai.get_word_details("cell", "Science", mode="hedged"))
+
+    assert ai.started == ["gemini-pro", "gpt-3.5-turbo-1106", "gpt-4-1106-preview"]
+    assert result.usage == "refetched"
+    assert result.definition == "a definition"
+
+
+def test_provider_order_is_configurable(monkeypatch):
+    monkeypatch.setenv("SPELLTRAIN2_WORD_DETAILS_MODELS", "gpt-4-1106-preview,gemini-pro")
+    ai = StubAI({
+        "gemini-pro": (0.01, word_info()),
+        "gpt-4-1106-preview": (0.01, word_info(usage="gpt-4")),
+    })
+
+    result = asyncio.run(ai.get_word_details("cell", "Science", mode="sequential"))
+
+    assert result.usage == "gpt-4"
+    assert ai.started == ["gpt-4-1106-preview"]
+
+
+class BatchStubAI(StubAI):
+    """Answers batched requests, leaving out the words listed in `unknown`."""
+
+    def __init__(self, unknown=()):
+        super().__init__({"gemini-pro": (0, word_info(usage="single"))})
+        self.word_details_models = ["gemini-pro"]
+        self.words_details_batch_size = 4
+        self.unknown = set(unknown)
+        self.batches = []
+
+    def _async_openai_client(self):
+        ai = self
+
+        class Completions:
+            async def create(self, messages, **kwargs):
+                words = json.loads(messages[-1]['content'].split(' are related')[0][len('The words '):])
+                ai.batches.append(words)
+                items = [dict(word_info(usage="Unknown" if word in ai.unknown else "batched").model_dump(), word=word)
+                         for word in words]
+                return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps({"words": items})))],
+                                       usage=SimpleNamespace(total_tokens=0))
+
+        return SimpleNamespace(chat=SimpleNamespace(completions=Completions()))
+
+
+def test_get_words_details_batches_words():
+    ai = BatchStubAI()
+    words = [f"word{i}" for i in range(10)]
+
+    results = asyncio.run(ai.get_words_details(words, "Science"))
+
+    assert [result.usage for result in results] == ["batched"] * 10
+    assert len(ai.batches) == 3
+    assert ai.started == []
+
+
+def test_get_words_details_splits_failed_words():
+    ai = BatchStubAI(unknown={"word1"})
+    words = ["word0", "word1", "word2", "word3"]
+
+    results = asyncio.run(ai.get_words_details(words, "Science"))
+
+    assert [result.usage for result in results] == ["batched", "single", "batched", "batched"]
+    # Only the failed word falls back to get_word_details
+    assert ai.batches == [words]
+    assert ai.started == ["gemini-pro"]
+
+
+def test_get_words_details_splits_failed_batch_in_halves():
+    ai = BatchStubAI(unknown={"word0", "word1", "word2", "word3"})
+    words = ["word0", "word1", "word2", "word3"]
+
+    asyncio.run(ai.get_words_details(words, "Science"))
+
+    assert ai.batches[0] == words
+    assert sorted(ai.batches[1:]) == [["word0", "word1"], ["word2", "word3"]]
+
+
+def test_get_words_details_bounds_concurrency():
+    ai = BatchStubAI(unknown={f"word{i}" for i in range(12)})
+    ai.words_details_concurrency = 2
+    ai.responses["gemini-pro"] = (0.01, word_info(usage="single"))
+    running, max_running = [], []
+    get_word_details = ai.get_word_details
+
+    async def counted(word, topic):
+        running.append(word)
+        max_running.append(len(running))
+        try:
+            return await get_word_details(word, topic)
+        finally:
+            running.remove(word)
+
+    ai.get_word_details = counted
+    words = [f"word{i}" for i in range(12)]
+
+    results = asyncio.run(ai.get_words_details(words, "Science"))
+
+    assert [result.usage for result in results] == ["single"] * 12
+    assert len(ai.started) == 12
+    assert max(max_running) == 2
+
+
+class WordsTopicStubAI(StubAI):
+    """Answers batched word-topic requests, leaving out the words listed in `unknown`."""
+
+    def __init__(self, unknown=()):
+        super().__init__({})
+        self.words_topic_batch_size = 2
+        self.unknown = set(unknown)
+        self.batches = []
+        self.single = []
+
+    def _async_openai_client(self):
+        ai = self
+
+        class Completions:
+            async def create(self, messages, **kwargs):
+                words = json.loads(messages[-1]['content'].split('For each of the words ')[1].split(', is the word')[0])
+                ai.batches.append(words)
+                items = [{"word": word, "isValid": word != "xyzzy"} for word in words if word not in ai.unknown]
+                return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps({"words": items})))],
+                                       usage=SimpleNamespace(total_tokens=0))
+
+        return SimpleNamespace(chat=SimpleNamespace(completions=Completions()))
+
+    async def evaluate_word_topic(self, word, topic):
+        self.single.append(word)
+        return EvaluatedInput(isValid=True)
+
+
+def test_evaluate_words_topic_batches_words():
+    ai = WordsTopicStubAI(unknown={"Moon"})
+    words = ["Sun", "xyzzy", "Moon", "sun ", "Comet"]
+
+    results = asyncio.run(ai.evaluate_words_topic(words, "Space"))
+
+    assert [result.isValid for result in results] == [True, False, True, True, True]
+    # Duplicates are asked once and spelled as typed
+    assert ai.batches == [["Sun", "xyzzy"], ["Moon", "Comet"]]
+    assert ai.single == ["Moon"]
+
+
+class FieldStubAI(StubAI):
+    """Refetches fields with a fixed latency and records how many requests overlap."""
+
+    def __init__(self, mode="separate", concurrency=2):
+        super().__init__({})
+        self.word_fields_mode = mode
+        self.word_fields_concurrency = concurrency
+        self.running = 0
+        self.max_running = 0
+        self.combined = []
+
+    async def _get_word_field(self, field, word, topic):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return f"refetched {field}"
+
+    async def _get_combined_word_fields(self, fields, word, topic):
+        self.combined.append(fields)
+        return {field: f"combined {field}" for field in fields}
+
+
+def partial_word_info():
+    return WordInfo(definition="Unknown", rootOrigin="Unknown", usage="Unknown",
+                    languageOrigin="Unknown", partsOfSpeech="noun", alternatePronunciation="/ipa/")
+
+
+def test_refetch_word_details_bounds_concurrency():
+    ai = FieldStubAI(concurrency=2)
+
+    result = asyncio.run(ai._refetch_word_details("cell", partial_word_info(), "Science"))
+
+    assert result.usage == "refetched usage"
+    assert result.rootOrigin == "refetched rootOrigin"
+    assert result.partsOfSpeech == "noun"
+    assert ai.max_running == 2
+
+
+def test_complete_word_details_requests_only_missing_fields():
+    ai = FieldStubAI()
+    ai.pronunciations = None
+    requested = []
+    get_word_field = ai._get_word_field
+
+    async def recorded(field, word, topic):
+        requested.append(field)
+        return await get_word_field(field, word, topic)
+
+    ai._get_word_field = recorded
+    known = word_info(usage="")
+    known.definition = "edited by the user"
+
+    result = asyncio.run(ai.complete_word_details("cell", "Science", known))
+
+    assert requested == ["usage"]
+    assert result.usage == "refetched usage"
+    assert result.definition == "edited by the user"
+    assert known.usage == ""
+
+
+def test_refetch_word_details_combined():
+    ai = FieldStubAI(mode="combined")
+
+    result = asyncio.run(ai._refetch_word_details("cell", partial_word_info(), "Science"))
+
+    assert result.definition == "combined definition"
+    assert ai.combined == [["languageOrigin", "usage", "definition", "rootOrigin"]]
+    assert ai.max_running == 0
+
+
+def test_gemini_failure_before_a_response_returns_default_details():
+    ai = AsyncSpellTrain2AI()
+    ai.word_topic_cache = None
+    ai._google_gemini_client = lambda model=None: None
+
+    async def generate_content(client, prompt, task, generation_config):
+        raise TimeoutError("no response")
+
+    ai._generate_content = generate_content
+
+    assert asyncio.run(ai._get_word_details_from_GEMINI_AI("galaxy", "Planets")) == ai.default_word_details
+    assert asyncio.run(ai.evaluate_word_topic("galaxy", "Planets")) is None
@@ -0,0 +1,87 @@
+import asyncio
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from api.crud import word_lists
+from api.models import models
+from api.utils.SpellTrainII_AI import AsyncSpellTrain2AI, _WordListStreamParser
+
+
+class StreamStubAI(AsyncSpellTrain2AI):
+    chunks = ['{"wo', 'rds": ["Mer', 'cury", "Ve', 'nus", "Mercury", ', '"Ea\\u0072th"', ']}']
+
+    async def _stream_chat_completion(self, task, **kwargs):
+        for chunk in self.chunks:
+            yield chunk
+
+
+class FailingStreamStubAI(AsyncSpellTrain2AI):
+    async def _stream_chat_completion(self, task, **kwargs):
+        raise RuntimeError("Connection reset")
+        yield
+
+
+def new_db():
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+def test_parser_yields_words_as_they_complete():
+    parser = _WordListStreamParser()
+
+    assert parser.feed('{"words": ["Merc') == []
+    assert parser.feed('ury", "Ven') == ["Mercury"]
+    assert parser.feed('us", "say \\"hi\\""') == ["Venus", 'say "hi"']
+    assert parser.feed(']}') == []
+    assert parser.feed(', "other": ["ignored"]}') == []
+
+
+def test_stream_word_list_skips_duplicates_and_existing_words():
+    words = asyncio.run(collect(StreamStubAI().stream_word_list(
+        topic="Solar System", existing_words=["Venus"])))
+
+    assert words == ["Mercury", "Earth"]
+
+
+def test_stream_generative_word_list_persists_each_word(monkeypatch):
+    monkeypatch.setattr(word_lists, "AsyncSpellTrain2AI", StreamStubAI)
+    monkeypatch.setattr(word_lists, "get_audio_url",
+                        lambda word: f"audio/{word}.mp3")
+    db = new_db()
+
+    async def consume():
+        items = []
+        async for item in word_lists.stream_generative_word_list(db, "Solar System", user_id=1):
+            if isinstance(item, models.Word):
+                # Every word is committed before it is sent
+                assert db.query(models.Word).filter(
+                    models.Word.id == item.id).count() == 1
+            items.append(item)
+        return items
+
+    word_list, *words = asyncio.run(consume())
+
+    assert word_list.title == "Solar System"
+    assert [(word.word, word.audioUrl, word.wordListId) for word in words] == [
+        ("Mercury", "audio/Mercury.mp3", word_list.id),
+        ("Venus", "audio/Venus.mp3", word_list.id),
+        ("Earth", "audio/Earth.mp3", word_list.id),
+    ]
+
+
+def test_stream_generative_word_list_removes_empty_list_on_error(monkeypatch):
+    monkeypatch.setattr(word_lists, "AsyncSpellTrain2AI", FailingStreamStubAI)
+    db = new_db()
+
+    try:
+        asyncio.run(collect(word_lists.stream_generative_word_list(
+            db, "Solar System", user_id=1)))
+        assert False, "the stream error should be raised"
+    except RuntimeError:
+        pass
+
+    assert db.query(models.WordList).count() == 0
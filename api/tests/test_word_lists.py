@@ -242,6 +242,24 @@ def test_get_word_info():
         assert response.json().get("word") == word.get("word")
 
 
+def test_get_word_info_stale():
+    word = word_list_user_1.get("words")[-1]
+
+    response = client.get(
+        f"/word-lists/words/{word.get('id')}", params={"mode": "stale"}, headers=headers_user_1)
+    assert response.status_code == 200
+    word_info = response.json()
+    assert word_info.get("word") == word.get("word")
+    # An incomplete word is served as it is and enriched in the background
+    fields = ["definition", "rootOrigin", "usage",
+              "languageOrigin", "partsOfSpeech", "alternatePronunciation"]
+    assert word_info.get("isComplete") == all(word_info.get(field) for field in fields)
+
+    response = client.get(
+        f"/word-lists/words/{word.get('id')}", params={"mode": "later"}, headers=headers_user_1)
+    assert response.status_code == 422
+
+
 def test_update_words():
     words = word_list_user_1.get("words")
 
@@ -1,17 +1,175 @@
+import asyncio
 import json
+import math
 import os
+import re
+import time
 import google.generativeai as genai
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import AsyncIterator, Iterator, List, Optional
 from devtools import pprint
 from fastapi import HTTPException
-from openai import OpenAI, OpenAIError
+from openai import AsyncOpenAI, OpenAI
+from rapidfuzz import fuzz, process
 from api.schemas.schemas import EvaluatedInput, EvaluatedTopic, WordInfo
+from api.utils.ai_backend import ai_backend
+from api.utils.ai_cache import REJECTED_VALIDATION_TTL, normalize, topic_cache, word_info_cache, word_topic_cache
+from api.utils.ai_clients import client_registry
+from api.utils.ai_governor import ai_governor, is_rate_limit_error
+from api.utils.ai_health import provider_health
+from api.utils.ai_singleflight import single_flight
+from api.utils.ai_usage import estimate_tokens, usage_recorder
+from api.utils.deadline import check_deadline, expired, has_time, time_left
+from api.utils.lexicon import lexical_filter
+from api.utils.pronunciation import pronunciation_resolver
+
+# A complete JSON string in the words array, and the end of the array
+_WORD_ITEM = re.compile(r'\s*,?\s*("(?:[^"\\]|\\.)*")')
+_WORDS_END = re.compile(r'\s*,?\s*\]')
+
+
+class _WordListStreamParser:
+    """
+    Picks the words out of a streamed {"words": [...]} answer as soon as each one is complete.
+    """
+
+    def __init__(self):
+        self.content = ""
+        self._position: Optional[int] = None
+        self._done = False
+
+    def feed(self, text: str) -> List[str]:
+        self.content += text
+        if self._position is None:
+            match = re.search(r'"words"\s*:\s*\[', self.content)
+            if match is None:
+                return []
+            self._position = match.end()
+
+        words = []
+        while not self._done:
+            match = _WORD_ITEM.match(self.content, self._position)
+            if match is None:
+                self._done = _WORDS_END.match(
+                    self.content, self._position) is not None
+                break
+            self._position = match.end()
+            words.append(json.loads(match.group(1)))
+        return words
+
+
+class _WordDeduper:
+    """
+    Drops generated words that repeat an existing or an earlier word, ignoring case, spacing,
+    plural endings and near-identical spellings (rapidfuzz ratio of at least `similarity`).
+    """
+
+    def __init__(self, existing_words: Optional[List] = None, similarity: int = 0):
+        self.similarity = similarity
+        self._keys = {normalize(word) for word in existing_words or ()}
+        self._choices = list(self._keys)
+        self._accepted = 0
+
+    def __len__(self) -> int:
+        return self._accepted
+
+    def add(self, word: str) -> bool:
+        """
+        Returns:
+            bool: True if the word is new and was added.
+        """
+        key = normalize(word)
+        if not key or self._is_duplicate(key):
+            return False
+        self._keys.add(key)
+        self._choices.append(key)
+        self._accepted += 1
+        return True
+
+    def _is_duplicate(self, key: str) -> bool:
+        forms = {key, key + "s", key + "es", key.removesuffix("s"), key.removesuffix("es")}
+        if not self._keys.isdisjoint(forms):
+            return True
+        return bool(self.similarity) and process.extractOne(
+            key, self._choices, scorer=fuzz.ratio, score_cutoff=self.similarity) is not None
 
 
 class SpellTrain2AI:
     _NUMB_OF_WORDS = 30
     _RETRY_COUNT = 3
+    _EXPECTED_COMPLETION_TOKENS = 500
     _NUMB_OF_EXTRA_WORDS = 6
+    # Single-field prompts used by _refetch_word_details, in the order they are refetched.
+    _WORD_FIELD_PROMPTS = {
+        "languageOrigin": {
+            "prompt": 'What is the language of origin for the word "{word}" related to {topic}?',
+            "system": [
+                'You are a helpful dictionary assistant designed to output the root origin of a word.',
+                'Here are some examples of root origins: Latin, Greek, French, etc. Please do not provide anything else except the name of the country or language of origin.',
+                'If you are unsure, try to provide the most likely language of origin based on the word itself.',
+                'The JSON response should be in the following format: {"languageOrigin": "result here"}',
+            ],
+            "error": "Error getting word origin. Please try again later.",
+        },
+        "usage": {
+            "prompt": 'Please provide a short sentence using the word "{word}" that is related to the topic "{topic}".',
+            "system": [
+                'You are a helpful dictionary assistant designed to output a sentence using a word.',
+                'The JSON response should be in the following format: {"usage": "Your sentence here."}',
+                'The sentence should be concise and contain less than 7 words.',
+                'If you are unsure, try to provide the most likely sentence based on the word itself.',
+            ],
+            "error": "Error getting word usage. Please try again later.",
+        },
+        "definition": {
+            "prompt": 'Provide a simple definition within 7 words for the word "{word}" related to {topic}.',
+            "system": [
+                'You are a helpful dictionary assistant designed to output a simple definition for a word.',
+                'The JSON response should be in the following format: {"definition": "result here"}',
+                'If you are unsure, try to provide the most likely definition based on the word itself.',
+                'The definition should be concise and contain less than 7 words.',
+            ],
+            "error": "Error getting word definition. Please try again later.",
+        },
+        "alternatePronunciation": {
+            "prompt": 'Provide the International Phonetic Alphabet (IPA) pronunciation of the word "{word}" related to {topic}.',
+            "system": [
+                'You are a helpful dictionary assistant designed to output the International Phonetic Alphabet (IPA) pronunciation of a word.',
+                'The JSON response should be in the following format: {"alternatePronunciation": "result here"}',
+                'If you are unsure, try to provide the most likely pronunciation based on the word itself.',
+            ],
+            "error": "Error getting word pronunciation. Please try again later.",
+        },
+        "partsOfSpeech": {
+            "prompt": 'Provide the parts of speech for the word "{word}" related to {topic}.',
+            "system": [
+                'You are a helpful dictionary assistant designed to output the parts of speech for a word.',
+                'The JSON response should be in the following format: {"partsOfSpeech": "result here"}',
+                'If you are unsure, try to provide the most likely parts of speech based on the word itself.',
+            ],
+            "error": "Error getting word parts of speech. Please try again later.",
+        },
+        "rootOrigin": {
+            "prompt": 'Provide a short sentence within 7 words that describes the Etymology of the word "{word}" related to "{topic}".',
+            "system": [
+                'You are a helpful dictionary assistant designed to output the Etymology of a word.',
+                'The JSON response should be in the following format: {"rootOrigin": "result here"}',
+                'If you are unsure, try to provide the most likely Etymology based on the word itself.',
+            ],
+            "error": "Error getting word root origin. Please try again later.",
+        },
+    }
+
+    # Expected value of each field in the combined refetch request
+    _WORD_FIELD_FORMATS = {
+        "definition": "simple definition within 7 words",
+        "rootOrigin": "short sentence within 7 words that describes the Etymology of the word",
+        "usage": "A short sentence about the topic that includes the word",
+        "languageOrigin": "language or country where the word comes from",
+        "partsOfSpeech": "parts of speech",
+        "alternatePronunciation": "International Phonetic Alphabet (IPA) pronunciation of the word",
+    }
 
     def __init__(self):
         """
@@ -25,6 +183,63 @@ class SpellTrain2AI:
         self.openai_model = 'gpt-3.5-turbo-1106'
         self.openai_gpt4_model = 'gpt-4-1106-preview'
         self.gemini_model = 'gemini-pro'
+        # Order in which get_word_details tries the models, e.g. "gemini-pro,gpt-3.5-turbo-1106"
+        self.word_details_models = os.getenv(
+            "SPELLTRAIN2_WORD_DETAILS_MODELS",
+            f"{self.gemini_model},{self.openai_model},{self.openai_gpt4_model}").split(",")
+        # Number of words enriched per get_words_details request
+        self.words_details_batch_size = int(
+            os.getenv("SPELLTRAIN2_WORDS_DETAILS_BATCH_SIZE", "10"))
+        # Requests in flight at once for one get_words_details call, counting the smaller
+        # batches and single-word fallbacks of words that failed in a batch
+        self.words_details_concurrency = int(
+            os.getenv("SPELLTRAIN2_WORDS_DETAILS_CONCURRENCY", "6"))
+        # Number of words validated per evaluate_words_topic request
+        self.words_topic_batch_size = int(
+            os.getenv("SPELLTRAIN2_WORDS_TOPIC_BATCH_SIZE", "50"))
+        # "separate" refetches each unknown field with its own request, at most
+        # `word_fields_concurrency` at a time; "combined" asks for all of them in one request.
+        self.word_fields_mode = os.getenv(
+            "SPELLTRAIN2_WORD_FIELDS_MODE", "separate")
+        self.word_fields_concurrency = int(
+            os.getenv("SPELLTRAIN2_WORD_FIELDS_CONCURRENCY", "3"))
+        # Asking for more words sends at most this many existing words to avoid; repeats of the
+        # others are removed locally, so the prompt stays the same size as the list grows
+        self.more_words_exclusions = int(
+            os.getenv("SPELLTRAIN2_MORE_WORDS_EXCLUSIONS", "30"))
+        # Asks for this many times the extra words, to have enough left after removing repeats
+        self.more_words_overrequest = float(
+            os.getenv("SPELLTRAIN2_MORE_WORDS_OVERREQUEST", "2"))
+        # Minimum rapidfuzz ratio for a generated word to count as a repeat of an existing one
+        self.duplicate_similarity = int(
+            os.getenv("SPELLTRAIN2_DUPLICATE_SIMILARITY", "94"))
+        # Reorders and skips word details models based on their recent success rate and latency
+        self.provider_health = provider_health if os.getenv(
+            "SPELLTRAIN2_AI_HEALTH", "True") == "True" else None
+        # Identical get_word_details / get_word_list calls in flight share one provider call
+        self.single_flight = single_flight if os.getenv(
+            "SPELLTRAIN2_AI_SINGLE_FLIGHT", "True") == "True" else None
+        # Under a request deadline, fallback models and refetches are not started with less
+        # than this many seconds left
+        self.min_call_budget = float(
+            os.getenv("SPELLTRAIN2_AI_MIN_CALL_BUDGET", "1"))
+        # Times a call rejected with a 429 is retried once the governor's backoff is over
+        self.rate_limit_retries = int(
+            os.getenv("SPELLTRAIN2_AI_RATE_LIMIT_RETRIES", "3"))
+        # Cross-user cache of complete word details, keyed by (word, topic)
+        self.word_info_cache = word_info_cache if os.getenv(
+            "SPELLTRAIN2_WORD_INFO_CACHE", "True") == "True" else None
+        # Accepted and rejected topic / word-topic verdicts
+        use_validation_cache = os.getenv(
+            "SPELLTRAIN2_VALIDATION_CACHE", "True") == "True"
+        self.topic_cache = topic_cache if use_validation_cache else None
+        self.word_topic_cache = word_topic_cache if use_validation_cache else None
+        # Rejects obvious non-words locally before asking the AI whether they match a topic
+        self.lexical_filter = lexical_filter if os.getenv(
+            "SPELLTRAIN2_LEXICON", "True") == "True" else None
+        # Fills alternatePronunciation from the offline pronunciation index instead of the AI
+        self.pronunciations = pronunciation_resolver if os.getenv(
+            "SPELLTRAIN2_PRONUNCIATIONS", "True") == "True" else None
         self.default_word_details = WordInfo(
             definition="",
             rootOrigin="",
@@ -47,19 +262,14 @@ class SpellTrain2AI:
         Raises:
             HTTPException: If there is an error evaluating the topic.
         """
-        client = self._openai_client()
-        user_prompt = f'Is "{topic}" a valid Spelling Bee topic? Why or why not?'
+        cached_result = self._cached_validation(self.topic_cache, topic)
+        if cached_result is not None:
+            return cached_result
 
-        messages = [
-            {'role': 'system', 'content': 'You are a helpful dictionary assistant that evaluates whether a topic is a valid Spelling Bee topic.'},
-            {'role': 'system', 'content': 'A valid spelling bee topic encompasses a clear category or subject area with enough scope and depth to generate an appropriate word list, but avoids overly niche or sensitive subjects.'},
-            {'role': 'system',
-                'content': 'The JSON response should be in the following format: {"isValid": true, "reason": "why is a suitable spelling bee topic"} or {"isValid": false, "reason": "why is not a suitable spelling bee topic"}'},
-            {'role': 'system', 'content': 'The reason should be brief and clear.'},
-            {'role': 'user', 'content': user_prompt},
-        ]
+        messages = self._evaluate_topic_messages(topic)
         try:
-            completion = client.chat.completions.create(
+            completion = self._chat_completion(
+                task="evaluate_topic",
                 messages=messages,
                 model=self.openai_model,
                 response_format={"type": "json_object"},
@@ -70,27 +280,80 @@ class SpellTrain2AI:
             raise HTTPException(
                 status_code=500, detail="Error evaluating Topic. Please try again later.")
 
-        json_response = json.loads(completion.choices[0].message.content)
+        evaluated_topic = self._parse_evaluated_topic(
+            completion.choices[0].message.content)
+        self._cache_validation(self.topic_cache, evaluated_topic, topic)
 
-        # Convert to EvaluatedTopic type and return
-        return EvaluatedTopic.model_validate(json_response)
+        return evaluated_topic
 
     def evaluate_word_topic(self, word: str, topic: str) -> EvaluatedInput:
+        prechecked_result = self._prechecked_word_topic(word)
+        if prechecked_result is not None:
+            return prechecked_result
+
+        cached_result = self._cached_validation(
+            self.word_topic_cache, word, topic)
+        if cached_result is not None:
+            return cached_result
+
         client = self._google_gemini_client()
-        prompt = 'Is the word "{}" related to the topic "{}" and spelled correctly? The JSON response should be in the following format: {{"isValid": "True"}} or {{"isValid": "False"}}.'.format(
-            word, topic)
+        prompt = self._word_topic_prompt(word, topic)
 
+        response = None
         try:
-            response = client.generate_content(
-                prompt, generation_config={"temperature": 0})
-            # extract text from "{" to "}"
-            json_response = json.loads(response.text[response.text.find(
-                "{"):response.text.find("}")+1])
+            response = self._generate_content(
+                client, prompt, task="evaluate_word_topic", generation_config={"temperature": 0})
 
-            return EvaluatedInput.model_validate(json_response)
+            evaluated_input = self._parse_evaluated_input(response.text)
+            self._cache_validation(
+                self.word_topic_cache, evaluated_input, word, topic)
+
+            return evaluated_input
         except Exception as e:
             print(e)
-            print(response.prompt_feedback)
+            if response is not None:
+                print(response.prompt_feedback)
+
+    def evaluate_words_topic(self, words: List[str], topic: str) -> List[EvaluatedInput]:
+        """
+        Evaluates whether many words are related to a topic and spelled correctly, several words per request.
+
+        Words left out of a response are evaluated on their own with evaluate_word_topic.
+
+        Args:
+            words (List[str]): The words to be evaluated.
+            topic (str): The topic the words should be related to.
+
+        Returns:
+            List[EvaluatedInput]: The verdict of each word, in the same order as `words`.
+
+        Raises:
+            HTTPException: If there is an error evaluating the words.
+        """
+        results = self._cached_words_topic(words, topic)
+        for batch in self._batches(self._uncached_words_topic(words, results), self.words_topic_batch_size):
+            try:
+                completion = self._chat_completion(
+                    task="evaluate_words_topic",
+                    messages=self._words_topic_messages(batch, topic),
+                    model=self.openai_model,
+                    response_format={"type": "json_object"},
+                    temperature=0
+                )
+                batch_results = self._parse_words_topic(
+                    completion.choices[0].message.content, batch)
+                self._cache_words_topic(batch_results, topic)
+                results.update(batch_results)
+            except Exception as e:
+                print(e)
+                print(f"Failed to evaluate {len(batch)} words at once.")
+
+            for word in batch:
+                if normalize(word) not in results:
+                    results[normalize(word)] = self.evaluate_word_topic(
+                        word, topic)
+
+        return self._words_topic_results(words, results)
 
     def get_word_list(self, topic: str, existing_words: Optional[List] = None, model: Optional[str] = 'gpt-3.5-turbo-1106') -> list[str]:
         """
@@ -104,49 +367,54 @@ class SpellTrain2AI:
         Returns:
             list[str]: A list of spelling bee words related to the topic.
         """
-        client = self._openai_client()
-        user_prompt = f'Provide {self._NUMB_OF_WORDS} spelling bee words in English without dialect/accent related to the topic: {topic}.'
-        if existing_words is not None:
-            user_prompt += f'Provide {self._NUMB_OF_EXTRA_WORDS} spelling bee words in English without dialect/accent related to the topic: {topic}.'
-
-        messages = [
-            {'role': 'system', 'content': 'You are a helpful dictionary. You are asked to provide a list of words on a topic.'},
-            {'role': 'system',
-                'content': 'The JSON response should be in the following format: {"words": ["word1", "word2", "word3"]}'},
-            {'role': 'system', 'content': 'All the key-value pairs cannot be empty and the list of words should not contain any duplicates.'},
-            {'role': 'system', 'content': 'All words should be single words and not phrases.'},
-            {'role': 'system', 'content': 'Order of the words in level of difficulty is important.'},
-            {'role': 'user', 'content': user_prompt},
-        ]
+        return self._single_flight(
+            self._word_list_key(topic, existing_words, model),
+            lambda: self._get_word_list(topic, existing_words, model))
 
-        if existing_words is not None:
-            messages.append(
-                {'role': 'system', 'content': f'Do not repeat any words from the following list: {existing_words}'})
+    def _get_word_list(self, topic: str, existing_words: Optional[List], model: str) -> list[str]:
+        messages = self._word_list_messages(topic, existing_words)
 
-        completion = client.chat.completions.create(
+        completion = self._chat_completion(
+            task="get_word_list",
             model=model,
             response_format={"type": "json_object"},
             messages=messages,
         )
 
-        self._print_cost(completion)
+        return self._parse_word_list(completion.choices[0].message.content, existing_words)
 
-        json_response = json.loads(completion.choices[0].message.content)
+    def stream_word_list(self, topic: str, existing_words: Optional[List] = None, model: Optional[str] = 'gpt-3.5-turbo-1106') -> Iterator[str]:
+        """
+        Streams the spelling bee words related to the given topic, yielding each word as soon
+        as the model has finished writing it.
 
-        word_list = list(json_response['words'])
-        # Remove duplicates from the word_list
-        word_list = list(dict.fromkeys(word_list))
+        Args:
+            topic (str): The topic for which to retrieve the words.
+            existing_words (Optional[List], optional): A list of existing words to avoid repeating. Defaults to None.
+            model (Optional[str], optional): The OpenAI model to use for generating the words. Defaults to 'gpt-3.5-turbo-1106'.
 
-        # Remove existing words
-        if existing_words is not None:
-            word_list = [
-                word for word in word_list if word not in existing_words]
+        Yields:
+            str: The next spelling bee word, in the order the model ranked them.
+        """
+        parser = _WordListStreamParser()
+        seen = self._word_deduper(existing_words)
+        limit = self._word_list_limit(existing_words)
+        for text in self._stream_chat_completion(
+            task="get_word_list",
+            model=model,
+            response_format={"type": "json_object"},
+            messages=self._word_list_messages(topic, existing_words),
+        ):
+            yield from self._new_words(parser.feed(text), seen, limit)
+            if limit is not None and len(seen) >= limit:
+                return
 
-        return word_list
+        yield from self._new_words(self._remaining_words(parser, seen), seen, limit)
 
     def get_word_details(self, word: str, topic: str) -> WordInfo:
         """
         Retrieves the details of a word using different AI models.
+        Complete results are served from and stored in the shared word info cache.
 
         Args:
             word (str): The word to retrieve details for.
@@ -158,35 +426,66 @@ class SpellTrain2AI:
         Raises:
             Exception: If an error occurs while retrieving word details from any of the models.
         """
+        # The cache is read inside the flight, so a caller that makes the call again reads it too
+        def fetch_word_details():
+            cached_word_details = self._cached_word_details(word, topic)
+            if cached_word_details is not None:
+                return cached_word_details
 
-        models = [
-            ("Google Gemini AI", self._get_word_details_from_GEMINI_AI, "gemini-pro"),
-            ("OpenAI gpt-3.5-turbo-1106",
-             self._get_word_details_from_OPENAI, self.openai_model),
-            ("OpenAI gpt-4-1106-preview",
-             self._get_word_details_from_OPENAI, self.openai_gpt4_model),
-        ]
+            word_details = self._fetch_word_details(word, topic)
+            self._cache_word_details(word, topic, word_details)
+            return word_details
+
+        return self._single_flight(self._word_details_key(word, topic), fetch_word_details)
+
+    def complete_word_details(self, word: str, topic: str, word_details: WordInfo) -> WordInfo:
+        """
+        Fills in only the unknown fields of partial word details, with one request per field
+        (or one combined request, see `word_fields_mode`). Known fields are kept as they are, and
+        since they may have been written by a user the result is not cached.
+
+        Args:
+            word (str): The word to complete the details of.
+            topic (str): The topic associated with the word.
+            word_details (WordInfo): The details known so far, with the missing fields empty.
+
+        Returns:
+            WordInfo: The completed details, or the cached complete details of the word.
+        """
+        cached_word_details = self._cached_word_details(word, topic)
+        if cached_word_details is not None:
+            return cached_word_details
+
+        return self._refetch_word_details(word=word, merged_word_details=word_details.model_copy(), topic=topic)
+
+    def _fetch_word_details(self, word: str, topic: str) -> WordInfo:
+        models = self._word_details_models()
 
         error_words = []
 
         for model_name, get_details_func, model in models:
+            if not has_time(self.min_call_budget):
+                print(f"No time left to try {model_name}.")
+                break
             print(f"\nTopic: {topic}\nModel: {model_name}")
+            start = time.perf_counter()
             try:
-                word_details: WordInfo = get_details_func(
-                    word, topic, model)
+                word_details: WordInfo = self._with_local_pronunciation(
+                    word, get_details_func(word, topic, model))
 
                 undesired_results = self._validate_word_info(word_details)
+                self._record_health(model, len(undesired_results) == 0, start)
 
                 if len(undesired_results) == 0:
-                    print('Word: ', word.encode('utf-8'))
-                    word_details.alternatePronunciation = word_details.alternatePronunciation
-                    pprint(word_details)
-                    print(f"{model_name} succeeded.")
+                    self._print_word_details(word, word_details, model_name)
                     return word_details
 
                 print(f"{model_name} failed the first time.")
                 error_words.append(word_details)
             except Exception as e:
+                # Running out of the request's time says nothing about the model
+                if not expired():
+                    self._record_health(model, False, start)
                 print(e)
                 print(f"{model_name} failed.")
                 continue
@@ -195,137 +494,75 @@ class SpellTrain2AI:
         # Refetch if there are unknown fields
         return self._refetch_word_details(word=word, merged_word_details=merged_word_details, topic=topic)
 
-    def _get_word_usage(self, word: str, topic: str) -> str:
-        prompt = f'Please provide a short sentence using the word "{word}" that is related to the topic "{topic}".'
-        client = self._openai_client()
-
-        messages = [
-            {'role': 'system', 'content': 'You are a helpful dictionary assistant designed to output a sentence using a word.'},
-            {'role': 'system', 'content': 'The JSON response should be in the following format: {"usage": "Your sentence here."}'},
-            {'role': 'system', 'content': 'The sentence should be concise and contain less than 7 words.'},
-            {'role': 'system', 'content': 'If you are unsure, try to provide the most likely sentence based on the word itself.'},
-            {'role': 'user', 'content': prompt},
-        ]
-        try:
-            completion = client.chat.completions.create(
-                messages=messages,
-                model=self.openai_model,
-                response_format={"type": "json_object"},
-                temperature=0
-            )
-        except Exception as e:
-            print(e)
-            raise HTTPException(
-                status_code=500, detail="Error getting word usage. Please try again later.")
-
-        self._print_cost(completion)
-
-        json_response = json.loads(completion.choices[0].message.content)
-
-        return json_response['usage']
-
-    def _get_word_pronunciation(self, word: str, topic: str) -> str:
-        prompt = f'Provide the International Phonetic Alphabet (IPA) pronunciation of the word "{word}" related to {topic}.'
-        client = self._openai_client()
-
-        messages = [
-            {'role': 'system',
-                'content': 'You are a helpful dictionary assistant designed to output the International Phonetic Alphabet (IPA) pronunciation of a word.'},
-            {'role': 'system', 'content': 'The JSON response should be in the following format: {"alternatePronunciation": "result here"}'},
-            {'role': 'system', 'content': 'If you are unsure, try to provide the most likely pronunciation based on the word itself.'},
-            {'role': 'user', 'content': prompt},
-        ]
-        try:
-            completion = client.chat.completions.create(
-                messages=messages,
-                model=self.openai_model,
-                response_format={"type": "json_object"},
-                temperature=0
-            )
-        except Exception as e:
-            print(e)
-            raise HTTPException(
-                status_code=500, detail="Error getting word pronunciation. Please try again later.")
-
-        self._print_cost(completion)
-
-        json_response = json.loads(completion.choices[0].message.content)
-
-        return json_response['alternatePronunciation']
-
-    def _get_language_of_origin(self, word: str, topic: str) -> str:
-        prompt = f'What is the language of origin for the word "{word}" related to {topic}?'
-        client = self._openai_client()
-
-        messages = [
-            {'role': 'system', 'content': 'You are a helpful dictionary assistant designed to output the root origin of a word.'},
-            {'role': 'system', 'content': 'Here are some examples of root origins: Latin, Greek, French, etc. Please do not provide anything else except the name of the country or language of origin.'},
-            {'role': 'system', 'content': 'If you are unsure, try to provide the most likely language of origin based on the word itself.'},
-            {'role': 'system', 'content': 'The JSON response should be in the following format: {"languageOrigin": "result here"}'},
-            {'role': 'user', 'content': prompt},
-        ]
-
-        try:
-            completion = client.chat.completions.create(
-                messages=messages,
-                model=self.openai_model,
-                response_format={"type": "json_object"},
-                temperature=0
-            )
-        except Exception as e:
-            print(e)
-            raise HTTPException(
-                status_code=500, detail="Error getting word origin. Please try again later.")
+    def get_words_details(self, words: List[str], topic: str) -> List[WordInfo]:
+        """
+        Retrieves the details of many words related to the same topic, several words per request.
 
-        self._print_cost(completion)
+        Words that come back missing or with unknown fields are split into smaller batches and
+        asked again; a word that still fails on its own falls back to get_word_details.
 
-        json_response = json.loads(completion.choices[0].message.content)
+        Args:
+            words (List[str]): The words to retrieve details for.
+            topic (str): The topic associated with the words.
 
-        return json_response['languageOrigin']
+        Returns:
+            List[WordInfo]: The details of each word, in the same order as `words`.
+        """
+        results = self._cached_words_details(words, topic)
+        for batch in self._batches([word for word in words if word not in results]):
+            self._get_words_details_batch(batch, topic, results)
 
-    def _get_word_definition(self, word: str, topic: str) -> str:
-        prompt = f'Provide a simple definition within 7 words for the word "{word}" related to {topic}.'
-        client = self._openai_client()
+        return [results[word] for word in words]
 
-        messages = [
-            {'role': 'system', 'content': 'You are a helpful dictionary assistant designed to output a simple definition for a word.'},
-            {'role': 'system', 'content': 'The JSON response should be in the following format: {"definition": "result here"}'},
-            {'role': 'system', 'content': 'If you are unsure, try to provide the most likely definition based on the word itself.'},
-            {'role': 'system', 'content': 'The definition should be concise and contain less than 7 words.'},
-            {'role': 'user', 'content': prompt},
-        ]
+    def _get_words_details_batch(self, words: List[str], topic: str, results: dict):
+        if len(words) == 1:
+            results[words[0]] = self.get_word_details(words[0], topic)
+            return
 
         try:
-            completion = client.chat.completions.create(
-                messages=messages,
+            completion = self._chat_completion(
+                task="get_words_details",
+                messages=self._words_details_messages(words, topic),
                 model=self.openai_model,
                 response_format={"type": "json_object"},
-                temperature=0
             )
+            batch_results = self._parse_words_details(
+                completion.choices[0].message.content, words)
+            for word, word_details in batch_results.items():
+                self._cache_word_details(word, topic, word_details)
+            results.update(batch_results)
         except Exception as e:
             print(e)
-            raise HTTPException(
-                status_code=500, detail="Error getting word definition. Please try again later.")
+            print(f"Failed to fetch details for {len(words)} words at once.")
 
-        self._print_cost(completion)
+        # Split the words that failed into smaller batches
+        missing = [word for word in words if word not in results]
+        for batch in self._split(missing):
+            self._get_words_details_batch(batch, topic, results)
 
-        json_response = json.loads(completion.choices[0].message.content)
+    def _get_word_field(self, field: str, word: str, topic: str) -> str:
+        """
+        Retrieves a single field of the word details from OpenAI.
 
-        return json_response['definition']
+        Args:
+            field (str): The WordInfo field to retrieve, e.g. "usage".
+            word (str): The word for which to retrieve the field.
+            topic (str): The topic related to the word.
 
-    def _get_word_parts_of_speech(self, word: str, topic: str) -> str:
-        prompt = f'Provide the parts of speech for the word "{word}" related to {topic}.'
-        client = self._openai_client()
+        Returns:
+            str: The value of the field.
 
-        messages = [
-            {'role': 'system', 'content': 'You are a helpful dictionary assistant designed to output the parts of speech for a word.'},
-            {'role': 'system', 'content': 'The JSON response should be in the following format: {"partsOfSpeech": "result here"}'},
-            {'role': 'system', 'content': 'If you are unsure, try to provide the most likely parts of speech based on the word itself.'},
-            {'role': 'user', 'content': prompt},
-        ]
+        Raises:
+            HTTPException: If there is an error retrieving the field.
+        """
+        local_value = self._local_word_field(field, word)
+        if local_value is not None:
+            return local_value
 
+        messages = self._word_field_messages(field, word, topic)
         try:
-            completion = client.chat.completions.create(
+            completion = self._chat_completion(
+                task="word_field",
                 messages=messages,
                 model=self.openai_model,
                 response_format={"type": "json_object"},
@@ -334,27 +571,39 @@ class SpellTrain2AI:
         except Exception as e:
             print(e)
             raise HTTPException(
-                status_code=500, detail="Error getting word parts of speech. Please try again later.")
-
-        self._print_cost(completion)
+                status_code=500, detail=self._WORD_FIELD_PROMPTS[field]["error"])
 
         json_response = json.loads(completion.choices[0].message.content)
 
-        return json_response['partsOfSpeech']
+        return json_response[field]
 
-    def _get_root_origin(self, word: str, topic: str) -> str:
-        prompt = f'Provide a short sentence within 7 words that describes the Etymology of the word "{word}" related to "{topic}".'
-        client = self._openai_client()
-
-        messages = [
-            {'role': 'system', 'content': 'You are a helpful dictionary assistant designed to output the Etymology of a word.'},
-            {'role': 'system', 'content': 'The JSON response should be in the following format: {"rootOrigin": "result here"}'},
-            {'role': 'system', 'content': 'If you are unsure, try to provide the most likely Etymology based on the word itself.'},
-            {'role': 'user', 'content': prompt},
-        ]
+    def _get_word_fields(self, fields: List[str], word: str, topic: str) -> dict:
+        """
+        Retrieves several fields of the word details, either concurrently with one request per
+        field or with a single combined request, depending on `word_fields_mode`.
 
+        Returns:
+            dict: The requested fields mapped to their values.
+        """
+        if self.word_fields_mode == "combined":
+            return self._get_combined_word_fields(fields, word, topic)
+
+        concurrency = min(max(self.word_fields_concurrency, 1), len(fields))
+        if concurrency <= 1:
+            return {field: self._get_word_field(field, word, topic) for field in fields}
+
+        # Each thread runs in a copy of this context, to keep the deadline and AI priority
+        contexts = [copy_context() for _ in fields]
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            values = executor.map(
+                lambda field, context: context.run(self._get_word_field, field, word, topic), fields, contexts)
+            return dict(zip(fields, values))
+
+    def _get_combined_word_fields(self, fields: List[str], word: str, topic: str) -> dict:
+        messages = self._word_fields_messages(fields, word, topic)
         try:
-            completion = client.chat.completions.create(
+            completion = self._chat_completion(
+                task="word_fields",
                 messages=messages,
                 model=self.openai_model,
                 response_format={"type": "json_object"},
@@ -363,34 +612,25 @@ class SpellTrain2AI:
         except Exception as e:
             print(e)
             raise HTTPException(
-                status_code=500, detail="Error getting word root origin. Please try again later.")
-
-        self._print_cost(completion)
-
-        json_response = json.loads(completion.choices[0].message.content)
+                status_code=500, detail="Error getting word details. Please try again later.")
 
-        return json_response['rootOrigin']
+        return self._parse_word_fields(completion.choices[0].message.content, fields)
 
     def _openai_client(self) -> OpenAI:
         """
-        Returns an instance of the OpenAI client.
+        Returns the shared OpenAI client from the process-wide client registry.
 
         Raises:
             HTTPException: If there is an error configuring the OpenAI API Key.
 
         Returns:
-            OpenAI: An instance of the OpenAI client.
+            OpenAI: The pooled OpenAI client.
         """
-        try:
-            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            return client
-        except OpenAIError:
-            raise HTTPException(
-                status_code=500, detail="Error configuring OpenAI API Key")
+        return client_registry.openai()
 
     def _google_gemini_client(self, model: str = 'gemini-pro') -> genai.GenerativeModel:
         """
-        Initializes and configures the Google Gemini client.
+        Returns the shared Google Gemini client from the process-wide client registry.
 
         Args:
             model (str): The model to use for the Gemini client. Defaults to 'gemini-pro'.
@@ -401,14 +641,7 @@ class SpellTrain2AI:
         Raises:
             HTTPException: If there is an error configuring the Google Gemini API Key.
         """
-        try:
-            genai.configure(api_key=os.getenv("GOOGLE_GEMINI_API_KEY"))
-            gemini = genai.GenerativeModel(model)
-
-            return gemini
-        except Exception:
-            raise HTTPException(
-                status_code=500, detail="Error configuring Google Gemini API Key")
+        return client_registry.gemini(model)
 
     def _get_word_details_from_GEMINI_AI(self, word: str, topic: str, default_model='gemini-pro') -> WordInfo:
         """
@@ -426,32 +659,20 @@ class SpellTrain2AI:
             Exception: If an error occurs during the retrieval process.
         """
         client = self._google_gemini_client(model=default_model)
-        prompt = f'The word "{word}" is related to the topic "{topic}". Provide information about this word: "{word}". The JSON response should be in the following format: {{"word": "word", "definition": "simple definition within 7 words", "rootOrigin": "The root origin of a word refers to its earliest reconstructed ancestral form, revealing core historical meaning", "usage": "A short sentence about {topic} that includes the word {word}", "languageOrigin": "country where the the word comes from", "partsOfSpeech": "parts of speech", "alternatePronunciation": "International Phonetic Alphabet (IPA) pronunciation of the word."}}'
+        prompt = self._gemini_word_details_prompt(word, topic)
 
         for i in range(self._RETRY_COUNT):
+            response = None
             try:
-                response = client.generate_content(
-                    prompt, generation_config={"temperature": 0})
-
-                # Extract JSON response starting from the first '{' to the last '}'
-                json_text = response.text[response.text.find(
-                    '{'):response.text.rfind('}') + 1]
+                response = self._generate_content(
+                    client, prompt, task="get_word_details", generation_config={"temperature": 0})
 
-                json_response = json.loads(json_text)
-
-                # Convert partsOfSpeech to string (noun, verb, etc.)
-                if isinstance(json_response['partsOfSpeech'], list):
-                    json_response['partsOfSpeech'] = ', '.join(
-                        json_response['partsOfSpeech'])
-
-                # Convert to WordInfo type
-                word_info = WordInfo(**json_response)
-
-                return word_info
+                return self._parse_gemini_word_details(response.text)
             except Exception as e:
                 print("Gemini Error: ", e)
-                print(response.prompt_feedback)
-                return self.default_word_details
+                if response is not None:
+                    print(response.prompt_feedback)
+                return self.default_word_details.model_copy()
 
     def _get_word_details_from_OPENAI(self, word: str, topic: str, model: str) -> WordInfo:
         """
@@ -468,111 +689,1203 @@ class SpellTrain2AI:
         Raises:
             Exception: If there is an error parsing the JSON response.
         """
-        client = self._openai_client()
+        messages = self._openai_word_details_messages(word, topic)
 
-        user_prompt = f'The word "{word}" is related to the topic "{topic}". Provide information about this word: "{word}".'
-
-        messages = [
-            {'role': 'system', 'content': 'You are a helpful dictionary assistant designed to output JSON.'},
-            {'role': 'system',
-                'content': 'The JSON response should be in the following format: {"word": "word", "definition": "simple definition within 7 words", "rootOrigin": "The root origin of a word refers to its earliest reconstructed ancestral form, revealing core historical meaning", "usage": "A short sentence about {topic} that includes the word {word}", "languageOrigin": "country where the the word comes from", "partsOfSpeech": "parts of speech", "alternatePronunciation": "International Phonetic Alphabet (IPA) pronunciation of the word.}'},
-            {'role': 'system', 'content': 'If you have no result for a key-value pairs, leave it as "Unknown"'},
-            {'role': 'user', 'content': user_prompt},
-        ]
-
-        completion = client.chat.completions.create(
+        completion = self._chat_completion(
+            task="get_word_details",
             messages=messages,
             model=model,
             response_format={"type": "json_object"},
         )
 
-        self._print_cost(completion)
+        return self._parse_openai_word_details(completion.choices[0].message.content)
 
-        json_response = dict(json.loads(completion.choices[0].message.content))
+    def _refetch_word_details(self, word: str, merged_word_details: WordInfo, topic: str):
+        self._with_local_pronunciation(word, merged_word_details)
+        cnt = 0
+        while cnt < self._RETRY_COUNT:
+            unknown_fields = self._validate_word_info(merged_word_details)
+            # If all fields are known, return the merged word details
+            if len(unknown_fields) == 0:
+                return merged_word_details
 
-        # Try to parse json_response to WordInfo
-        try:
-            word_info = WordInfo(**json_response)
+            if not has_time(self.min_call_budget):
+                print(f"No time left to re-fetch {unknown_fields} for word: {word}.")
+                break
 
-            return word_info
-        except Exception as e:
-            print(e)
-            print("Failed to parse json_response to WordInfo.")
-            return self.default_word_details
+            print(
+                f"Re-fetching word details...{cnt} times. Unknown fields: {unknown_fields} for word: {word}. Topic: {topic}.")
+            fields = [
+                field for field in self._WORD_FIELD_PROMPTS if field in unknown_fields]
+            try:
+                word_fields = self._get_word_fields(fields, word, topic)
+            except Exception:
+                if has_time(self.min_call_budget):
+                    raise
+                print(f"Ran out of time re-fetching {fields} for word: {word}.")
+                break
+            for field, value in word_fields.items():
+                setattr(merged_word_details, field, value)
 
-    def _print_cost(self, completion):
-        """
-        Prints the total tokens used and the corresponding cost.
+            cnt += 1
 
-        Parameters:
-        - completion: The completion object.
+        return merged_word_details
 
-        Returns:
-        None
+    def _word_details_models(self):
         """
-        # print the total tokens used
-        print(completion.usage.total_tokens)
-        total_cost = (completion.usage.total_tokens / 1000) * 0.0010
-        print(f"total cost: ${total_cost}")
-
-    def _merge_results(self, fail_results: List[WordInfo]):
+        Returns the (model name, details function, model) tuples tried by get_word_details, in order.
+        The provider health tracker moves failing or slow models back and skips tripped ones.
         """
-        Merges the results from failed word lookups into a combined result.
+        models = []
+        configured_models = [model.strip() for model in self.word_details_models]
+        if self.provider_health is not None:
+            configured_models = self.provider_health.order(configured_models)
+        for model in configured_models:
+            if model.startswith("gemini"):
+                models.append(
+                    ("Google Gemini AI", self._get_word_details_from_GEMINI_AI, model))
+            else:
+                models.append(
+                    (f"OpenAI {model}", self._get_word_details_from_OPENAI, model))
+        return models
+
+    def _record_health(self, model: str, success: bool, start: float):
+        if self.provider_health is not None:
+            self.provider_health.record(
+                model, success, time.perf_counter() - start)
+
+    def _evaluate_topic_messages(self, topic: str) -> List[dict]:
+        user_prompt = f'Is "{topic}" a valid Spelling Bee topic? Why or why not?'
 
-        Args:
-            fail_results (List[WordInfo]): A list of WordInfo objects containing the failed word lookups.
+        return [
+            {'role': 'system', 'content': 'You are a helpful dictionary assistant that evaluates whether a topic is a valid Spelling Bee topic.'},
+            {'role': 'system', 'content': 'A valid spelling bee topic encompasses a clear category or subject area with enough scope and depth to generate an appropriate word list, but avoids overly niche or sensitive subjects.'},
+            {'role': 'system',
+                'content': 'The JSON response should be in the following format: {"isValid": true, "reason": "why is a suitable spelling bee topic"} or {"isValid": false, "reason": "why is not a suitable spelling bee topic"}'},
+            {'role': 'system', 'content': 'The reason should be brief and clear.'},
+            {'role': 'user', 'content': user_prompt},
+        ]
 
-        Returns:
-            WordInfo: The combined result of the failed word lookups.
-        """
-        invalid_fields = ["", "unknown", "n/a", "none"]
-        combined_results = self.default_word_details
+    def _parse_evaluated_topic(self, content: str) -> EvaluatedTopic:
+        json_response = json.loads(content)
 
-        for word in fail_results:
-            if word.definition.lower() not in invalid_fields:
-                combined_results.definition = word.definition
-            if word.rootOrigin.lower() not in invalid_fields:
-                combined_results.rootOrigin = word.rootOrigin
-            if word.usage.lower() not in invalid_fields:
-                combined_results.usage = word.usage
-            if word.languageOrigin.lower() not in invalid_fields:
-                combined_results.languageOrigin = word.languageOrigin
-            if word.partsOfSpeech.lower() not in invalid_fields:
-                combined_results.partsOfSpeech = word.partsOfSpeech
-            if word.alternatePronunciation.lower() not in invalid_fields:
-                combined_results.alternatePronunciation = combined_results.alternatePronunciation
-        print("FINAL RESULT: ", combined_results)
-        return combined_results
+        # Convert to EvaluatedTopic type and return
+        return EvaluatedTopic.model_validate(json_response)
 
-    def _validate_word_info(self, word: WordInfo):
-        """
-        Validates the given WordInfo object and returns a list of unknown fields.
+    def _word_topic_prompt(self, word: str, topic: str) -> str:
+        return 'Is the word "{}" related to the topic "{}" and spelled correctly? The JSON response should be in the following format: {{"isValid": "True"}} or {{"isValid": "False"}}.'.format(
+            word, topic)
 
-        Args:
-            word (WordInfo): The WordInfo object to be validated.
+    def _parse_evaluated_input(self, text: str) -> EvaluatedInput:
+        # extract text from "{" to "}"
+        json_response = json.loads(text[text.find("{"):text.find("}")+1])
 
-        Returns:
-            list: A list of unknown fields in the WordInfo object.
+        return EvaluatedInput.model_validate(json_response)
+
+    def _words_topic_messages(self, words: List[str], topic: str) -> List[dict]:
+        user_prompt = f'For each of the words {json.dumps(words)}, is the word related to the topic "{topic}" and spelled correctly?'
+
+        return [
+            {'role': 'system', 'content': 'You are a helpful dictionary assistant that evaluates whether words are related to a Spelling Bee topic.'},
+            {'role': 'system',
+                'content': 'The JSON response should be in the following format: {"words": [{"word": "word", "isValid": true}]}'},
+            {'role': 'system', 'content': 'Provide exactly one entry for every word, spelled exactly as given.'},
+            {'role': 'user', 'content': user_prompt},
+        ]
+
+    def _parse_words_topic(self, content: str, words: List[str]) -> dict:
         """
-        invalid_values = ["", "unknown", "n/a", "none"]
-        unknown_fields = []
+        Parses a batched word-topic response.
 
-        if word.definition.lower() in invalid_values:
-            unknown_fields.append("definition")
-        if word.rootOrigin.lower() in invalid_values:
-            unknown_fields.append("rootOrigin")
-        if word.usage.lower() in invalid_values:
-            unknown_fields.append("usage")
-        if word.languageOrigin.lower() in invalid_values:
-            unknown_fields.append("languageOrigin")
-        if word.partsOfSpeech.lower() in invalid_values:
-            unknown_fields.append("partsOfSpeech")
-        if word.alternatePronunciation.lower() in invalid_values:
-            unknown_fields.append("alternatePronunciation")
+        Returns:
+            dict: The normalized requested words mapped to their EvaluatedInput. Words missing from the response are left out.
+        """
+        requested = {normalize(word) for word in words}
+        results = {}
 
-        return unknown_fields
+        for item in json.loads(content).get('words', []):
+            try:
+                word = normalize(str(item.get('word', '')))
+                if word not in requested:
+                    continue
 
-    def _refetch_word_details(self, word: str, merged_word_details: WordInfo, topic: str):
+                results[word] = EvaluatedInput(isValid=item['isValid'])
+            except Exception as e:
+                print(e)
+
+        return results
+
+    def _single_flight(self, key: tuple, call):
+        if self.single_flight is None:
+            return call()
+        return self.single_flight.do(key, call)
+
+    def _word_details_key(self, word: str, topic: str) -> tuple:
+        return ("get_word_details", normalize(word), normalize(topic))
+
+    def _word_list_key(self, topic: str, existing_words: Optional[List], model: str) -> tuple:
+        # No existing words and an empty list ask for different numbers of words
+        return ("get_word_list", normalize(topic), model,
+                None if existing_words is None else tuple(existing_words))
+
+    def _word_list_messages(self, topic: str, existing_words: Optional[List] = None) -> List[dict]:
+        count = self._NUMB_OF_WORDS
+        if existing_words is not None:
+            count = math.ceil(self._NUMB_OF_EXTRA_WORDS *
+                              self.more_words_overrequest)
+        user_prompt = f'Provide {count} spelling bee words in English without dialect/accent related to the topic: {topic}.'
+
+        messages = [
+            {'role': 'system', 'content': 'You are a helpful dictionary. You are asked to provide a list of words on a topic.'},
+            {'role': 'system',
+                'content': 'The JSON response should be in the following format: {"words": ["word1", "word2", "word3"]}'},
+            {'role': 'system', 'content': 'All the key-value pairs cannot be empty and the list of words should not contain any duplicates.'},
+            {'role': 'system', 'content': 'All words should be single words and not phrases.'},
+            {'role': 'system', 'content': 'Order of the words in level of difficulty is important.'},
+            {'role': 'user', 'content': user_prompt},
+        ]
+
+        exclusions = self._word_list_exclusions(existing_words)
+        if exclusions:
+            messages.append(
+                {'role': 'system', 'content': f'Do not repeat these words: {", ".join(exclusions)}'})
+
+        return messages
+
+    def _word_list_exclusions(self, existing_words: Optional[List]) -> List[str]:
+        """
+        Picks the existing words sent to the model to avoid: the first ones, which it is most
+        likely to suggest again for the topic, and the latest ones.
+        """
+        existing_words = list(existing_words or [])
+        if len(existing_words) <= self.more_words_exclusions:
+            return existing_words
+        first = self.more_words_exclusions // 2
+        latest = self.more_words_exclusions - first
+        return existing_words[:first] + (existing_words[-latest:] if latest else [])
+
+    def _word_deduper(self, existing_words: Optional[List]) -> _WordDeduper:
+        # Near-identical spellings only count as repeats of words already in the list
+        return _WordDeduper(existing_words, self.duplicate_similarity if existing_words else 0)
+
+    def _word_list_limit(self, existing_words: Optional[List]) -> Optional[int]:
+        # More words are over-requested; a new list keeps every word the model gave
+        return None if existing_words is None else self._NUMB_OF_EXTRA_WORDS
+
+    def _parse_word_list(self, content: str, existing_words: Optional[List] = None) -> list[str]:
+        json_response = json.loads(content)
+
+        # Remove duplicates and existing words, and the extra words asked for
+        return self._new_words(
+            list(json_response['words']),
+            self._word_deduper(existing_words),
+            self._word_list_limit(existing_words))
+
+    def _new_words(self, words: List[str], seen: _WordDeduper, limit: Optional[int] = None) -> List[str]:
+        new_words = []
+        for word in words:
+            if limit is not None and len(seen) >= limit:
+                break
+            if seen.add(word):
+                new_words.append(word)
+        return new_words
+
+    def _remaining_words(self, parser: _WordListStreamParser, seen: _WordDeduper) -> List[str]:
+        # Parse the whole answer in case the stream parser missed words, e.g. in an unexpected layout
+        try:
+            return self._parse_word_list(parser.content)
+        except Exception as e:
+            if not seen:
+                print(e)
+                raise HTTPException(
+                    status_code=500, detail="Error getting word list. Please try again later.")
+            return []
+
+    def _word_field_messages(self, field: str, word: str, topic: str) -> List[dict]:
+        field_prompt = self._WORD_FIELD_PROMPTS[field]
+        messages = [{'role': 'system', 'content': content}
+                    for content in field_prompt["system"]]
+        messages.append(
+            {'role': 'user', 'content': field_prompt["prompt"].format(word=word, topic=topic)})
+
+        return messages
+
+    def _word_fields_messages(self, fields: List[str], word: str, topic: str) -> List[dict]:
+        response_format = json.dumps(
+            {field: self._WORD_FIELD_FORMATS[field] for field in fields})
+
+        return [
+            {'role': 'system', 'content': 'You are a helpful dictionary assistant designed to output JSON.'},
+            {'role': 'system',
+                'content': f'The JSON response should be in the following format: {response_format}'},
+            {'role': 'system', 'content': 'If you are unsure, try to provide the most likely values based on the word itself.'},
+            {'role': 'user', 'content': f'The word "{word}" is related to the topic "{topic}". Provide information about this word: "{word}".'},
+        ]
+
+    def _parse_word_fields(self, content: str, fields: List[str]) -> dict:
+        json_response = json.loads(content)
+        if isinstance(json_response.get('partsOfSpeech'), list):
+            json_response['partsOfSpeech'] = ', '.join(
+                json_response['partsOfSpeech'])
+
+        # Fields left out of the response stay unknown and are asked again
+        return {field: str(json_response[field]) for field in fields if field in json_response}
+
+    def _gemini_word_details_prompt(self, word: str, topic: str) -> str:
+        return f'The word "{word}" is related to the topic "{topic}". Provide information about this word: "{word}". The JSON response should be in the following format: {{"word": "word", "definition": "simple definition within 7 words", "rootOrigin": "The root origin of a word refers to its earliest reconstructed ancestral form, revealing core historical meaning", "usage": "A short sentence about {topic} that includes the word {word}", "languageOrigin": "country where the the word comes from", "partsOfSpeech": "parts of speech", "alternatePronunciation": "International Phonetic Alphabet (IPA) pronunciation of the word."}}'
+
+    def _parse_gemini_word_details(self, text: str) -> WordInfo:
+        # Extract JSON response starting from the first '{' to the last '}'
+        json_text = text[text.find('{'):text.rfind('}') + 1]
+
+        json_response = json.loads(json_text)
+
+        # Convert partsOfSpeech to string (noun, verb, etc.)
+        if isinstance(json_response['partsOfSpeech'], list):
+            json_response['partsOfSpeech'] = ', '.join(
+                json_response['partsOfSpeech'])
+
+        # Convert to WordInfo type
+        return WordInfo(**json_response)
+
+    def _openai_word_details_messages(self, word: str, topic: str) -> List[dict]:
+        user_prompt = f'The word "{word}" is related to the topic "{topic}". Provide information about this word: "{word}".'
+
+        return [
+            {'role': 'system', 'content': 'You are a helpful dictionary assistant designed to output JSON.'},
+            {'role': 'system',
+                'content': 'The JSON response should be in the following format: {"word": "word", "definition": "simple definition within 7 words", "rootOrigin": "The root origin of a word refers to its earliest reconstructed ancestral form, revealing core historical meaning", "usage": "A short sentence about {topic} that includes the word {word}", "languageOrigin": "country where the the word comes from", "partsOfSpeech": "parts of speech", "alternatePronunciation": "International Phonetic Alphabet (IPA) pronunciation of the word.}'},
+            {'role': 'system', 'content': 'If you have no result for a key-value pairs, leave it as "Unknown"'},
+            {'role': 'user', 'content': user_prompt},
+        ]
+
+    def _parse_openai_word_details(self, content: str) -> WordInfo:
+        json_response = dict(json.loads(content))
+
+        # Try to parse json_response to WordInfo
+        try:
+            word_info = WordInfo(**json_response)
+
+            return word_info
+        except Exception as e:
+            print(e)
+            print("Failed to parse json_response to WordInfo.")
+            return self.default_word_details.model_copy()
+
+    def _cached_validation(self, cache, *parts: str):
+        if cache is None:
+            return None
+        return cache.get(*parts)
+
+    def _cache_validation(self, cache, result: EvaluatedInput, *parts: str):
+        if cache is not None and result is not None:
+            cache.set(result, *parts,
+                      ttl=None if result.isValid else REJECTED_VALIDATION_TTL)
+
+    def _cache_words_topic(self, results: dict, topic: str):
+        for word, evaluated_input in results.items():
+            self._cache_validation(
+                self.word_topic_cache, evaluated_input, word, topic)
+
+    def _cached_word_details(self, word: str, topic: str) -> Optional[WordInfo]:
+        if self.word_info_cache is None:
+            return None
+        return self.word_info_cache.get(word, topic)
+
+    def _cached_words_details(self, words: List[str], topic: str) -> dict:
+        results = {}
+        for word in words:
+            cached_word_details = self._cached_word_details(word, topic)
+            if cached_word_details is not None:
+                results[word] = cached_word_details
+        return results
+
+    def _cache_word_details(self, word: str, topic: str, word_details: WordInfo):
+        # Only complete results are shared with other users
+        if self.word_info_cache is not None and len(self._validate_word_info(word_details)) == 0:
+            self.word_info_cache.set(word_details, word, topic)
+
+    def _cached_words_topic(self, words: List[str], topic: str) -> dict:
+        results = {}
+        for word in words:
+            cached_result = self._prechecked_word_topic(word) or self._cached_validation(
+                self.word_topic_cache, word, topic)
+            if cached_result is not None:
+                results[normalize(word)] = cached_result
+        return results
+
+    def _with_local_pronunciation(self, word: str, word_info: WordInfo) -> WordInfo:
+        # The dictionary pronunciation replaces the AI's, which is often missing or made up
+        local_value = self._local_word_field("alternatePronunciation", word)
+        if local_value is not None:
+            word_info.alternatePronunciation = local_value
+        return word_info
+
+    def _local_word_field(self, field: str, word: str) -> Optional[str]:
+        if field != "alternatePronunciation" or self.pronunciations is None:
+            return None
+        return self.pronunciations.lookup(word)
+
+    def _prechecked_word_topic(self, word: str) -> Optional[EvaluatedInput]:
+        if self.lexical_filter is None:
+            return None
+        verdict = self.lexical_filter.check(word)
+        return None if verdict is None else EvaluatedInput(isValid=verdict)
+
+    def _uncached_words_topic(self, words: List[str], results: dict) -> List[str]:
+        # One spelling per normalized word, as typed by the user
+        uncached_words = {}
+        for word in words:
+            if normalize(word) not in results:
+                uncached_words.setdefault(normalize(word), word)
+        return list(uncached_words.values())
+
+    def _words_topic_results(self, words: List[str], results: dict) -> List[EvaluatedInput]:
+        if any(results.get(normalize(word)) is None for word in words):
+            raise HTTPException(
+                status_code=500, detail="Error evaluating words. Please try again later.")
+
+        return [results[normalize(word)] for word in words]
+
+    def _batches(self, words: List[str], size: Optional[int] = None) -> List[List[str]]:
+        unique_words = list(dict.fromkeys(words))
+        size = max(size or self.words_details_batch_size, 1)
+        return [unique_words[i:i + size] for i in range(0, len(unique_words), size)]
+
+    def _split(self, words: List[str]) -> List[List[str]]:
+        half = (len(words) + 1) // 2
+        return [batch for batch in (words[:half], words[half:]) if batch]
+
+    def _words_details_messages(self, words: List[str], topic: str) -> List[dict]:
+        user_prompt = f'The words {json.dumps(words)} are related to the topic "{topic}". Provide information about each of these words.'
+
+        return [
+            {'role': 'system', 'content': 'You are a helpful dictionary assistant designed to output JSON.'},
+            {'role': 'system',
+                'content': 'The JSON response should be in the following format: {"words": [{"word": "word", "definition": "simple definition within 7 words", "rootOrigin": "The root origin of a word refers to its earliest reconstructed ancestral form, revealing core historical meaning", "usage": "A short sentence about the topic that includes the word", "languageOrigin": "country where the the word comes from", "partsOfSpeech": "parts of speech", "alternatePronunciation": "International Phonetic Alphabet (IPA) pronunciation of the word."}]}'},
+            {'role': 'system', 'content': 'Provide exactly one entry for every word, spelled exactly as given.'},
+            {'role': 'system', 'content': 'If you have no result for a key-value pairs, leave it as "Unknown"'},
+            {'role': 'user', 'content': user_prompt},
+        ]
+
+    def _parse_words_details(self, content: str, words: List[str]) -> dict:
+        """
+        Parses a batched word details response.
+
+        Returns:
+            dict: The requested words mapped to their WordInfo. Words that are missing or have unknown fields are left out.
+        """
+        requested = {word.strip().lower(): word for word in words}
+        results = {}
+
+        for item in json.loads(content).get('words', []):
+            try:
+                word = requested.get(str(item.get('word', '')).strip().lower())
+                if word is None:
+                    continue
+
+                if isinstance(item.get('partsOfSpeech'), list):
+                    item['partsOfSpeech'] = ', '.join(item['partsOfSpeech'])
+
+                word_info = self._with_local_pronunciation(
+                    word, WordInfo(**item))
+                if len(self._validate_word_info(word_info)) == 0:
+                    results[word] = word_info
+            except Exception as e:
+                print(e)
+
+        return results
+
+    def _print_word_details(self, word: str, word_details: WordInfo, model_name: str):
+        print('Word: ', word.encode('utf-8'))
+        pprint(word_details)
+        print(f"{model_name} succeeded.")
+
+    def _chat_completion(self, task: str, **kwargs):
+        """
+        Creates an OpenAI chat completion through the AI governor and records its token usage,
+        latency and outcome. Calls rejected with a 429 are retried after the governor's backoff.
+
+        Args:
+            task (str): What the completion is for, e.g. "evaluate_topic".
+            **kwargs: The arguments of `chat.completions.create`.
+        """
+        tokens = self._estimated_tokens(json.dumps(kwargs["messages"]), kwargs)
+        for attempt in range(self.rate_limit_retries + 1):
+            check_deadline()
+            try:
+                with ai_governor.slot("openai", tokens) as slot:
+                    with usage_recorder.track("openai", kwargs["model"], task) as usage:
+                        completion = ai_backend.chat_completion(
+                            task, kwargs, lambda **request: self._openai_client().chat.completions.create(
+                                **request, **self._openai_timeout()))
+                        usage.add_completion(completion)
+                    slot.tokens = usage.promptTokens + usage.completionTokens
+                return completion
+            except Exception as e:
+                if attempt == self.rate_limit_retries or not is_rate_limit_error(e):
+                    raise
+
+    def _stream_chat_completion(self, task: str, **kwargs) -> Iterator[str]:
+        """
+        Streams an OpenAI chat completion through the AI governor, yielding the text as it
+        arrives. The call holds its governor slot until the stream ends. Streamed chunks carry
+        no token counts, so the usage is estimated from the text.
+
+        Args:
+            task (str): What the completion is for, e.g. "get_word_list".
+            **kwargs: The arguments of `chat.completions.create`.
+        """
+        prompt = json.dumps(kwargs["messages"])
+        tokens = self._estimated_tokens(prompt, kwargs)
+        for attempt in range(self.rate_limit_retries + 1):
+            check_deadline()
+            streamed = False
+            try:
+                with ai_governor.slot("openai", tokens) as slot:
+                    with usage_recorder.track("openai", kwargs["model"], task) as usage:
+                        content = ""
+                        try:
+                            stream = ai_backend.stream_chat_completion(
+                                task, kwargs, lambda **request: self._openai_client().chat.completions.create(
+                                    **request, **self._openai_timeout()))
+                            for chunk in stream:
+                                text = chunk.choices[0].delta.content if chunk.choices else None
+                                if text:
+                                    streamed = True
+                                    content += text
+                                    yield text
+                        finally:
+                            usage.add_text(prompt, content)
+                    slot.tokens = usage.promptTokens + usage.completionTokens
+                return
+            except Exception as e:
+                # Text already handed out cannot be taken back, so only retry before the first chunk
+                if streamed or attempt == self.rate_limit_retries or not is_rate_limit_error(e):
+                    raise
+
+    def _generate_content(self, client: genai.GenerativeModel, prompt: str, task: str, **kwargs):
+        """
+        Generates Gemini content through the AI governor and records its estimated token usage,
+        latency and outcome. Calls rejected with a 429 are retried after the governor's backoff.
+
+        Args:
+            client (genai.GenerativeModel): The Gemini client.
+            prompt (str): The prompt.
+            task (str): What the content is for, e.g. "evaluate_word_topic".
+            **kwargs: The arguments of `generate_content`.
+        """
+        tokens = self._estimated_tokens(prompt, kwargs)
+        for attempt in range(self.rate_limit_retries + 1):
+            check_deadline()
+            try:
+                with ai_governor.slot("gemini", tokens) as slot:
+                    with usage_recorder.track("gemini", self._gemini_model_name(client), task) as usage:
+                        response = ai_backend.generate_content(
+                            task, usage.model, prompt, kwargs, lambda prompt, **request: client.generate_content(
+                                prompt, **request, **self._gemini_timeout()))
+                        self._add_gemini_usage(usage, prompt, response)
+                    slot.tokens = usage.promptTokens + usage.completionTokens
+                return response
+            except Exception as e:
+                if attempt == self.rate_limit_retries or not is_rate_limit_error(e):
+                    raise
+
+    def _openai_timeout(self) -> dict:
+        # The time left before the request deadline bounds the call; without a deadline the
+        # client timeout applies
+        left = time_left()
+        return {} if left is None else {"timeout": left}
+
+    def _gemini_timeout(self) -> dict:
+        left = time_left()
+        return {} if left is None else {"request_options": {"timeout": left}}
+
+    def _estimated_tokens(self, prompt: str, kwargs: dict) -> int:
+        # Reserved from the governor's token budget until the actual usage is known
+        return estimate_tokens(prompt) + (kwargs.get("max_tokens") or self._EXPECTED_COMPLETION_TOKENS)
+
+    def _gemini_model_name(self, client: genai.GenerativeModel) -> str:
+        # e.g. "models/gemini-pro"
+        return getattr(client, "model_name", self.gemini_model).split("/")[-1]
+
+    def _add_gemini_usage(self, usage, prompt: str, response):
+        try:
+            text = response.text
+        except Exception:
+            # Blocked responses have no text
+            usage.outcome = "blocked"
+            text = ""
+        usage.add_text(prompt, text)
+
+    def _merge_results(self, fail_results: List[WordInfo]):
+        """
+        Merges the results from failed word lookups into a combined result.
+
+        Args:
+            fail_results (List[WordInfo]): A list of WordInfo objects containing the failed word lookups.
+
+        Returns:
+            WordInfo: The combined result of the failed word lookups.
+        """
+        invalid_fields = ["", "unknown", "n/a", "none"]
+        combined_results = self.default_word_details.model_copy()
+
+        for word in fail_results:
+            if word.definition.lower() not in invalid_fields:
+                combined_results.definition = word.definition
+            if word.rootOrigin.lower() not in invalid_fields:
+                combined_results.rootOrigin = word.rootOrigin
+            if word.usage.lower() not in invalid_fields:
+                combined_results.usage = word.usage
+            if word.languageOrigin.lower() not in invalid_fields:
+                combined_results.languageOrigin = word.languageOrigin
+            if word.partsOfSpeech.lower() not in invalid_fields:
+                combined_results.partsOfSpeech = word.partsOfSpeech
+            if word.alternatePronunciation.lower() not in invalid_fields:
+                combined_results.alternatePronunciation = word.alternatePronunciation
+        print("FINAL RESULT: ", combined_results)
+        return combined_results
+
+    def _validate_word_info(self, word: WordInfo):
+        """
+        Validates the given WordInfo object and returns a list of unknown fields.
+
+        Args:
+            word (WordInfo): The WordInfo object to be validated.
+
+        Returns:
+            list: A list of unknown fields in the WordInfo object.
+        """
+        invalid_values = ["", "unknown", "n/a", "none"]
+        unknown_fields = []
+
+        if word.definition.lower() in invalid_values:
+            unknown_fields.append("definition")
+        if word.rootOrigin.lower() in invalid_values:
+            unknown_fields.append("rootOrigin")
+        if word.usage.lower() in invalid_values:
+            unknown_fields.append("usage")
+        if word.languageOrigin.lower() in invalid_values:
+            unknown_fields.append("languageOrigin")
+        if word.partsOfSpeech.lower() in invalid_values:
+            unknown_fields.append("partsOfSpeech")
+        if word.alternatePronunciation.lower() in invalid_values:
+            unknown_fields.append("alternatePronunciation")
+
+        return unknown_fields
+
+
+class AsyncSpellTrain2AI(SpellTrain2AI):
+    """
+    asyncio counterpart of SpellTrain2AI for use inside `async def` routes.
+
+    Prompts, parsing and validation are shared with SpellTrain2AI; only the provider
+    calls differ, going through AsyncOpenAI and Gemini's async generate API so a slow
+    LLM call no longer blocks the event loop.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # "sequential" tries one model after another, "hedged" starts the next model when the
+        # current one has not answered within the hedge delay, "race" starts all models at once.
+        self.word_details_mode = os.getenv(
+            "SPELLTRAIN2_WORD_DETAILS_MODE", "sequential")
+        self.hedge_delay = float(os.getenv("SPELLTRAIN2_HEDGE_DELAY", "2"))
+
+    async def evaluate_topic(self, topic: str) -> EvaluatedTopic:
+        """
+        Evaluates whether a given topic is a valid Spelling Bee topic.
+
+        Args:
+            topic (str): The topic to be evaluated.
+
+        Returns:
+            EvaluatedTopic: An object representing the evaluation result, including whether the topic is valid and the reason.
+
+        Raises:
+            HTTPException: If there is an error evaluating the topic.
+        """
+        cached_result = await self._cached_validation(self.topic_cache, topic)
+        if cached_result is not None:
+            return cached_result
+
+        messages = self._evaluate_topic_messages(topic)
+        try:
+            completion = await self._chat_completion(
+                task="evaluate_topic",
+                messages=messages,
+                model=self.openai_model,
+                response_format={"type": "json_object"},
+                temperature=0
+            )
+        except Exception as e:
+            print(e)
+            raise HTTPException(
+                status_code=500, detail="Error evaluating Topic. Please try again later.")
+
+        evaluated_topic = self._parse_evaluated_topic(
+            completion.choices[0].message.content)
+        await self._cache_validation(self.topic_cache, evaluated_topic, topic)
+
+        return evaluated_topic
+
+    async def evaluate_word_topic(self, word: str, topic: str) -> EvaluatedInput:
+        prechecked_result = self._prechecked_word_topic(word)
+        if prechecked_result is not None:
+            return prechecked_result
+
+        cached_result = await self._cached_validation(
+            self.word_topic_cache, word, topic)
+        if cached_result is not None:
+            return cached_result
+
+        client = self._google_gemini_client()
+        prompt = self._word_topic_prompt(word, topic)
+
+        response = None
+        try:
+            response = await self._generate_content(
+                client, prompt, task="evaluate_word_topic", generation_config={"temperature": 0})
+
+            evaluated_input = self._parse_evaluated_input(response.text)
+            await self._cache_validation(
+                self.word_topic_cache, evaluated_input, word, topic)
+
+            return evaluated_input
+        except Exception as e:
+            print(e)
+            if response is not None:
+                print(response.prompt_feedback)
+
+    async def evaluate_words_topic(self, words: List[str], topic: str) -> List[EvaluatedInput]:
+        """
+        Evaluates whether many words are related to a topic and spelled correctly, several words per request.
+
+        Batches are requested concurrently. Words left out of a response are evaluated on their
+        own with evaluate_word_topic.
+
+        Args:
+            words (List[str]): The words to be evaluated.
+            topic (str): The topic the words should be related to.
+
+        Returns:
+            List[EvaluatedInput]: The verdict of each word, in the same order as `words`.
+
+        Raises:
+            HTTPException: If there is an error evaluating the words.
+        """
+        results = await self._cached_words_topic(words, topic)
+        await asyncio.gather(*(self._evaluate_words_topic_batch(batch, topic, results)
+                               for batch in self._batches(self._uncached_words_topic(words, results), self.words_topic_batch_size)))
+
+        return self._words_topic_results(words, results)
+
+    async def _evaluate_words_topic_batch(self, words: List[str], topic: str, results: dict):
+        try:
+            completion = await self._chat_completion(
+                task="evaluate_words_topic",
+                messages=self._words_topic_messages(words, topic),
+                model=self.openai_model,
+                response_format={"type": "json_object"},
+                temperature=0
+            )
+            batch_results = self._parse_words_topic(
+                completion.choices[0].message.content, words)
+            await self._cache_words_topic(batch_results, topic)
+            results.update(batch_results)
+        except Exception as e:
+            print(e)
+            print(f"Failed to evaluate {len(words)} words at once.")
+
+        missing = [word for word in words if normalize(word) not in results]
+        evaluated_inputs = await asyncio.gather(*(self.evaluate_word_topic(word, topic) for word in missing))
+        results.update(zip(map(normalize, missing), evaluated_inputs))
+
+    async def get_word_list(self, topic: str, existing_words: Optional[List] = None, model: Optional[str] = 'gpt-3.5-turbo-1106') -> list[str]:
+        """
+        Retrieves a list of spelling bee words related to the given topic.
+
+        Args:
+            topic (str): The topic for which to retrieve the words.
+            existing_words (Optional[List], optional): A list of existing words to avoid repeating. Defaults to None.
+            model (Optional[str], optional): The OpenAI model to use for generating the words. Defaults to 'gpt-3.5-turbo-1106'.
+
+        Returns:
+            list[str]: A list of spelling bee words related to the topic.
+        """
+        return await self._single_flight(
+            self._word_list_key(topic, existing_words, model),
+            lambda: self._get_word_list(topic, existing_words, model))
+
+    async def _get_word_list(self, topic: str, existing_words: Optional[List], model: str) -> list[str]:
+        messages = self._word_list_messages(topic, existing_words)
+
+        completion = await self._chat_completion(
+            task="get_word_list",
+            model=model,
+            response_format={"type": "json_object"},
+            messages=messages,
+        )
+
+        return self._parse_word_list(completion.choices[0].message.content, existing_words)
+
+    async def stream_word_list(self, topic: str, existing_words: Optional[List] = None, model: Optional[str] = 'gpt-3.5-turbo-1106') -> AsyncIterator[str]:
+        """
+        Streams the spelling bee words related to the given topic, yielding each word as soon
+        as the model has finished writing it.
+
+        Args:
+            topic (str): The topic for which to retrieve the words.
+            existing_words (Optional[List], optional): A list of existing words to avoid repeating. Defaults to None.
+            model (Optional[str], optional): The OpenAI model to use for generating the words. Defaults to 'gpt-3.5-turbo-1106'.
+
+        Yields:
+            str: The next spelling bee word, in the order the model ranked them.
+        """
+        parser = _WordListStreamParser()
+        seen = self._word_deduper(existing_words)
+        limit = self._word_list_limit(existing_words)
+        async for text in self._stream_chat_completion(
+            task="get_word_list",
+            model=model,
+            response_format={"type": "json_object"},
+            messages=self._word_list_messages(topic, existing_words),
+        ):
+            for word in self._new_words(parser.feed(text), seen, limit):
+                yield word
+            if limit is not None and len(seen) >= limit:
+                return
+
+        for word in self._new_words(self._remaining_words(parser, seen), seen, limit):
+            yield word
+
+    async def get_word_details(self, word: str, topic: str, mode: Optional[str] = None) -> WordInfo:
+        """
+        Retrieves the details of a word using different AI models.
+        Complete results are served from and stored in the shared word info cache.
+
+        Args:
+            word (str): The word to retrieve details for.
+            topic (str): The topic associated with the word.
+            mode (Optional[str], optional): "sequential", "hedged" or "race". Defaults to SPELLTRAIN2_WORD_DETAILS_MODE.
+
+        Returns:
+            WordInfo: The details of the word.
+        """
+        # The cache is read inside the flight, so a caller that makes the call again reads it too
+        async def fetch_word_details():
+            cached_word_details = await self._cached_word_details(word, topic)
+            if cached_word_details is not None:
+                return cached_word_details
+
+            word_details = await self._fetch_word_details(word, topic, mode)
+            await self._cache_word_details(word, topic, word_details)
+            return word_details
+
+        return await self._single_flight(self._word_details_key(word, topic), fetch_word_details)
+
+    async def complete_word_details(self, word: str, topic: str, word_details: WordInfo) -> WordInfo:
+        cached_word_details = await self._cached_word_details(word, topic)
+        if cached_word_details is not None:
+            return cached_word_details
+
+        return await self._refetch_word_details(word=word, merged_word_details=word_details.model_copy(), topic=topic)
+
+    async def _single_flight(self, key: tuple, call):
+        if self.single_flight is None:
+            return await call()
+        return await self.single_flight.ado(key, call)
+
+    # The cache lookups below read the database in the threadpool, off the event loop
+
+    async def _cached_validation(self, cache, *parts: str):
+        if cache is None:
+            return None
+        return await cache.aget(*parts)
+
+    async def _cache_validation(self, cache, result: EvaluatedInput, *parts: str):
+        if cache is not None and result is not None:
+            await cache.aset(result, *parts,
+                             ttl=None if result.isValid else REJECTED_VALIDATION_TTL)
+
+    async def _cache_words_topic(self, results: dict, topic: str):
+        for word, evaluated_input in results.items():
+            await self._cache_validation(
+                self.word_topic_cache, evaluated_input, word, topic)
+
+    async def _cached_word_details(self, word: str, topic: str) -> Optional[WordInfo]:
+        if self.word_info_cache is None:
+            return None
+        return await self.word_info_cache.aget(word, topic)
+
+    async def _cached_words_details(self, words: List[str], topic: str) -> dict:
+        results = {}
+        for word in words:
+            cached_word_details = await self._cached_word_details(word, topic)
+            if cached_word_details is not None:
+                results[word] = cached_word_details
+        return results
+
+    async def _cache_word_details(self, word: str, topic: str, word_details: WordInfo):
+        if self.word_info_cache is not None and len(self._validate_word_info(word_details)) == 0:
+            await self.word_info_cache.aset(word_details, word, topic)
+
+    async def _cached_words_topic(self, words: List[str], topic: str) -> dict:
+        results = {}
+        for word in words:
+            cached_result = self._prechecked_word_topic(word) or await self._cached_validation(
+                self.word_topic_cache, word, topic)
+            if cached_result is not None:
+                results[normalize(word)] = cached_result
+        return results
+
+    async def _fetch_word_details(self, word: str, topic: str, mode: Optional[str] = None) -> WordInfo:
+        mode = mode or self.word_details_mode
+        models = self._word_details_models()
+
+        if mode == "sequential":
+            word_details, error_words = await self._sequential_word_details(word, topic, models)
+        else:
+            hedge_delay = 0 if mode == "race" else self.hedge_delay
+            word_details, error_words = await self._hedged_word_details(word, topic, models, hedge_delay)
+
+        if word_details is not None:
+            return word_details
+
+        merged_word_details = self._merge_results(error_words)
+        # Refetch if there are unknown fields
+        return await self._refetch_word_details(word=word, merged_word_details=merged_word_details, topic=topic)
+
+    async def _sequential_word_details(self, word: str, topic: str, models: list):
+        """
+        Tries the models one after another.
+
+        Returns:
+            tuple: The first complete WordInfo (or None) and the partial results collected so far.
+        """
+        error_words = []
+
+        for model_name, get_details_func, model in models:
+            if not has_time(self.min_call_budget):
+                print(f"No time left to try {model_name}.")
+                break
+            word_details = await self._try_word_details(model_name, get_details_func, model, word, topic)
+            if word_details is None:
+                continue
+
+            if len(self._validate_word_info(word_details)) == 0:
+                self._print_word_details(word, word_details, model_name)
+                return word_details, error_words
+
+            print(f"{model_name} failed the first time.")
+            error_words.append(word_details)
+
+        return None, error_words
+
+    async def _hedged_word_details(self, word: str, topic: str, models: list, hedge_delay: float):
+        """
+        Starts the first model and launches the next one whenever the running ones have not
+        answered within hedge_delay seconds, or as soon as one of them fails. The first result
+        that passes _validate_word_info wins and the other requests are cancelled.
+
+        Returns:
+            tuple: The first complete WordInfo (or None) and the partial results collected so far.
+        """
+        error_words = []
+        remaining = list(models)
+        running = {}
+
+        def launch_next():
+            model_name, get_details_func, model = remaining.pop(0)
+            task = asyncio.create_task(self._try_word_details(
+                model_name, get_details_func, model, word, topic))
+            running[task] = model_name
+
+        def can_launch() -> bool:
+            return bool(remaining) and has_time(self.min_call_budget)
+
+        launch_next()
+        try:
+            while running:
+                timeout = hedge_delay if can_launch() else None
+                left = time_left()
+                if left is not None:
+                    timeout = left if timeout is None else min(timeout, left)
+                done, _ = await asyncio.wait(
+                    running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    if expired():
+                        print("No time left, cancelling the running models.")
+                        break
+                    # Hedge: nobody answered in time, start the next model alongside
+                    if can_launch():
+                        launch_next()
+                    continue
+
+                for task in done:
+                    model_name = running.pop(task)
+                    word_details = task.result()
+
+                    if word_details is not None and len(self._validate_word_info(word_details)) == 0:
+                        self._print_word_details(word, word_details, model_name)
+                        return word_details, error_words
+
+                    if word_details is not None:
+                        print(f"{model_name} failed the first time.")
+                        error_words.append(word_details)
+
+                    # Fall through to the next model right away instead of waiting for the delay
+                    if can_launch():
+                        launch_next()
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        return None, error_words
+
+    async def _try_word_details(self, model_name: str, get_details_func, model: str, word: str, topic: str) -> Optional[WordInfo]:
+        """
+        Runs one model and returns its WordInfo, or None if the call raised.
+        """
+        print(f"\nTopic: {topic}\nModel: {model_name}")
+        start = time.perf_counter()
+        try:
+            word_details = self._with_local_pronunciation(
+                word, await get_details_func(word, topic, model))
+        except Exception as e:
+            # Running out of the request's time says nothing about the model
+            if not expired():
+                self._record_health(model, False, start)
+            print(e)
+            print(f"{model_name} failed.")
+            return None
+
+        self._record_health(
+            model, len(self._validate_word_info(word_details)) == 0, start)
+        return word_details
+
+    async def get_words_details(self, words: List[str], topic: str) -> List[WordInfo]:
+        """
+        Retrieves the details of many words related to the same topic, several words per request.
+
+        Batches are requested concurrently, at most `words_details_concurrency` requests at a
+        time, so the call takes about as long as its slowest word. Words that come back missing
+        or with unknown fields are split into smaller batches and asked again; a word that still
+        fails on its own falls back to get_word_details.
+
+        Args:
+            words (List[str]): The words to retrieve details for.
+            topic (str): The topic associated with the words.
+
+        Returns:
+            List[WordInfo]: The details of each word, in the same order as `words`.
+        """
+        results = await self._cached_words_details(words, topic)
+        semaphore = asyncio.Semaphore(max(self.words_details_concurrency, 1))
+        await asyncio.gather(*(self._get_words_details_batch(batch, topic, results, semaphore)
+                               for batch in self._batches([word for word in words if word not in results])))
+
+        return [results[word] for word in words]
+
+    async def _get_words_details_batch(self, words: List[str], topic: str, results: dict, semaphore: asyncio.Semaphore):
+        # Only the requests hold the semaphore, so that split batches never wait on their parent
+        if len(words) == 1:
+            async with semaphore:
+                results[words[0]] = await self.get_word_details(words[0], topic)
+            return
+
+        try:
+            async with semaphore:
+                completion = await self._chat_completion(
+                    task="get_words_details",
+                    messages=self._words_details_messages(words, topic),
+                    model=self.openai_model,
+                    response_format={"type": "json_object"},
+                )
+            batch_results = self._parse_words_details(
+                completion.choices[0].message.content, words)
+            for word, word_details in batch_results.items():
+                await self._cache_word_details(word, topic, word_details)
+            results.update(batch_results)
+        except Exception as e:
+            print(e)
+            print(f"Failed to fetch details for {len(words)} words at once.")
+
+        # Split the words that failed into smaller batches
+        missing = [word for word in words if word not in results]
+        await asyncio.gather(*(self._get_words_details_batch(batch, topic, results, semaphore)
+                               for batch in self._split(missing)))
+
+    async def _get_word_field(self, field: str, word: str, topic: str) -> str:
+        local_value = self._local_word_field(field, word)
+        if local_value is not None:
+            return local_value
+
+        messages = self._word_field_messages(field, word, topic)
+        try:
+            completion = await self._chat_completion(
+                task="word_field",
+                messages=messages,
+                model=self.openai_model,
+                response_format={"type": "json_object"},
+                temperature=0
+            )
+        except Exception as e:
+            print(e)
+            raise HTTPException(
+                status_code=500, detail=self._WORD_FIELD_PROMPTS[field]["error"])
+
+        json_response = json.loads(completion.choices[0].message.content)
+
+        return json_response[field]
+
+    async def _get_word_fields(self, fields: List[str], word: str, topic: str) -> dict:
+        """
+        Retrieves several fields of the word details, either concurrently with one request per
+        field or with a single combined request, depending on `word_fields_mode`.
+
+        Returns:
+            dict: The requested fields mapped to their values.
+        """
+        if self.word_fields_mode == "combined":
+            return await self._get_combined_word_fields(fields, word, topic)
+
+        semaphore = asyncio.Semaphore(max(self.word_fields_concurrency, 1))
+
+        async def get_word_field(field: str) -> str:
+            async with semaphore:
+                return await self._get_word_field(field, word, topic)
+
+        values = await asyncio.gather(*(get_word_field(field) for field in fields))
+        return dict(zip(fields, values))
+
+    async def _get_combined_word_fields(self, fields: List[str], word: str, topic: str) -> dict:
+        messages = self._word_fields_messages(fields, word, topic)
+        try:
+            completion = await self._chat_completion(
+                task="word_fields",
+                messages=messages,
+                model=self.openai_model,
+                response_format={"type": "json_object"},
+                temperature=0
+            )
+        except Exception as e:
+            print(e)
+            raise HTTPException(
+                status_code=500, detail="Error getting word details. Please try again later.")
+
+        return self._parse_word_fields(completion.choices[0].message.content, fields)
+
+    async def _chat_completion(self, task: str, **kwargs):
+        tokens = self._estimated_tokens(json.dumps(kwargs["messages"]), kwargs)
+        for attempt in range(self.rate_limit_retries + 1):
+            check_deadline()
+            try:
+                async with asyncio.timeout(time_left()):
+                    async with ai_governor.aslot("openai", tokens) as slot:
+                        with usage_recorder.track("openai", kwargs["model"], task) as usage:
+                            completion = await ai_backend.achat_completion(
+                                task, kwargs, lambda **request: self._async_openai_client().chat.completions.create(
+                                    **request, **self._openai_timeout()))
+                            usage.add_completion(completion)
+                        slot.tokens = usage.promptTokens + usage.completionTokens
+                return completion
+            except Exception as e:
+                if attempt == self.rate_limit_retries or not is_rate_limit_error(e):
+                    raise
+
+    async def _stream_chat_completion(self, task: str, **kwargs) -> AsyncIterator[str]:
+        prompt = json.dumps(kwargs["messages"])
+        tokens = self._estimated_tokens(prompt, kwargs)
+        for attempt in range(self.rate_limit_retries + 1):
+            check_deadline()
+            streamed = False
+            try:
+                async with ai_governor.aslot("openai", tokens) as slot:
+                    with usage_recorder.track("openai", kwargs["model"], task) as usage:
+                        content = ""
+                        try:
+                            stream = await ai_backend.astream_chat_completion(
+                                task, kwargs, lambda **request: self._async_openai_client().chat.completions.create(
+                                    **request, **self._openai_timeout()))
+                            async for chunk in stream:
+                                text = chunk.choices[0].delta.content if chunk.choices else None
+                                if text:
+                                    streamed = True
+                                    content += text
+                                    yield text
+                        finally:
+                            usage.add_text(prompt, content)
+                    slot.tokens = usage.promptTokens + usage.completionTokens
+                return
+            except Exception as e:
+                if streamed or attempt == self.rate_limit_retries or not is_rate_limit_error(e):
+                    raise
+
+    async def _generate_content(self, client: genai.GenerativeModel, prompt: str, task: str, **kwargs):
+        tokens = self._estimated_tokens(prompt, kwargs)
+        for attempt in range(self.rate_limit_retries + 1):
+            check_deadline()
+            try:
+                async with asyncio.timeout(time_left()):
+                    async with ai_governor.aslot("gemini", tokens) as slot:
+                        with usage_recorder.track("gemini", self._gemini_model_name(client), task) as usage:
+                            response = await ai_backend.agenerate_content(
+                                task, usage.model, prompt, kwargs, lambda prompt, **request: client.generate_content_async(
+                                    prompt, **request, **self._gemini_timeout()))
+                            self._add_gemini_usage(usage, prompt, response)
+                        slot.tokens = usage.promptTokens + usage.completionTokens
+                return response
+            except Exception as e:
+                if attempt == self.rate_limit_retries or not is_rate_limit_error(e):
+                    raise
+
+    def _async_openai_client(self) -> AsyncOpenAI:
+        """
+        Returns the shared AsyncOpenAI client for the running event loop.
+
+        Raises:
+            HTTPException: If there is an error configuring the OpenAI API Key.
+
+        Returns:
+            AsyncOpenAI: The pooled AsyncOpenAI client.
+        """
+        return client_registry.async_openai()
+
+    async def _get_word_details_from_GEMINI_AI(self, word: str, topic: str, default_model='gemini-pro') -> WordInfo:
+        client = self._google_gemini_client(model=default_model)
+        prompt = self._gemini_word_details_prompt(word, topic)
+
+        response = None
+        try:
+            response = await self._generate_content(
+                client, prompt, task="get_word_details", generation_config={"temperature": 0})
+
+            return self._parse_gemini_word_details(response.text)
+        except Exception as e:
+            print("Gemini Error: ", e)
+            if response is not None:
+                print(response.prompt_feedback)
+            return self.default_word_details.model_copy()
+
+    async def _get_word_details_from_OPENAI(self, word: str, topic: str, model: str) -> WordInfo:
+        messages = self._openai_word_details_messages(word, topic)
+
+        completion = await self._chat_completion(
+            task="get_word_details",
+            messages=messages,
+            model=model,
+            response_format={"type": "json_object"},
+        )
+
+        return self._parse_openai_word_details(completion.choices[0].message.content)
+
+    async def _refetch_word_details(self, word: str, merged_word_details: WordInfo, topic: str):
+        self._with_local_pronunciation(word, merged_word_details)
         cnt = 0
         while cnt < self._RETRY_COUNT:
             unknown_fields = self._validate_word_info(merged_word_details)
@@ -580,26 +1893,23 @@ class SpellTrain2AI:
             if len(unknown_fields) == 0:
                 return merged_word_details
 
+            if not has_time(self.min_call_budget):
+                print(f"No time left to re-fetch {unknown_fields} for word: {word}.")
+                break
+
             print(
                 f"Re-fetching word details...{cnt} times. Unknown fields: {unknown_fields} for word: {word}. Topic: {topic}.")
-            if "languageOrigin" in unknown_fields:
-                merged_word_details.languageOrigin = self._get_language_of_origin(
-                    word, topic)
-            if "usage" in unknown_fields:
-                merged_word_details.usage = self._get_word_usage(
-                    word, topic)
-            if "definition" in unknown_fields:
-                merged_word_details.definition = self._get_word_definition(
-                    word, topic)
-            if "alternatePronunciation" in unknown_fields:
-                merged_word_details.alternatePronunciation = self._get_word_pronunciation(
-                    word, topic)
-            if "partsOfSpeech" in unknown_fields:
-                merged_word_details.partsOfSpeech = self._get_word_parts_of_speech(
-                    word)
-            if "rootOrigin" in unknown_fields:
-                merged_word_details.rootOrigin = self._get_root_origin(
-                    word, topic)
+            fields = [
+                field for field in self._WORD_FIELD_PROMPTS if field in unknown_fields]
+            try:
+                word_fields = await self._get_word_fields(fields, word, topic)
+            except Exception:
+                if has_time(self.min_call_budget):
+                    raise
+                print(f"Ran out of time re-fetching {fields} for word: {word}.")
+                break
+            for field, value in word_fields.items():
+                setattr(merged_word_details, field, value)
 
             cnt += 1
 
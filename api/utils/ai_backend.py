@@ -0,0 +1,440 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import threading
+import time
+import zlib
+from typing import Callable, Iterable, List, Optional
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+from api.utils.ai_usage import estimate_tokens
+from api.utils.lexicon import lexical_filter
+
+LIVE = "live"
+FAKE = "fake"
+RECORD = "record"
+REPLAY = "replay"
+
+# Words the fake backend picks spelling bee word lists from
+_FAKE_VOCABULARY = (
+    "accommodate", "acquaintance", "algorithm", "anonymous", "apparatus", "archipelago",
+    "bureaucracy", "calendar", "camouflage", "catastrophe", "chandelier", "chrysalis",
+    "conscientious", "constellation", "curriculum", "daffodil", "dilemma", "eccentric",
+    "ecosystem", "embarrass", "encyclopedia", "entrepreneur", "equilibrium", "exhilarate",
+    "fluorescent", "fossil", "galaxy", "gargoyle", "gazebo", "glacier", "harmonica",
+    "hemisphere", "hieroglyph", "hypothesis", "iguana", "illuminate", "kaleidoscope",
+    "labyrinth", "lagoon", "magnificent", "mediterranean", "meteorite", "millennium",
+    "mischievous", "molecule", "narrative", "necessary", "nocturnal", "observatory",
+    "occurrence", "orchestra", "paradigm", "parallel", "pharaoh", "photosynthesis",
+    "pneumonia", "quarantine", "questionnaire", "rhythm", "silhouette", "symphony",
+    "telescope", "thermometer", "tsunami", "vaccine", "vacuum", "volcano", "whimsical",
+)
+# Terms the fake backend judges inappropriate or too vague, in topics and in words
+_FAKE_REJECTED_TERMS = frozenset((
+    "abuse", "alcohol", "drug", "drugs", "gun", "guns", "kill", "killing", "murder", "unknown",
+    "violence", "weapon", "weapons",
+))
+# Words that belong to a theme; a topic naming one of them only accepts words of that theme.
+# Other topics accept any word in the English word index.
+_FAKE_THEMES = (
+    frozenset((
+        "algorithm", "app", "board", "chip", "code", "computer", "computing", "cpu", "data",
+        "digital", "electronic", "electronics", "gpu", "hardware", "internet", "keyboard",
+        "learning", "machine", "memory", "monitor", "mother", "network", "processor", "program",
+        "ram", "robot", "software", "technology",
+    )),
+)
+_FAKE_LANGUAGES = ("Latin", "Greek", "French", "German", "Old English", "Arabic")
+_FAKE_PARTS_OF_SPEECH = ("noun", "verb", "adjective", "adverb")
+
+
+class InjectedProviderError(Exception):
+    """
+    A provider error simulated by the fake and replay backends. A status code of 429 is
+    handled like a real rate limit.
+    """
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ReplayMissError(LookupError):
+    """
+    Raised in replay mode for a call that was never recorded.
+    """
+
+
+class _GeminiResponse:
+    """
+    A recorded or fake Gemini response with the attributes SpellTrain2AI reads.
+    """
+
+    def __init__(self, text: Optional[str]):
+        self._text = text
+        self.prompt_feedback = "blocked" if text is None else None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            raise ValueError("The response was blocked.")
+        return self._text
+
+
+class AIBackend:
+    """
+    Decides where AI provider calls and text-to-speech go:
+    - live: the real providers (default)
+    - fake: deterministic answers built from the prompt, no network
+    - record: the real providers, saving every answer to `recordings_dir`
+    - replay: the answers saved by record mode, no network
+
+    Fake and replay calls can be slowed down and made to fail to benchmark tail latency
+    and failover offline: every call waits `latency` seconds, `tail_rate` of them
+    `tail_latency` seconds instead, `error_rate` of them fail, `rate_limit_rate` of them fail
+    with a 429, and calls to `failing_models` always fail. Random draws come from `seed`.
+
+    Calls are keyed by their task label (e.g. "get_word_list") and request, so a recording
+    replays as long as the prompts do not change.
+    """
+
+    def __init__(self, mode: str = LIVE, recordings_dir: str = "api/tests/recordings",
+                 latency: float = 0, tail_latency: float = 0, tail_rate: float = 0,
+                 error_rate: float = 0, rate_limit_rate: float = 0,
+                 failing_models: Iterable[str] = (), seed: int = 0):
+        if mode not in (LIVE, FAKE, RECORD, REPLAY):
+            raise ValueError(f"Unknown AI backend mode: {mode}")
+        self.mode = mode
+        self.recordings_dir = recordings_dir
+        self.latency = latency
+        self.tail_latency = tail_latency
+        self.tail_rate = tail_rate
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.failing_models = set(failing_models)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "recorded": 0, "replayed": 0, "replayMisses": 0,
+                       "injectedErrors": 0, "injectedRateLimits": 0, "injectedLatency": 0.0}
+
+    @property
+    def simulated(self) -> bool:
+        return self.mode in (FAKE, REPLAY)
+
+    def chat_completion(self, task: str, kwargs: dict, create: Callable):
+        """
+        Creates an OpenAI chat completion with `create(**kwargs)` or its stand-in.
+        """
+        if not self.simulated:
+            return self._record_completion(task, kwargs, create(**kwargs))
+        self._wait(self._inject("openai", kwargs["model"]))
+        return self._completion(task, kwargs)
+
+    async def achat_completion(self, task: str, kwargs: dict, create: Callable):
+        if not self.simulated:
+            return self._record_completion(task, kwargs, await create(**kwargs))
+        await asyncio.sleep(self._inject("openai", kwargs["model"]))
+        return self._completion(task, kwargs)
+
+    def stream_chat_completion(self, task: str, kwargs: dict, create: Callable) -> Iterable:
+        """
+        Creates a streamed OpenAI chat completion with `create(stream=True, **kwargs)` or its
+        stand-in, chunked like a real stream.
+        """
+        if not self.simulated:
+            return self._record_stream(task, kwargs, create(stream=True, **kwargs))
+        self._wait(self._inject("openai", kwargs["model"]))
+        return self._chunks(self._stream_content(task, kwargs), kwargs["model"])
+
+    async def astream_chat_completion(self, task: str, kwargs: dict, create: Callable):
+        if not self.simulated:
+            stream = await create(stream=True, **kwargs)
+            return self._arecord_stream(task, kwargs, stream) if self.mode == RECORD else stream
+        await asyncio.sleep(self._inject("openai", kwargs["model"]))
+        return self._achunks(self._chunks(self._stream_content(task, kwargs), kwargs["model"]))
+
+    def generate_content(self, task: str, model: str, prompt: str, kwargs: dict, generate: Callable):
+        """
+        Generates Gemini content with `generate(prompt, **kwargs)` or its stand-in.
+        """
+        if not self.simulated:
+            return self._record_content(task, model, prompt, kwargs, generate(prompt, **kwargs))
+        self._wait(self._inject("gemini", model))
+        return self._content(task, model, prompt, kwargs)
+
+    async def agenerate_content(self, task: str, model: str, prompt: str, kwargs: dict, generate: Callable):
+        if not self.simulated:
+            return self._record_content(task, model, prompt, kwargs, await generate(prompt, **kwargs))
+        await asyncio.sleep(self._inject("gemini", model))
+        return self._content(task, model, prompt, kwargs)
+
+    def synthesize(self, word: str, audio_file: str, save: Callable):
+        """
+        Saves the speech of `word` to `audio_file` with `save(word, audio_file)` or its stand-in.
+        """
+        path = self._path("tts", {"word": word}, ".mp3")
+        if self.simulated:
+            self._wait(self._inject("gtts", "gtts"))
+            if self.mode == REPLAY:
+                self._replayed(path)
+                shutil.copyfile(path, audio_file)
+            else:
+                with open(audio_file, "wb") as file:
+                    file.write(f"fake speech: {word}".encode())
+            return
+
+        save(word, audio_file)
+        if self.mode == RECORD:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copyfile(audio_file, path)
+            self._count("recorded")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"mode": self.mode, **self._stats}
+
+    # Latency and error injection
+
+    def _inject(self, provider: str, model: str) -> float:
+        """
+        Counts the call and draws its injected error and latency.
+
+        Returns:
+            float: The seconds the call should take.
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            error_draw, tail_draw = self._random.random(), self._random.random()
+            latency = self.tail_latency if tail_draw < self.tail_rate else self.latency
+            self._stats["injectedLatency"] += latency
+
+            if model in self.failing_models or error_draw < self.error_rate:
+                self._stats["injectedErrors"] += 1
+                raise InjectedProviderError(f"Injected {provider} error for {model}.")
+            if error_draw < self.error_rate + self.rate_limit_rate:
+                self._stats["injectedRateLimits"] += 1
+                raise InjectedProviderError(
+                    f"Injected {provider} rate limit for {model}.", status_code=429)
+        return latency
+
+    def _wait(self, latency: float):
+        if latency > 0:
+            time.sleep(latency)
+
+    # Record and replay
+
+    def _path(self, task: str, request: dict, extension: str = ".json") -> str:
+        key = hashlib.sha256(json.dumps(
+            request, sort_keys=True, default=str).encode()).hexdigest()[:24]
+        return os.path.join(self.recordings_dir, task, key + extension)
+
+    def _save(self, task: str, request: dict, response: dict):
+        if self.mode != RECORD:
+            return
+        path = self._path(task, request)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            json.dump({"task": task, "request": request,
+                      "response": response}, file, indent=2, default=str)
+        self._count("recorded")
+
+    def _load(self, task: str, request: dict) -> dict:
+        path = self._path(task, request)
+        self._replayed(path)
+        with open(path) as file:
+            return json.load(file)["response"]
+
+    def _replayed(self, path: str):
+        if not os.path.exists(path):
+            self._count("replayMisses")
+            raise ReplayMissError(
+                f"No recorded response at {path}. Record it with SPELLTRAIN2_AI_BACKEND=record.")
+        self._count("replayed")
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _record_completion(self, task: str, kwargs: dict, completion):
+        if self.mode != RECORD:
+            return completion
+        self._save(task, {"provider": "openai", **kwargs},
+                   completion.model_dump(mode="json"))
+        return completion
+
+    def _record_stream(self, task: str, kwargs: dict, stream):
+        if self.mode != RECORD:
+            return stream
+
+        def chunks():
+            content = ""
+            for chunk in stream:
+                content += (chunk.choices[0].delta.content or "") if chunk.choices else ""
+                yield chunk
+            self._save(task, {"provider": "openai", "stream": True, **kwargs}, {"content": content})
+        return chunks()
+
+    async def _arecord_stream(self, task: str, kwargs: dict, stream):
+        content = ""
+        async for chunk in stream:
+            content += (chunk.choices[0].delta.content or "") if chunk.choices else ""
+            yield chunk
+        self._save(task, {"provider": "openai", "stream": True, **kwargs}, {"content": content})
+
+    def _record_content(self, task: str, model: str, prompt: str, kwargs: dict, response):
+        if self.mode != RECORD:
+            return response
+        try:
+            text = response.text
+        except Exception:
+            text = None
+        self._save(task, {"provider": "gemini", "model": model, "prompt": prompt, **kwargs},
+                   {"text": text})
+        return response
+
+    def _completion(self, task: str, kwargs: dict) -> ChatCompletion:
+        if self.mode == REPLAY:
+            return ChatCompletion.model_validate(self._load(task, {"provider": "openai", **kwargs}))
+
+        content = _fake_answer(task, _prompt_text(kwargs["messages"]))
+        prompt_tokens = estimate_tokens(json.dumps(kwargs["messages"]))
+        completion_tokens = estimate_tokens(content)
+        return ChatCompletion.model_validate({
+            "id": f"fake-{task}", "object": "chat.completion", "created": 0, "model": kwargs["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    def _stream_content(self, task: str, kwargs: dict) -> str:
+        if self.mode == REPLAY:
+            return self._load(task, {"provider": "openai", "stream": True, **kwargs})["content"]
+        return _fake_answer(task, _prompt_text(kwargs["messages"]))
+
+    def _chunks(self, content: str, model: str, size: int = 8) -> List[ChatCompletionChunk]:
+        return [ChatCompletionChunk.model_validate({
+            "id": "fake-stream", "object": "chat.completion.chunk", "created": 0, "model": model,
+            "choices": [{"index": 0, "delta": {"content": content[start:start + size]}}],
+        }) for start in range(0, len(content), size)]
+
+    async def _achunks(self, chunks: List[ChatCompletionChunk]):
+        for chunk in chunks:
+            yield chunk
+
+    def _content(self, task: str, model: str, prompt: str, kwargs: dict) -> _GeminiResponse:
+        if self.mode == REPLAY:
+            return _GeminiResponse(self._load(
+                task, {"provider": "gemini", "model": model, "prompt": prompt, **kwargs})["text"])
+        return _GeminiResponse(_fake_answer(task, prompt))
+
+
+def _prompt_text(messages: List[dict]) -> str:
+    return "\n".join(message["content"] for message in messages)
+
+
+def _pick(options: tuple, seed: str) -> str:
+    return options[zlib.crc32(seed.encode()) % len(options)]
+
+
+def _fake_word_info(word: str, topic: str) -> dict:
+    return {
+        "word": word,
+        "definition": f"A word about {topic or 'spelling'}",
+        "rootOrigin": f"From an old root meaning {word.lower()}",
+        "usage": f"The {word} belongs to {topic or 'the list'}.",
+        "languageOrigin": _pick(_FAKE_LANGUAGES, word),
+        "partsOfSpeech": _pick(_FAKE_PARTS_OF_SPEECH, word),
+        "alternatePronunciation": f"/{word.lower()}/",
+    }
+
+
+def _terms(text: str) -> List[str]:
+    return re.findall(r"[^\W\d_]+", text.lower())
+
+
+def _is_fake_term(term: str) -> bool:
+    return term in _FAKE_VOCABULARY or any(term in theme for theme in _FAKE_THEMES) or \
+        lexical_filter.is_known(term)
+
+
+def _fake_topic_reason(topic: str) -> Optional[str]:
+    """
+    Returns:
+        Optional[str]: Why the fake backend judges the topic invalid, or None if it is valid.
+    """
+    terms = _terms(topic)
+    if not any(len(term) >= 3 for term in terms) or not all(map(_is_fake_term, terms)):
+        return f"{topic} is not a meaningful topic."
+    if _FAKE_REJECTED_TERMS.intersection(terms):
+        return f"{topic} is not suitable for a spelling bee."
+    return None
+
+
+def _is_fake_word_valid(word: str, topic: str) -> bool:
+    terms = _terms(word)
+    if not terms or _FAKE_REJECTED_TERMS.intersection(terms) or not all(map(_is_fake_term, terms)):
+        return False
+    if word.lower() in _FAKE_VOCABULARY:
+        return True
+    themes = [theme for theme in _FAKE_THEMES if theme.intersection(_terms(topic))]
+    return all(all(term in theme for term in terms) for theme in themes)
+
+
+def _fake_answer(task: str, prompt: str) -> str:
+    """
+    Builds a deterministic answer in the format the prompt asks for. Topics and words are
+    judged by fixed rules: gibberish, words missing from the English word index and a few
+    inappropriate terms are invalid, and so are words off the theme of a technology topic.
+    """
+    topic_match = re.search(r'topic:? "([^"]+)"', prompt) or re.search(r'topic: ([^\n]+?)\.', prompt) or \
+        re.search(r'related to ([^"\n]+?)[.?]', prompt)
+    topic = topic_match.group(1) if topic_match else ""
+    word_match = re.search(r'word "([^"]+)"', prompt)
+    word = word_match.group(1) if word_match else ""
+    words_match = re.search(r'words (\[.*?\])(?:,| are)', prompt)
+    words = json.loads(words_match.group(1)) if words_match else []
+
+    if task == "evaluate_topic":
+        topic = re.search(r'Is "(.+)" a valid', prompt).group(1)
+        reason = _fake_topic_reason(topic)
+        return json.dumps({"isValid": reason is None,
+                           "reason": reason or f"{topic} is a suitable spelling bee topic."})
+    if task == "evaluate_word_topic":
+        return json.dumps({"isValid": str(_is_fake_word_valid(word, topic))})
+    if task == "evaluate_words_topic":
+        return json.dumps({"words": [{"word": item, "isValid": _is_fake_word_valid(item, topic)}
+                                     for item in words]})
+    if task == "get_word_list":
+        count = int(re.findall(r'Provide (\d+) spelling bee words', prompt)[-1])
+        existing = re.search(r'Do not repeat these words: (.*)', prompt)
+        excluded = set(existing.group(1).split(", ")) if existing else set()
+        vocabulary = [item for item in _FAKE_VOCABULARY if item not in excluded]
+        random.Random(zlib.crc32(topic.lower().encode())).shuffle(vocabulary)
+        return json.dumps({"words": vocabulary[:count]})
+    if task == "get_words_details":
+        return json.dumps({"words": [_fake_word_info(item, topic) for item in words]})
+    if task in ("word_field", "word_fields"):
+        response_format = re.findall(r'following format: (\{.*\})', prompt)[-1]
+        info = _fake_word_info(word, topic)
+        return json.dumps({field: info[field] for field in json.loads(response_format)})
+    if task == "get_word_details":
+        return json.dumps(_fake_word_info(word, topic))
+    raise ValueError(f"The fake AI backend has no answer for {task}.")
+
+
+ai_backend = AIBackend(
+    mode=os.getenv("SPELLTRAIN2_AI_BACKEND", LIVE),
+    recordings_dir=os.getenv("SPELLTRAIN2_AI_RECORDINGS", "api/tests/recordings"),
+    latency=float(os.getenv("SPELLTRAIN2_AI_BACKEND_LATENCY", "0")),
+    tail_latency=float(os.getenv("SPELLTRAIN2_AI_BACKEND_TAIL_LATENCY", "0")),
+    tail_rate=float(os.getenv("SPELLTRAIN2_AI_BACKEND_TAIL_RATE", "0")),
+    error_rate=float(os.getenv("SPELLTRAIN2_AI_BACKEND_ERROR_RATE", "0")),
+    rate_limit_rate=float(os.getenv("SPELLTRAIN2_AI_BACKEND_RATE_LIMIT_RATE", "0")),
+    failing_models=[model for model in os.getenv(
+        "SPELLTRAIN2_AI_BACKEND_FAILING_MODELS", "").split(",") if model],
+    seed=int(os.getenv("SPELLTRAIN2_AI_BACKEND_SEED", "0")),
+)
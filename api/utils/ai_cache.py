@@ -0,0 +1,231 @@
+import os
+import re
+import threading
+import time
+from typing import Generic, Optional, Type, TypeVar
+from cachetools import TLRUCache
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from sqlalchemy import or_
+from api.database import get_db_session
+from api.models import models
+from api.schemas.schemas import EvaluatedInput, EvaluatedTopic, WordInfo
+
+T = TypeVar("T", bound=BaseModel)
+
+
+def normalize(text: str) -> str:
+    """
+    Normalizes a word or topic for use in a cache key: collapses whitespace and lowercases.
+    """
+    return re.sub(r'\s+', ' ', str(text)).strip().lower()
+
+
+class AICache(Generic[T]):
+    """
+    Read-through cache for AI results shared by every user.
+
+    Entries live in a size-bounded in-process LRU and in the `ai_cache` table, so they survive
+    restarts and are shared between workers. Both layers expire entries after `ttl` seconds,
+    or after the ttl given to `set`.
+    Keys are built from normalized parts, e.g. (word, topic).
+
+    Cache failures are logged and treated as misses; they never fail the request.
+
+    `aget` and `aset` are the variants for coroutines: they run the database layer in the
+    threadpool instead of blocking the event loop.
+    """
+
+    _KEY_SEPARATOR = "|"
+
+    def __init__(self, namespace: str, schema: Type[T], maxsize: int, ttl: float):
+        self.namespace = namespace
+        self.schema = schema
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Values are stored with their absolute expiry time, honoured by the LRU as well.
+        self._memory = TLRUCache(maxsize=maxsize, ttu=lambda _key, value,
+                                 _now: value[1], timer=time.time)
+        self._session_local = None
+        self._stats = {"memoryHits": 0, "dbHits": 0, "misses": 0, "sets": 0}
+
+    def get(self, *parts: str) -> Optional[T]:
+        key = self._key(*parts)
+        value = self._get_from_memory(key)
+        if value is not None:
+            return value
+        return self._remember(key, self._get_from_db(key))
+
+    async def aget(self, *parts: str) -> Optional[T]:
+        key = self._key(*parts)
+        value = self._get_from_memory(key)
+        if value is not None:
+            return value
+        return self._remember(key, await run_in_threadpool(self._get_from_db, key))
+
+    def set(self, value: T, *parts: str, ttl: Optional[float] = None):
+        key, expires_at = self._set_in_memory(value, parts, ttl)
+        self._execute(self._set_in_db, key, value, expires_at)
+
+    async def aset(self, value: T, *parts: str, ttl: Optional[float] = None):
+        key, expires_at = self._set_in_memory(value, parts, ttl)
+        await run_in_threadpool(self._execute, self._set_in_db, key, value, expires_at)
+
+    def invalidate(self, *parts: Optional[str]) -> int:
+        """
+        Removes cached entries. Every part that is None acts as a wildcard, so
+        invalidate(None, "animals") removes every word cached for the topic "Animals"
+        and invalidate() clears the whole namespace.
+
+        Returns:
+            int: The number of entries removed from the database.
+        """
+        with self._lock:
+            for key in list(self._memory.keys()):
+                if self._matches(key, parts):
+                    del self._memory[key]
+
+        return self._execute(self._invalidate_in_db, parts) or 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memorySize"] = len(self._memory)
+        lookups = stats["memoryHits"] + stats["dbHits"] + stats["misses"]
+        stats["hitRate"] = round(
+            (stats["memoryHits"] + stats["dbHits"]) / lookups, 3) if lookups else 0
+        return stats
+
+    def _key(self, *parts: str) -> str:
+        return self._KEY_SEPARATOR.join(normalize(part) for part in parts)
+
+    def _get_from_memory(self, key: str) -> Optional[T]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            self._stats["memoryHits"] += 1
+            return entry[0].model_copy()
+
+    def _remember(self, key: str, value) -> Optional[T]:
+        # Counts a database lookup and keeps its result in memory
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["dbHits"] += 1
+            self._memory[key] = value
+        return value[0].model_copy()
+
+    def _set_in_memory(self, value: T, parts: tuple, ttl: Optional[float]):
+        key = self._key(*parts)
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._memory[key] = (value.model_copy(), expires_at)
+            self._stats["sets"] += 1
+        return key, expires_at
+
+    def _matches(self, key: str, parts: tuple) -> bool:
+        key_parts = key.split(self._KEY_SEPARATOR)
+        return all(part is None or normalize(part) == key_part
+                   for part, key_part in zip(parts, key_parts))
+
+    def _get_from_db(self, key: str):
+        def query(db):
+            entry = db.query(models.AICacheEntry).filter(
+                models.AICacheEntry.namespace == self.namespace, models.AICacheEntry.key == key).first()
+            if entry is None:
+                return None
+
+            if entry.expiresAt <= time.time():
+                db.delete(entry)
+                db.commit()
+                return None
+
+            return self.schema.model_validate(entry.value), entry.expiresAt
+
+        return self._execute(query)
+
+    def _set_in_db(self, db, key: str, value: T, expires_at: float):
+        entry = db.query(models.AICacheEntry).filter(
+            models.AICacheEntry.namespace == self.namespace, models.AICacheEntry.key == key).first()
+        if entry is None:
+            entry = models.AICacheEntry(namespace=self.namespace, key=key)
+            db.add(entry)
+        entry.value = value.model_dump()
+        entry.expiresAt = expires_at
+        db.commit()
+
+    def _invalidate_in_db(self, db, parts: tuple) -> int:
+        query = db.query(models.AICacheEntry).filter(
+            models.AICacheEntry.namespace == self.namespace)
+        if any(part is not None for part in parts):
+            # Wildcards become "%"; keys with more parts than given match on their first parts
+            pattern = self._KEY_SEPARATOR.join(
+                "%" if part is None else _escape_like(normalize(part)) for part in parts)
+            query = query.filter(or_(
+                models.AICacheEntry.key.like(pattern, escape="\\"),
+                models.AICacheEntry.key.like(pattern + self._KEY_SEPARATOR + "%", escape="\\")))
+
+        # "%" also matches a separator inside a part, so the candidates are checked part by part
+        removed = 0
+        for entry in query.all():
+            if self._matches(entry.key, parts):
+                db.delete(entry)
+                removed += 1
+        db.commit()
+        return removed
+
+    def _execute(self, func, *args):
+        try:
+            db = self._session()
+        except Exception as e:
+            print(f"AI cache unavailable: {e}")
+            return None
+
+        try:
+            return func(db, *args)
+        except Exception as e:
+            db.rollback()
+            print(f"AI cache error ({self.namespace}): {e}")
+            return None
+        finally:
+            db.close()
+
+    def _session(self):
+        if self._session_local is None:
+            SessionLocal, engine = get_db_session()
+            models.AICacheEntry.__table__.create(bind=engine, checkfirst=True)
+            self._session_local = SessionLocal
+        return self._session_local()
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+word_info_cache: AICache[WordInfo] = AICache(
+    namespace="word_info",
+    schema=WordInfo,
+    maxsize=int(os.getenv("SPELLTRAIN2_WORD_INFO_CACHE_SIZE", "5000")),
+    ttl=float(os.getenv("SPELLTRAIN2_WORD_INFO_CACHE_TTL", str(30 * 24 * 3600))),
+)
+
+# Topic and word-topic verdicts. Rejections are cached too, but expire sooner so that a
+# one-off bad answer from the model does not block a topic for long.
+topic_cache: AICache[EvaluatedTopic] = AICache(
+    namespace="topic",
+    schema=EvaluatedTopic,
+    maxsize=int(os.getenv("SPELLTRAIN2_VALIDATION_CACHE_SIZE", "5000")),
+    ttl=float(os.getenv("SPELLTRAIN2_VALIDATION_CACHE_TTL", str(30 * 24 * 3600))),
+)
+
+word_topic_cache: AICache[EvaluatedInput] = AICache(
+    namespace="word_topic",
+    schema=EvaluatedInput,
+    maxsize=int(os.getenv("SPELLTRAIN2_VALIDATION_CACHE_SIZE", "5000")),
+    ttl=float(os.getenv("SPELLTRAIN2_VALIDATION_CACHE_TTL", str(30 * 24 * 3600))),
+)
+
+REJECTED_VALIDATION_TTL = float(
+    os.getenv("SPELLTRAIN2_VALIDATION_CACHE_REJECTED_TTL", str(24 * 3600)))
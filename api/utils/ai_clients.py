@@ -0,0 +1,222 @@
+import asyncio
+import os
+import threading
+import weakref
+from typing import Dict, Optional
+import httpx
+import google.generativeai as genai
+from fastapi import HTTPException
+from openai import AsyncOpenAI, OpenAI, OpenAIError
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+class AIClientRegistry:
+    """
+    Process-wide registry of AI provider clients.
+
+    Clients are created lazily on first use and then shared by every caller, so each
+    provider keeps a single keep-alive connection pool instead of paying a TLS
+    handshake per LLM call.
+
+    Pool limits and timeouts are read from the environment:
+    - SPELLTRAIN2_AI_MAX_CONNECTIONS (default 100)
+    - SPELLTRAIN2_AI_MAX_KEEPALIVE_CONNECTIONS (default 20)
+    - SPELLTRAIN2_AI_KEEPALIVE_EXPIRY seconds (default 30)
+    - SPELLTRAIN2_AI_TIMEOUT seconds (default 60)
+    - SPELLTRAIN2_AI_CONNECT_TIMEOUT seconds (default 10)
+    - SPELLTRAIN2_AI_CLIENT_MAX_RETRIES (default 0): retries made by the OpenAI client itself.
+      429 responses are retried by the AI governor, after its backoff.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._openai: Optional[OpenAI] = None
+        # AsyncOpenAI pools are bound to the event loop that created them.
+        self._async_openai: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+        self._gemini_configured = False
+        self._gemini_models: Dict[str, genai.GenerativeModel] = {}
+        self._stats = {
+            "openai": {"clientsCreated": 0, "clientsReused": 0, "requests": 0, "connectionsOpened": 0},
+            "gemini": {"clientsCreated": 0, "clientsReused": 0},
+        }
+
+    def openai(self) -> OpenAI:
+        """
+        Returns the shared OpenAI client, creating it on first use.
+
+        Raises:
+            HTTPException: If there is an error configuring the OpenAI API Key.
+
+        Returns:
+            OpenAI: The shared OpenAI client.
+        """
+        with self._lock:
+            if self._openai is not None:
+                self._stats["openai"]["clientsReused"] += 1
+                return self._openai
+
+            try:
+                self._openai = OpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    max_retries=_env_int("SPELLTRAIN2_AI_CLIENT_MAX_RETRIES", 0),
+                    http_client=httpx.Client(
+                        limits=self._limits(),
+                        timeout=self._timeout(),
+                        event_hooks={"request": [self._trace_request]},
+                    ),
+                )
+            except OpenAIError:
+                raise HTTPException(
+                    status_code=500, detail="Error configuring OpenAI API Key")
+
+            self._stats["openai"]["clientsCreated"] += 1
+            return self._openai
+
+    def async_openai(self) -> AsyncOpenAI:
+        """
+        Returns the shared AsyncOpenAI client for the running event loop, creating it on first use.
+
+        Raises:
+            HTTPException: If there is an error configuring the OpenAI API Key.
+
+        Returns:
+            AsyncOpenAI: The shared AsyncOpenAI client.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_openai.get(loop)
+            if client is not None:
+                self._stats["openai"]["clientsReused"] += 1
+                return client
+
+            try:
+                client = AsyncOpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    max_retries=_env_int("SPELLTRAIN2_AI_CLIENT_MAX_RETRIES", 0),
+                    http_client=httpx.AsyncClient(
+                        limits=self._limits(),
+                        timeout=self._timeout(),
+                        event_hooks={"request": [self._atrace_request]},
+                    ),
+                )
+            except OpenAIError:
+                raise HTTPException(
+                    status_code=500, detail="Error configuring OpenAI API Key")
+
+            self._async_openai[loop] = client
+            self._stats["openai"]["clientsCreated"] += 1
+            return client
+
+    def gemini(self, model: str = 'gemini-pro') -> genai.GenerativeModel:
+        """
+        Returns the shared Google Gemini model client, configuring the API key once per process.
+
+        Args:
+            model (str): The model to use for the Gemini client. Defaults to 'gemini-pro'.
+
+        Raises:
+            HTTPException: If there is an error configuring the Google Gemini API Key.
+
+        Returns:
+            genai.GenerativeModel: The shared Gemini client for the model.
+        """
+        with self._lock:
+            if model in self._gemini_models:
+                self._stats["gemini"]["clientsReused"] += 1
+                return self._gemini_models[model]
+
+            try:
+                # genai.configure drops the underlying gRPC clients, so only call it once.
+                if not self._gemini_configured:
+                    genai.configure(api_key=os.getenv("GOOGLE_GEMINI_API_KEY"))
+                    self._gemini_configured = True
+                gemini = genai.GenerativeModel(model)
+            except Exception:
+                raise HTTPException(
+                    status_code=500, detail="Error configuring Google Gemini API Key")
+
+            self._gemini_models[model] = gemini
+            self._stats["gemini"]["clientsCreated"] += 1
+            return gemini
+
+    def stats(self) -> dict:
+        """
+        Returns client and connection reuse counters per provider.
+
+        `connectionsReused` is the number of OpenAI requests served by an already open
+        keep-alive connection instead of a new TCP/TLS handshake.
+        """
+        with self._lock:
+            openai_stats = dict(self._stats["openai"])
+            gemini_stats = dict(self._stats["gemini"])
+        openai_stats["connectionsReused"] = max(
+            openai_stats["requests"] - openai_stats["connectionsOpened"], 0)
+        return {"openai": openai_stats, "gemini": gemini_stats}
+
+    def close(self):
+        """
+        Closes the pooled synchronous clients.
+        """
+        with self._lock:
+            if self._openai is not None:
+                self._openai.close()
+                self._openai = None
+            self._gemini_models.clear()
+            self._gemini_configured = False
+
+    async def aclose(self):
+        """
+        Closes every pooled client, including the async client of the running event loop.
+        Called on application shutdown.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_openai.pop(loop, None)
+        if client is not None:
+            await client.close()
+        self.close()
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=_env_int("SPELLTRAIN2_AI_MAX_CONNECTIONS", 100),
+            max_keepalive_connections=_env_int(
+                "SPELLTRAIN2_AI_MAX_KEEPALIVE_CONNECTIONS", 20),
+            keepalive_expiry=_env_float("SPELLTRAIN2_AI_KEEPALIVE_EXPIRY", 30),
+        )
+
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            _env_float("SPELLTRAIN2_AI_TIMEOUT", 60),
+            connect=_env_float("SPELLTRAIN2_AI_CONNECT_TIMEOUT", 10),
+        )
+
+    def _trace_request(self, request: httpx.Request):
+        with self._lock:
+            self._stats["openai"]["requests"] += 1
+        request.extensions["trace"] = self._trace_connection
+
+    def _trace_connection(self, event_name: str, info: dict):
+        # httpcore emits this event only when a brand-new connection is opened.
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self._stats["openai"]["connectionsOpened"] += 1
+
+    async def _atrace_request(self, request: httpx.Request):
+        with self._lock:
+            self._stats["openai"]["requests"] += 1
+        request.extensions["trace"] = self._atrace_connection
+
+    async def _atrace_connection(self, event_name: str, info: dict):
+        self._trace_connection(event_name, info)
+
+
+client_registry = AIClientRegistry()
@@ -0,0 +1,365 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+from api.utils import ai_usage
+from api.utils.deadline import check_deadline, time_left
+
+INTERACTIVE = 0
+BACKGROUND = 1
+_PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# Priority of the AI calls made by the current request or task
+_priority: ContextVar[int] = ContextVar("ai_priority", default=INTERACTIVE)
+
+# Longest a queued call sleeps before checking its turn again
+_MAX_POLL = 1.0
+
+
+@contextmanager
+def background_priority():
+    """
+    Lets the AI calls made inside the block wait behind interactive calls, e.g. for
+    background enrichment.
+    """
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _bounded(delay: float) -> float:
+    """
+    Shortens a queue wait to the request deadline.
+
+    Raises:
+        DeadlineExceeded: If the deadline has passed, so the call gives up its place in the queue.
+    """
+    check_deadline()
+    left = time_left()
+    return delay if left is None else min(delay, left)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    # openai.RateLimitError and google.api_core.exceptions.ResourceExhausted both carry 429
+    return getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429 \
+        or type(error).__name__ == "ResourceExhausted"
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except Exception:
+        return None
+
+
+class TokenBucket:
+    """
+    Allows `per_minute` units per minute, refilled continuously. A limit of 0 means unlimited.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill(now)
+        # A call larger than the whole bucket only waits for a full bucket
+        amount = min(amount, self.per_minute)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60 / self.per_minute
+
+    def take(self, amount: float):
+        if self.per_minute > 0:
+            self.level -= amount
+
+    def _refill(self, now: float):
+        self.level = min(self.per_minute, self.level +
+                         (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+
+class _Ticket:
+    def __init__(self, provider: str, priority: int, user: Optional[str], tokens: int, wakeup):
+        self.provider = provider
+        self.priority = priority
+        self.user = user
+        self.tokens = tokens
+        self.estimatedTokens = tokens
+        self.wakeup = wakeup
+        self.enqueuedAt = time.monotonic()
+
+
+class _AsyncWakeup:
+    """
+    Wakes an asyncio waiter from any thread through the same `set` call as threading.Event.
+    """
+
+    def __init__(self, callback):
+        self.set = callback
+
+
+class _ProviderBudget:
+    def __init__(self, max_concurrency: int, requests_per_minute: float, tokens_per_minute: float):
+        self.max_concurrency = max_concurrency
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.rate_limits_in_a_row = 0
+        # priority -> user -> queued tickets. Users take turns within a priority.
+        self.queues: Dict[int, "OrderedDict[Optional[str], deque]"] = {
+            INTERACTIVE: OrderedDict(), BACKGROUND: OrderedDict()}
+        self.stats = {"granted": 0, "rateLimited": 0,
+                      "totalWait": 0.0, "maxWait": 0.0}
+
+    def next_ticket(self) -> Optional[_Ticket]:
+        for priority in sorted(self.queues):
+            for tickets in self.queues[priority].values():
+                return tickets[0]
+        return None
+
+    def enqueue(self, ticket: _Ticket):
+        self.queues[ticket.priority].setdefault(
+            ticket.user, deque()).append(ticket)
+
+    def dequeue(self, ticket: _Ticket):
+        users = self.queues[ticket.priority]
+        tickets = users.get(ticket.user)
+        if tickets is None or ticket not in tickets:
+            return
+        tickets.remove(ticket)
+        # The user goes to the back of the line for their next call
+        users.pop(ticket.user)
+        if tickets:
+            users[ticket.user] = tickets
+
+    def queued(self):
+        for users in self.queues.values():
+            for tickets in users.values():
+                yield from tickets
+
+
+class AIGovernor:
+    """
+    Gates every outbound AI provider call.
+
+    Each provider has a limit of concurrent calls and token buckets for requests and tokens
+    per minute. Calls that do not fit wait in a queue where interactive calls go before
+    background ones and users take turns. A call that fails with a 429 response pauses the
+    provider with exponential backoff (or the Retry-After the provider sent).
+
+    Works for both threads (`slot`) and asyncio tasks (`aslot`).
+
+    Limits are read from the environment per provider (OPENAI, GEMINI), 0 meaning unlimited:
+    - SPELLTRAIN2_<PROVIDER>_MAX_CONCURRENCY
+    - SPELLTRAIN2_<PROVIDER>_REQUESTS_PER_MINUTE
+    - SPELLTRAIN2_<PROVIDER>_TOKENS_PER_MINUTE
+    """
+
+    def __init__(self, budgets: Dict[str, _ProviderBudget], max_backoff: float = 60):
+        self._lock = threading.Lock()
+        self._budgets = budgets
+        self.max_backoff = max_backoff
+
+    @contextmanager
+    def slot(self, provider: str, tokens: int):
+        """
+        Waits for the provider budget in the current thread, then holds a call slot for the block.
+
+        Yields:
+            _Ticket: Set `tokens` to the tokens actually used to correct the token budget.
+        """
+        ticket = self._enqueue(provider, tokens, threading.Event())
+        try:
+            while True:
+                delay = self._try_grant(ticket)
+                if delay is None:
+                    break
+                ticket.wakeup.wait(_bounded(delay))
+                ticket.wakeup.clear()
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+        try:
+            yield ticket
+        except BaseException as e:
+            self._release(ticket, e)
+            raise
+        self._release(ticket)
+
+    @asynccontextmanager
+    async def aslot(self, provider: str, tokens: int):
+        """
+        Waits for the provider budget without blocking the event loop, then holds a call slot
+        for the block.
+
+        Yields:
+            _Ticket: Set `tokens` to the tokens actually used to correct the token budget.
+        """
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+
+        def wakeup():
+            loop.call_soon_threadsafe(event.set)
+
+        ticket = self._enqueue(provider, tokens, _AsyncWakeup(wakeup))
+        try:
+            while True:
+                delay = self._try_grant(ticket)
+                if delay is None:
+                    break
+                try:
+                    await asyncio.wait_for(event.wait(), _bounded(delay))
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+        try:
+            yield ticket
+        except BaseException as e:
+            self._release(ticket, e)
+            raise
+        self._release(ticket)
+
+    def stats(self) -> dict:
+        """
+        Returns per provider the calls in flight, queue depth per priority, wait times and
+        rate limits.
+        """
+        now = time.monotonic()
+        with self._lock:
+            stats = {}
+            for provider, budget in self._budgets.items():
+                granted = budget.stats["granted"]
+                stats[provider] = {
+                    "inFlight": budget.in_flight,
+                    "queueDepth": {_PRIORITY_NAMES[priority]: sum(len(tickets) for tickets in users.values())
+                                   for priority, users in budget.queues.items()},
+                    "oldestQueuedWait": max((now - ticket.enqueuedAt for ticket in budget.queued()), default=0.0),
+                    "granted": granted,
+                    "averageWait": budget.stats["totalWait"] / granted if granted else 0.0,
+                    "maxWait": budget.stats["maxWait"],
+                    "rateLimited": budget.stats["rateLimited"],
+                    "backoffRemaining": max(budget.blocked_until - now, 0.0),
+                }
+            return stats
+
+    def _enqueue(self, provider: str, tokens: int, wakeup) -> _Ticket:
+        ticket = _Ticket(provider, _priority.get(),
+                         ai_usage.current_user_id(), tokens, wakeup)
+        budget = self._budgets.get(provider)
+        if budget is not None:
+            with self._lock:
+                budget.enqueue(ticket)
+        return ticket
+
+    def _try_grant(self, ticket: _Ticket) -> Optional[float]:
+        """
+        Grants the call if it is next in line and fits the budget.
+
+        Returns:
+            Optional[float]: None if granted, otherwise how long to wait before checking again.
+        """
+        budget = self._budgets.get(ticket.provider)
+        if budget is None:
+            return None
+
+        with self._lock:
+            if budget.next_ticket() is not ticket:
+                return _MAX_POLL
+
+            now = time.monotonic()
+            if now < budget.blocked_until:
+                return min(budget.blocked_until - now, _MAX_POLL)
+            if budget.max_concurrency > 0 and budget.in_flight >= budget.max_concurrency:
+                return _MAX_POLL
+
+            delay = max(budget.requests.wait_time(1, now),
+                        budget.tokens.wait_time(ticket.tokens, now))
+            if delay > 0:
+                return min(delay, _MAX_POLL)
+
+            budget.requests.take(1)
+            budget.tokens.take(ticket.tokens)
+            budget.in_flight += 1
+            budget.dequeue(ticket)
+
+            wait = now - ticket.enqueuedAt
+            budget.stats["granted"] += 1
+            budget.stats["totalWait"] += wait
+            budget.stats["maxWait"] = max(budget.stats["maxWait"], wait)
+
+            self._notify(budget)
+            return None
+
+    def _release(self, ticket: _Ticket, error: Optional[BaseException] = None):
+        budget = self._budgets.get(ticket.provider)
+        if budget is None:
+            return
+
+        with self._lock:
+            budget.in_flight -= 1
+            # Charge or refund the difference between the estimate and the actual usage
+            budget.tokens.take(ticket.tokens - ticket.estimatedTokens)
+            if error is None:
+                budget.rate_limits_in_a_row = 0
+            elif is_rate_limit_error(error):
+                self._back_off(ticket.provider, budget, error)
+            self._notify(budget)
+
+    def _back_off(self, provider: str, budget: _ProviderBudget, error: BaseException):
+        budget.rate_limits_in_a_row += 1
+        budget.stats["rateLimited"] += 1
+        delay = _retry_after(error) or min(
+            2 ** (budget.rate_limits_in_a_row - 1), self.max_backoff)
+        budget.blocked_until = max(
+            budget.blocked_until, time.monotonic() + delay)
+        print(f"{provider} rate limited, pausing for {delay}s.")
+
+    def _abandon(self, ticket: _Ticket):
+        budget = self._budgets.get(ticket.provider)
+        if budget is None:
+            return
+
+        with self._lock:
+            budget.dequeue(ticket)
+            self._notify(budget)
+
+    def _notify(self, budget: _ProviderBudget):
+        for ticket in budget.queued():
+            ticket.wakeup.set()
+
+
+def _budget(provider: str, max_concurrency: int, requests_per_minute: int, tokens_per_minute: int) -> _ProviderBudget:
+    return _ProviderBudget(
+        max_concurrency=int(
+            os.getenv(f"SPELLTRAIN2_{provider}_MAX_CONCURRENCY", str(max_concurrency))),
+        requests_per_minute=float(
+            os.getenv(f"SPELLTRAIN2_{provider}_REQUESTS_PER_MINUTE", str(requests_per_minute))),
+        tokens_per_minute=float(
+            os.getenv(f"SPELLTRAIN2_{provider}_TOKENS_PER_MINUTE", str(tokens_per_minute))),
+    )
+
+
+ai_governor = AIGovernor(
+    budgets={
+        "openai": _budget("OPENAI", max_concurrency=16, requests_per_minute=3500, tokens_per_minute=90000),
+        "gemini": _budget("GEMINI", max_concurrency=8, requests_per_minute=60, tokens_per_minute=0),
+    },
+    max_backoff=float(os.getenv("SPELLTRAIN2_AI_MAX_BACKOFF", "60")),
+)
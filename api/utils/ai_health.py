@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class _ModelHealth:
+    def __init__(self, window: int):
+        # (success, latency) of the most recent calls
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_started_at: Optional[float] = None
+
+    def success_rate(self) -> Optional[float]:
+        if not self.outcomes:
+            return None
+        return sum(success for success, _ in self.outcomes) / len(self.outcomes)
+
+    def latency(self, percentile: float) -> Optional[float]:
+        latencies = sorted(latency for _, latency in self.outcomes)
+        if not latencies:
+            return None
+        return latencies[min(int(len(latencies) * percentile), len(latencies) - 1)]
+
+
+class ProviderHealth:
+    """
+    Tracks the recent success rate and latency of each AI model and decides the order in
+    which get_word_details tries them.
+
+    A call succeeds when it returns complete word details; errors, blocked answers and
+    partial details count as failures. Each model has a circuit breaker that opens when the
+    rolling success rate drops below `min_success_rate` (after `min_samples` calls) or after
+    `max_consecutive_failures` failures in a row. An open model is skipped for `cooldown`
+    seconds, then a single probe call is sent to it first: success closes the circuit,
+    failure opens it again.
+
+    Healthy models keep their configured order; degraded ones (success rate below
+    `degraded_success_rate` or p95 latency above `slow_p95`) move behind them.
+    """
+
+    def __init__(self, window: int = 50, min_samples: int = 10, min_success_rate: float = 0.5,
+                 degraded_success_rate: float = 0.8, slow_p95: float = 10,
+                 max_consecutive_failures: int = 5, cooldown: float = 60):
+        self.window = window
+        self.min_samples = min_samples
+        self.min_success_rate = min_success_rate
+        self.degraded_success_rate = degraded_success_rate
+        self.slow_p95 = slow_p95
+        self.max_consecutive_failures = max_consecutive_failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._models: Dict[str, _ModelHealth] = {}
+
+    def record(self, model: str, success: bool, latency: float):
+        with self._lock:
+            health = self._health(model)
+            health.outcomes.append((success, latency))
+            health.probe_started_at = None
+
+            if success:
+                health.consecutive_failures = 0
+                if health.state != CLOSED:
+                    print(f"{model} recovered, closing its circuit.")
+                    health.state = CLOSED
+                    # Start over so that old failures do not trip it again right away
+                    health.outcomes = deque([(success, latency)], maxlen=self.window)
+                return
+
+            health.consecutive_failures += 1
+            success_rate = health.success_rate()
+            if health.state == HALF_OPEN or health.consecutive_failures >= self.max_consecutive_failures or \
+                    (len(health.outcomes) >= self.min_samples and success_rate < self.min_success_rate):
+                if health.state != OPEN:
+                    print(f"{model} is failing, opening its circuit for {self.cooldown}s.")
+                health.state = OPEN
+                health.opened_at = time.monotonic()
+
+    def order(self, models: List[str]) -> List[str]:
+        """
+        Returns the models to try: a model due for its probe first, then healthy ones in their
+        configured order, then degraded ones. Models with an open circuit are left out, unless
+        every model is open.
+        """
+        now = time.monotonic()
+        with self._lock:
+            available = []
+            for index, model in enumerate(models):
+                health = self._health(model)
+                if health.state == OPEN and now - health.opened_at >= self.cooldown:
+                    health.state = HALF_OPEN
+                if health.state == HALF_OPEN:
+                    # One probe at a time; a probe that never reported back is retried after the cooldown
+                    if health.probe_started_at is not None and now - health.probe_started_at < self.cooldown:
+                        continue
+                    health.probe_started_at = now
+                    available.append((0, index, model))
+                elif health.state == CLOSED:
+                    available.append(
+                        (2 if self._is_degraded(health) else 1, index, model))
+
+        if not available:
+            return list(models)
+
+        return [model for _, _, model in sorted(available)]
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {model: {
+                "state": health.state,
+                "samples": len(health.outcomes),
+                "successRate": health.success_rate(),
+                "p50Latency": health.latency(0.5),
+                "p95Latency": health.latency(0.95),
+                "consecutiveFailures": health.consecutive_failures,
+                "degraded": self._is_degraded(health),
+                "reopensIn": max(self.cooldown - (now - health.opened_at), 0.0) if health.state == OPEN else 0.0,
+            } for model, health in self._models.items()}
+
+    def _is_degraded(self, health: _ModelHealth) -> bool:
+        if len(health.outcomes) < self.min_samples:
+            return False
+        return health.success_rate() < self.degraded_success_rate or health.latency(0.95) > self.slow_p95
+
+    def _health(self, model: str) -> _ModelHealth:
+        if model not in self._models:
+            self._models[model] = _ModelHealth(self.window)
+        return self._models[model]
+
+
+provider_health = ProviderHealth(
+    window=int(os.getenv("SPELLTRAIN2_AI_HEALTH_WINDOW", "50")),
+    min_samples=int(os.getenv("SPELLTRAIN2_AI_HEALTH_MIN_SAMPLES", "10")),
+    min_success_rate=float(os.getenv("SPELLTRAIN2_AI_HEALTH_MIN_SUCCESS_RATE", "0.5")),
+    degraded_success_rate=float(os.getenv("SPELLTRAIN2_AI_HEALTH_DEGRADED_SUCCESS_RATE", "0.8")),
+    slow_p95=float(os.getenv("SPELLTRAIN2_AI_HEALTH_SLOW_P95", "10")),
+    max_consecutive_failures=int(os.getenv("SPELLTRAIN2_AI_HEALTH_MAX_CONSECUTIVE_FAILURES", "5")),
+    cooldown=float(os.getenv("SPELLTRAIN2_AI_HEALTH_COOLDOWN", "60")),
+)
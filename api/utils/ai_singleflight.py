@@ -0,0 +1,150 @@
+import asyncio
+import copy
+import threading
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from api.utils.deadline import current_deadline, watch_deadline
+
+
+class _Flight:
+    def __init__(self):
+        self.deadline = current_deadline()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # Set when the leader's deadline cut the call short
+        self.cut_short = False
+        self.task: Optional[asyncio.Task] = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical AI requests that are in flight at the same time: the first caller
+    makes the provider call, later callers with the same key wait for it and share its
+    result (or its error). Each caller gets its own shallow copy of the result.
+
+    Keys are tuples whose first item is the task label, e.g.
+    ("get_word_details", "photosynthesis", "plants"); counters are kept per task.
+
+    Works for both threads (`do`) and asyncio tasks (`ado`). An async call runs in its own
+    task, so a caller that gets cancelled does not cancel the call for the others.
+
+    The call runs under the first caller's request deadline. When that deadline cut it short
+    (a partial result or DeadlineExceeded), a caller with more time left than the first one
+    had does not take the result: it makes the call again, as a new flight, and is not
+    counted as coalesced.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Tuple, _Flight] = {}
+        self._tasks: Dict[Tuple, _Flight] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def do(self, key: Tuple, call: Callable):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            self._count(key, leader)
+
+        if not leader:
+            flight.done.wait()
+            if self._rerun(key, flight):
+                return self.do(key, call)
+            if flight.error is not None:
+                raise flight.error
+            return copy.copy(flight.result)
+
+        try:
+            with watch_deadline() as watch:
+                flight.result = call()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            flight.cut_short = watch.cut_short
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def ado(self, key: Tuple, call: Callable[[], Awaitable]):
+        # Tasks belong to the event loop that created them
+        loop_key = (id(asyncio.get_running_loop()), *key)
+        with self._lock:
+            flight = self._tasks.get(loop_key)
+            leader = flight is None
+            if leader:
+                flight = self._tasks[loop_key] = _Flight()
+                flight.task = asyncio.ensure_future(self._watched(flight, call))
+                flight.task.add_done_callback(
+                    lambda done: self._forget(loop_key, done))
+            self._count(key, leader)
+
+        try:
+            result = await asyncio.shield(flight.task)
+        except Exception:
+            if leader or not self._rerun(key, flight):
+                raise
+            return await self.ado(key, call)
+        if not leader and self._rerun(key, flight):
+            return await self.ado(key, call)
+        return copy.copy(result)
+
+    def stats(self) -> dict:
+        """
+        Returns per task the calls made, the calls that joined one in flight (provider requests
+        saved) and the calls in flight now.
+        """
+        with self._lock:
+            in_flight: Dict[str, int] = {}
+            for key in list(self._flights) + [key[1:] for key in self._tasks]:
+                in_flight[key[0]] = in_flight.get(key[0], 0) + 1
+            return {task: {**counters, "inFlight": in_flight.get(task, 0)}
+                    for task, counters in self._stats.items()}
+
+    @staticmethod
+    async def _watched(flight: _Flight, call: Callable[[], Awaitable]):
+        try:
+            with watch_deadline() as watch:
+                return await call()
+        finally:
+            flight.cut_short = watch.cut_short
+
+    def _rerun(self, key: Tuple, flight: _Flight) -> bool:
+        """
+        Returns whether a caller that waited for the flight makes the call again, in which case
+        its wait is no longer counted.
+        """
+        if not (flight.cut_short and _outlives(flight.deadline)):
+            return False
+        with self._lock:
+            counters = self._stats[key[0]]
+            counters["calls"] -= 1
+            counters["coalesced"] -= 1
+        return True
+
+    def _count(self, key: Tuple, leader: bool):
+        counters = self._stats.setdefault(key[0], {"calls": 0, "coalesced": 0})
+        counters["calls"] += 1
+        counters["coalesced"] += not leader
+
+    def _forget(self, loop_key: Tuple, task: asyncio.Task):
+        with self._lock:
+            if loop_key in self._tasks and self._tasks[loop_key].task is task:
+                del self._tasks[loop_key]
+        # Callers that were all cancelled never read the error
+        if not task.cancelled():
+            task.exception()
+
+
+def _outlives(leader_deadline: Optional[float]) -> bool:
+    # A caller with a later deadline, or none, could get more than the first caller got
+    if leader_deadline is None:
+        return False
+    own_deadline = current_deadline()
+    return own_deadline is None or own_deadline > leader_deadline
+
+
+single_flight = SingleFlight()
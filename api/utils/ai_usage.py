@@ -0,0 +1,264 @@
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from api.database import get_db_session
+from api.models import models
+
+# USD per 1K prompt and completion tokens. Override or extend with SPELLTRAIN2_AI_PRICES, e.g.
+# '{"gpt-3.5-turbo-1106": [0.001, 0.002]}'
+DEFAULT_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-3.5-turbo-1106": (0.0010, 0.0020),
+    "gpt-4-1106-preview": (0.01, 0.03),
+    "gemini-pro": (0.000125, 0.000375),
+}
+
+# Route and user of the request being served, set by the track_ai_usage and RequiredLogin dependencies
+_route: ContextVar[Optional[str]] = ContextVar("ai_usage_route", default=None)
+_user_id: ContextVar[Optional[str]] = ContextVar("ai_usage_user_id", default=None)
+
+
+def set_route(route: Optional[str]):
+    _route.set(route)
+
+
+def set_user_id(user_id):
+    _user_id.set(None if user_id is None else str(user_id))
+
+
+def current_user_id() -> Optional[str]:
+    return _user_id.get()
+
+
+def load_prices() -> Dict[str, Tuple[float, float]]:
+    prices = dict(DEFAULT_PRICES)
+    try:
+        for model, (prompt_price, completion_price) in json.loads(os.getenv("SPELLTRAIN2_AI_PRICES", "{}")).items():
+            prices[model] = (float(prompt_price), float(completion_price))
+    except Exception as e:
+        print(f"Invalid SPELLTRAIN2_AI_PRICES: {e}")
+    return prices
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text
+    return math.ceil(len(text or "") / 4)
+
+
+class AIUsage:
+    """
+    Usage of a single provider call, filled in by `UsageRecorder.track`.
+    """
+
+    def __init__(self, provider: str, model: str, task: str):
+        self.provider = provider
+        self.model = model
+        self.task = task
+        self.route = _route.get()
+        self.userId = _user_id.get()
+        self.promptTokens = 0
+        self.completionTokens = 0
+        self.latency = 0.0
+        self.outcome = "success"
+        self.createdAt = time.time()
+
+    def add_completion(self, completion):
+        """
+        Reads the token counts reported by an OpenAI chat completion.
+        """
+        usage = getattr(completion, "usage", None)
+        self.promptTokens += getattr(usage, "prompt_tokens", 0) or 0
+        self.completionTokens += getattr(usage, "completion_tokens", 0) or 0
+
+    def add_text(self, prompt: str, text: str):
+        """
+        Estimates the token counts of a call whose provider does not report them (Gemini).
+        """
+        self.promptTokens += estimate_tokens(prompt)
+        self.completionTokens += estimate_tokens(text)
+
+    def cost(self, prices: Dict[str, Tuple[float, float]]) -> float:
+        prompt_price, completion_price = prices.get(self.model, (0.0, 0.0))
+        return (self.promptTokens * prompt_price + self.completionTokens * completion_price) / 1000
+
+
+class UsageRecorder:
+    """
+    Collects the token usage, latency and outcome of every AI provider call.
+
+    Calls are aggregated in memory and written in bulk to the `ai_usage` table once
+    `flush_size` calls are pending, and every `flush_interval` seconds by the task started
+    with `run_periodic_flush`. Calls recorded on the event loop are written in the threadpool.
+
+    Recording failures are logged; they never fail the request.
+    """
+
+    def __init__(self, flush_size: int, flush_interval: float, prices: Dict[str, Tuple[float, float]]):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.prices = prices
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._totals: Dict[str, dict] = {}
+        self._session_local = None
+
+    @contextmanager
+    def track(self, provider: str, model: str, task: str):
+        """
+        Times the provider call made inside the block and records it, as an error if it raises.
+
+        Yields:
+            AIUsage: The usage of the call, to be completed with `add_completion` or `add_text`.
+        """
+        usage = AIUsage(provider, model, task)
+        start = time.perf_counter()
+        try:
+            yield usage
+        except BaseException:
+            usage.outcome = "error"
+            raise
+        finally:
+            usage.latency = time.perf_counter() - start
+            self.record(usage)
+
+    def record(self, usage: AIUsage):
+        cost = usage.cost(self.prices)
+        with self._lock:
+            self._pending.append({
+                "createdAt": usage.createdAt,
+                "day": datetime.fromtimestamp(usage.createdAt, timezone.utc).strftime("%Y-%m-%d"),
+                "provider": usage.provider,
+                "model": usage.model,
+                "task": usage.task,
+                "route": usage.route,
+                "userId": usage.userId,
+                "promptTokens": usage.promptTokens,
+                "completionTokens": usage.completionTokens,
+                "latency": usage.latency,
+                "outcome": usage.outcome,
+                "cost": cost,
+            })
+            totals = self._totals.setdefault(usage.model, {
+                "calls": 0, "errors": 0, "promptTokens": 0, "completionTokens": 0, "cost": 0.0})
+            totals["calls"] += 1
+            totals["errors"] += usage.outcome != "success"
+            totals["promptTokens"] += usage.promptTokens
+            totals["completionTokens"] += usage.completionTokens
+            totals["cost"] += cost
+            should_flush = len(self._pending) >= self.flush_size
+
+        if should_flush:
+            try:
+                # Never write to the database on the event loop
+                asyncio.get_running_loop().run_in_executor(None, self.flush)
+            except RuntimeError:
+                self.flush()
+
+    def flush(self) -> int:
+        """
+        Writes the pending calls to the database in one transaction.
+
+        Returns:
+            int: The number of calls written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+
+            try:
+                db = self._session()
+                try:
+                    db.bulk_insert_mappings(models.AIUsageRecord, pending)
+                    db.commit()
+                finally:
+                    db.close()
+            except Exception as e:
+                print(f"AI usage flush error: {e}")
+                # Keep the most recent calls for the next flush
+                with self._lock:
+                    self._pending = (pending + self._pending)[-self.flush_size * 10:]
+                return 0
+
+            return len(pending)
+
+    async def run_periodic_flush(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await run_in_threadpool(self.flush)
+
+    def stats(self) -> dict:
+        """
+        Returns the calls, errors, tokens and cost per model since the process started.
+        """
+        with self._lock:
+            return {"pending": len(self._pending),
+                    "models": {model: dict(totals) for model, totals in self._totals.items()}}
+
+    def summary(self, db: Session, group_by: str, days: int = 30) -> list:
+        """
+        Aggregates the recorded calls of the last `days` days.
+
+        Args:
+            db (Session): The database session.
+            group_by (str): "day", "user", "route", "model" or "task".
+            days (int): How many days back to include.
+
+        Returns:
+            list: One row per group with calls, errors, tokens, cost and average latency.
+        """
+        self.flush()
+
+        column = {
+            "day": models.AIUsageRecord.day,
+            "user": models.AIUsageRecord.userId,
+            "route": models.AIUsageRecord.route,
+            "model": models.AIUsageRecord.model,
+            "task": models.AIUsageRecord.task,
+        }[group_by]
+        since = time.time() - timedelta(days=days).total_seconds()
+
+        rows = db.query(
+            column,
+            func.count(models.AIUsageRecord.id),
+            func.sum(case((models.AIUsageRecord.outcome != "success", 1), else_=0)),
+            func.sum(models.AIUsageRecord.promptTokens),
+            func.sum(models.AIUsageRecord.completionTokens),
+            func.sum(models.AIUsageRecord.cost),
+            func.avg(models.AIUsageRecord.latency),
+        ).filter(models.AIUsageRecord.createdAt >= since).group_by(column).order_by(column).all()
+
+        return [{
+            group_by: key,
+            "calls": calls,
+            "errors": errors or 0,
+            "promptTokens": prompt_tokens or 0,
+            "completionTokens": completion_tokens or 0,
+            "cost": cost or 0.0,
+            "averageLatency": latency or 0.0,
+        } for key, calls, errors, prompt_tokens, completion_tokens, cost, latency in rows]
+
+    def _session(self):
+        if self._session_local is None:
+            SessionLocal, engine = get_db_session()
+            models.AIUsageRecord.__table__.create(bind=engine, checkfirst=True)
+            self._session_local = SessionLocal
+        return self._session_local()
+
+
+usage_recorder = UsageRecorder(
+    flush_size=int(os.getenv("SPELLTRAIN2_AI_USAGE_FLUSH_SIZE", "100")),
+    flush_interval=float(os.getenv("SPELLTRAIN2_AI_USAGE_FLUSH_INTERVAL", "60")),
+    prices=load_prices(),
+)
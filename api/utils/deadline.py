@@ -0,0 +1,108 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Tuple
+
+# Monotonic time by which the current request wants its answer, if any
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineWatch:
+    """
+    Records whether the work done inside `watch_deadline` was skipped or stopped for lack of
+    time, i.e. whether its result may be partial.
+    """
+
+    def __init__(self):
+        self.cut_short = False
+
+
+_watches: ContextVar[Tuple[DeadlineWatch, ...]] = ContextVar("deadline_watches", default=())
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised instead of starting a call that the request has no time left for.
+    """
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """
+    Gives the AI and text-to-speech calls made inside the block, including the ones made by
+    tasks and threads started from it, `seconds` in total. A sooner deadline already set is
+    kept. None sets no deadline.
+    """
+    if seconds is None:
+        yield
+        return
+
+    new_deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(
+        new_deadline if current is None else min(current, new_deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def watch_deadline():
+    """
+    Yields a DeadlineWatch that is marked as cut short when the work inside the block, including
+    tasks and threads started from it, turns down a call for lack of time or ends after the
+    deadline.
+    """
+    watch = DeadlineWatch()
+    token = _watches.set(_watches.get() + (watch,))
+    try:
+        yield watch
+    finally:
+        _watches.reset(token)
+        if expired():
+            watch.cut_short = True
+
+
+def _mark_cut_short():
+    for watch in _watches.get():
+        watch.cut_short = True
+
+
+def current_deadline() -> Optional[float]:
+    """
+    Returns:
+        Optional[float]: The monotonic time of the deadline, or None without a deadline.
+    """
+    return _deadline.get()
+
+
+def time_left() -> Optional[float]:
+    """
+    Returns:
+        Optional[float]: The seconds left before the deadline, or None without a deadline.
+    """
+    current = _deadline.get()
+    return None if current is None else max(current - time.monotonic(), 0.0)
+
+
+def has_time(seconds: float) -> bool:
+    left = time_left()
+    if left is None or left >= seconds:
+        return True
+    _mark_cut_short()
+    return False
+
+
+def expired() -> bool:
+    return time_left() == 0
+
+
+def check_deadline():
+    """
+    Raises:
+        DeadlineExceeded: If the deadline has passed.
+    """
+    if expired():
+        _mark_cut_short()
+        raise DeadlineExceeded("The request deadline has passed.")
@@ -0,0 +1,80 @@
+import os
+from typing import List
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from api.crud import word_lists
+from api.models import models
+from api.utils.ai_governor import background_priority
+from api.utils.jobs import JobQueue, job_queue
+
+ENRICH_WORD = "enrich_word"
+
+
+class EnrichmentScheduler:
+    """
+    Fills in the details of new words in the background, so that games and word reads find
+    them ready instead of waiting for the AI.
+
+    Each incomplete word becomes an `enrich_word` job of the job queue, with how soon the user
+    will play it as its priority: its position relative to the next word of the game (the
+    game's `endingIndex`), or to the start of a new word list. Workers take the most urgent
+    words, up to `batch_size` at a time, and enrich them with one batched request per word
+    list. Their AI calls run at background priority, so interactive requests go ahead of them
+    in the AI governor.
+
+    Queuing a word again with a sooner position moves it forward; complete words are skipped.
+    """
+
+    def __init__(self, jobs: JobQueue, batch_size: int = 6, enabled: bool = True):
+        self.jobs = jobs
+        self.enabled = enabled
+        jobs.handler(ENRICH_WORD, batch_size=batch_size)(self._enrich)
+
+    def enqueue(self, words: List[models.Word], start: int = 0):
+        """
+        Queues the incomplete words, given in the order they will be played.
+
+        Args:
+            words (List[models.Word]): The words to enrich.
+            start (int): How many words will be played before the first one, negative if the
+                first ones were already played.
+        """
+        if not self.enabled:
+            return
+        self.jobs.enqueue_many(ENRICH_WORD, self._jobs(words, start))
+
+    async def aenqueue(self, words: List[models.Word], start: int = 0):
+        """
+        Like `enqueue`, for coroutines: the words are read and the jobs written in the threadpool.
+        """
+        if not self.enabled:
+            return
+        # Words expired by a commit are loaded again when read
+        jobs = await run_in_threadpool(self._jobs, words, start)
+        await self.jobs.aenqueue_many(ENRICH_WORD, jobs)
+
+    def _jobs(self, words: List[models.Word], start: int) -> list:
+        return [({"wordId": db_word.id}, f"{ENRICH_WORD}:{db_word.id}", max(start + index, 0))
+                for index, db_word in enumerate(words) if word_lists.is_word_incomplete(db_word)]
+
+    def stats(self) -> dict:
+        """
+        Returns the enrichment jobs per status.
+        """
+        return self.jobs.stats(kind=ENRICH_WORD)["jobs"]
+
+    async def _enrich(self, db: Session, payloads: List[dict]):
+        words = db.query(models.Word).filter(models.Word.id.in_(
+            [payload["wordId"] for payload in payloads])).all()
+        incomplete = [
+            db_word for db_word in words if word_lists.is_word_incomplete(db_word)]
+        if incomplete:
+            with background_priority():
+                await word_lists.enrich_words(db, incomplete)
+
+
+enrichment_scheduler = EnrichmentScheduler(
+    job_queue,
+    batch_size=int(os.getenv("SPELLTRAIN2_ENRICHMENT_BATCH_SIZE", "6")),
+    enabled=os.getenv("SPELLTRAIN2_EAGER_ENRICHMENT", "True") == "True",
+)
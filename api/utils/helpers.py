@@ -1,6 +1,8 @@
 import os
 from typing import List
 from gtts import gTTS
+from api.utils.ai_backend import ai_backend
+from api.utils.deadline import check_deadline, time_left
 import uuid
 
 
@@ -18,17 +20,23 @@ def word_dict(word: str):
 
 
 def get_audio_url(word: str):
-    # Create a speech object
-    tts = gTTS(text=word, lang='en')
+    # A request out of time gets no audio file rather than waiting for one
+    check_deadline()
     # Generate a unique id for the file name
     unique_id = str(uuid.uuid4())
-    # Save the audio file
+    # Save the audio file, or its recorded or fake stand-in
     audio_file = f"audio/word_{unique_id}.mp3"
-    tts.save(audio_file)
+    ai_backend.synthesize(word, audio_file, _save_speech)
 
     return audio_file
 
 
+def _save_speech(word: str, audio_file: str):
+    # Create a speech object, bounded by the time left before the request deadline
+    tts = gTTS(text=word, lang='en', timeout=time_left())
+    tts.save(audio_file)
+
+
 def delete_audio_file(audio_url: str | List[str]):
     if isinstance(audio_url, list):
         for url in audio_url:
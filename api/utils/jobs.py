@@ -0,0 +1,308 @@
+"""
+Durable background jobs kept in the `jobs` table, run by a pool of workers.
+
+Workers run inside the app (`SPELLTRAIN2_JOB_WORKERS`), or alongside it in their own process:
+
+    python -m api.utils.jobs worker --workers 4
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from api.database import get_db_session
+from api.models import models
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+
+# A handler gets its own session and the payloads of the jobs it runs together
+Handler = Callable[[Session, List[dict]], Awaitable[None]]
+
+
+class JobQueue:
+    """
+    A job queue in the database, so that queued work survives restarts and deploys and can be
+    run by workers in any process.
+
+    - Jobs run in priority order (lowest first), then in the order they were queued. Handlers
+      registered with a `batch_size` get up to that many jobs of their kind at once.
+    - A job with a key is only queued once while it is pending: queuing the key again moves
+      the job forward when the new priority is sooner. Once the job has finished, queuing the
+      key again runs it again.
+    - A job that raises is retried after an exponential backoff. After `max_attempts` it is
+      dead: it stays in the table for inspection (`GET /admin/jobs?status=dead`) until retried.
+    - A job claimed by a worker that died is claimed again once its `lease` has expired.
+    """
+
+    def __init__(self, workers: int = 2, max_attempts: int = 5, backoff: float = 5,
+                 max_backoff: float = 300, lease: float = 300, poll_interval: float = 1,
+                 session_factory: Optional[Callable[[], Session]] = None):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._session_factory = session_factory
+        self._handlers: Dict[str, Tuple[Handler, int]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stats = {"succeeded": 0, "retried": 0, "dead": 0}
+
+    def handler(self, kind: str, batch_size: int = 1):
+        """
+        Registers the async function that runs the jobs of a kind.
+        """
+        def register(function: Handler) -> Handler:
+            self._handlers[kind] = (function, batch_size)
+            return function
+        return register
+
+    def enqueue(self, kind: str, payload: dict, key: Optional[str] = None, priority: int = 0) -> None:
+        self.enqueue_many(kind, [(payload, key, priority)])
+
+    def enqueue_many(self, kind: str, jobs: Iterable[Tuple[dict, Optional[str], int]]) -> None:
+        """
+        Queues jobs given as (payload, key, priority) tuples in one transaction.
+        """
+        if self._insert(kind, list(jobs)) and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def aenqueue(self, kind: str, payload: dict, key: Optional[str] = None, priority: int = 0) -> None:
+        await self.aenqueue_many(kind, [(payload, key, priority)])
+
+    async def aenqueue_many(self, kind: str, jobs: Iterable[Tuple[dict, Optional[str], int]]) -> None:
+        """
+        Like `enqueue_many`, for coroutines: the jobs are written in the threadpool.
+        """
+        if await run_in_threadpool(self._insert, kind, list(jobs)) and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _insert(self, kind: str, jobs: List[Tuple[dict, Optional[str], int]]) -> bool:
+        if not jobs:
+            return False
+
+        db = self._session()
+        try:
+            keys = [key for _, key, _ in jobs if key is not None]
+            existing = {job.key: job for job in db.query(models.Job).filter(
+                models.Job.key.in_(keys)).all()} if keys else {}
+            now = time.time()
+            for payload, key, priority in jobs:
+                job = existing.get(key)
+                if job is None:
+                    job = models.Job(kind=kind, key=key, createdAt=now)
+                    db.add(job)
+                    if key is not None:
+                        existing[key] = job
+                elif job.status in (QUEUED, RUNNING):
+                    job.priority = min(job.priority, priority)
+                    job.updatedAt = now
+                    continue
+                job.payload = payload
+                job.status = QUEUED
+                job.priority = priority
+                job.attempts = 0
+                job.runAt = now
+                job.lockedAt = None
+                job.lastError = None
+                job.updatedAt = now
+            db.commit()
+        except IntegrityError:
+            # Another process queued the same key at the same time
+            db.rollback()
+        finally:
+            db.close()
+        return True
+
+    async def run_once(self) -> bool:
+        """
+        Claims the next due jobs and runs them.
+
+        Returns:
+            bool: False if no job was due.
+        """
+        claimed = await run_in_threadpool(self._claim)
+        if claimed is None:
+            return False
+
+        kind, jobs = claimed
+        handler, _ = self._handlers[kind]
+        db = self._session()
+        try:
+            await handler(db, [job.payload for job in jobs])
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"Job {kind} {[job.id for job in jobs]} failed: {error}")
+        finally:
+            db.close()
+
+        await run_in_threadpool(self._finish, [job.id for job in jobs], error)
+        return True
+
+    def start(self):
+        if self.workers > 0 and not self._tasks:
+            self._wakeup = asyncio.Event()
+            self._tasks = [asyncio.create_task(self._work())
+                           for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def retry(self, job_id: int) -> Optional[models.Job]:
+        """
+        Queues a dead or finished job again, with its attempts reset.
+        """
+        db = self._session()
+        try:
+            job = db.query(models.Job).filter(models.Job.id == job_id).first()
+            if job is None or job.status in (QUEUED, RUNNING):
+                return job
+            job.status, job.attempts, job.runAt = QUEUED, 0, time.time()
+            job.lockedAt = job.lastError = None
+            db.commit()
+            db.refresh(job)
+            if self._wakeup is not None:
+                self._wakeup.set()
+            return job
+        finally:
+            db.close()
+
+    def jobs(self, db: Session, status: Optional[str] = None, kind: Optional[str] = None,
+             limit: int = 100) -> List[models.Job]:
+        query = db.query(models.Job)
+        if status is not None:
+            query = query.filter(models.Job.status == status)
+        if kind is not None:
+            query = query.filter(models.Job.kind == kind)
+        return query.order_by(models.Job.updatedAt.desc()).limit(limit).all()
+
+    def stats(self, kind: Optional[str] = None) -> dict:
+        """
+        Returns the jobs per status in the table, and the jobs this process ran, retried and
+        gave up on.
+        """
+        db = self._session()
+        try:
+            query = db.query(models.Job.status, func.count(models.Job.id))
+            if kind is not None:
+                query = query.filter(models.Job.kind == kind)
+            counts = dict(query.group_by(models.Job.status).all())
+        finally:
+            db.close()
+        return {"jobs": {status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, DEAD)},
+                "process": {**self._stats, "workers": len(self._tasks)}}
+
+    async def _work(self):
+        while True:
+            try:
+                if await self.run_once():
+                    continue
+            except Exception as e:
+                print(f"Job worker error: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _claim(self) -> Optional[Tuple[str, List[models.Job]]]:
+        db = self._session()
+        try:
+            now = time.time()
+            claimable = [models.Job.kind.in_(list(self._handlers)), models.Job.runAt <= now, or_(
+                models.Job.status == QUEUED,
+                (models.Job.status == RUNNING) & (models.Job.lockedAt < now - self.lease))]
+            order = (models.Job.priority, models.Job.runAt, models.Job.id)
+
+            first = db.query(models.Job).filter(*claimable).order_by(*order).first()
+            if first is None:
+                return None
+            _, batch_size = self._handlers[first.kind]
+            candidates = db.query(models.Job).filter(
+                *claimable, models.Job.kind == first.kind).order_by(*order).limit(batch_size).all()
+
+            claimed = []
+            for job in candidates:
+                # Claim each job only if no other worker took it since it was read
+                updated = db.query(models.Job).filter(
+                    models.Job.id == job.id, models.Job.status == job.status,
+                    models.Job.attempts == job.attempts,
+                ).update({"status": RUNNING, "lockedAt": now, "attempts": job.attempts + 1,
+                          "updatedAt": now}, synchronize_session=False)
+                if updated:
+                    claimed.append(job)
+            db.commit()
+            for job in claimed:
+                db.refresh(job)
+                db.expunge(job)
+            return (first.kind, claimed) if claimed else None
+        finally:
+            db.close()
+
+    def _finish(self, job_ids: List[int], error: Optional[str]):
+        db = self._session()
+        try:
+            now = time.time()
+            for job in db.query(models.Job).filter(models.Job.id.in_(job_ids)).all():
+                job.updatedAt = now
+                job.lockedAt = None
+                if error is None:
+                    job.status = DONE
+                    self._stats["succeeded"] += 1
+                elif job.attempts >= self.max_attempts:
+                    job.status, job.lastError = DEAD, error
+                    self._stats["dead"] += 1
+                else:
+                    delay = min(self.backoff * 2 ** (job.attempts - 1), self.max_backoff)
+                    job.status, job.lastError, job.runAt = QUEUED, error, now + delay
+                    self._stats["retried"] += 1
+            db.commit()
+        finally:
+            db.close()
+
+    def _session(self) -> Session:
+        if self._session_factory is None:
+            self._session_factory, _ = get_db_session()
+        return self._session_factory()
+
+
+job_queue = JobQueue(
+    workers=int(os.getenv("SPELLTRAIN2_JOB_WORKERS", "2")),
+    max_attempts=int(os.getenv("SPELLTRAIN2_JOB_MAX_ATTEMPTS", "5")),
+    backoff=float(os.getenv("SPELLTRAIN2_JOB_BACKOFF", "5")),
+    max_backoff=float(os.getenv("SPELLTRAIN2_JOB_MAX_BACKOFF", "300")),
+    lease=float(os.getenv("SPELLTRAIN2_JOB_LEASE", "300")),
+    poll_interval=float(os.getenv("SPELLTRAIN2_JOB_POLL_INTERVAL", "1")),
+)
+
+
+async def run_workers(workers: int):
+    job_queue.workers = workers
+    job_queue.start()
+    await asyncio.gather(*job_queue._tasks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs background job workers.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    worker = subcommands.add_parser("worker", help="run job workers until stopped")
+    worker.add_argument("--workers", type=int, default=job_queue.workers or 2)
+    args = parser.parse_args()
+
+    # Importing the app creates the tables and registers every job handler with the queue
+    # of the api.utils.jobs module, which is not this __main__ module
+    from api import main  # noqa: F401
+    from api.utils import jobs
+    asyncio.run(jobs.run_workers(args.workers))
@@ -0,0 +1,223 @@
+"""
+Local English word index used to pre-check words before they are sent to the AI.
+
+The bundled index (api/data/english_words.txt) is a small list of common words. Build a
+complete one from any word list with one word per line, e.g. SCOWL or /usr/share/dict/words:
+
+    python -m api.utils.lexicon build /usr/share/dict/words
+"""
+import argparse
+import os
+import re
+import threading
+import time
+from array import array
+from typing import Iterable, Optional
+from api.utils.ai_cache import normalize
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(
+    os.path.dirname(__file__)), "data", "english_words.txt")
+
+# Letters, accented ones included ("café"), optionally joined by an apostrophe, hyphen or
+# space ("o'clock", "ice cream")
+_LETTERS = r"[^\W\d_]"
+_WORD_SHAPE = re.compile(rf"{_LETTERS}+(?:['\- ]{_LETTERS}+)*")
+_TRIPLE_LETTER = re.compile(rf"({_LETTERS})\1\1")
+# Inflections stripped to find the dictionary form, as (suffix, replacement)
+_SUFFIXES = (("ies", "y"), ("ied", "y"), ("es", ""), ("s", ""), ("ed", ""), ("ed", "e"),
+             ("ing", ""), ("ing", "e"), ("ly", ""), ("er", ""), ("est", ""))
+
+
+class WordIndex:
+    """
+    A sorted set of lowercase words kept in one bytes blob with an array of start offsets,
+    about 10 bytes per word, searched by bisection.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        self._blob = bytearray()
+        self._offsets = array("I")
+        for word in sorted(set(words)):
+            self._offsets.append(len(self._blob))
+            self._blob += word.encode()
+        self._offsets.append(len(self._blob))
+        self._blob = bytes(self._blob)
+
+    @classmethod
+    def load(cls, path: str) -> "WordIndex":
+        with open(path, encoding="utf-8") as file:
+            return cls(line.strip() for line in file if line.strip() and not line.startswith("#"))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._word(index).decode()
+
+    def __contains__(self, word: str) -> bool:
+        target = word.encode()
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self._word(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        return low < len(self) and self._word(low) == target
+
+    def _word(self, index: int) -> bytes:
+        return self._blob[self._offsets[index]:self._offsets[index + 1]]
+
+
+class LexicalFilter:
+    """
+    Pre-checks a word locally before an AI call validates it against a topic.
+
+    A word is rejected when it is empty, longer than `max_length`, contains anything other
+    than letters (digits, symbols), or repeats a letter three times in a row. Words without a
+    vowel ("cwm", "hmm") are real words and go on to the AI.
+    Words that pass go on to the AI, unless a policy decides them locally:
+    - `accept_known`: words in the index (or an inflection of one) are accepted without
+      checking that they match the topic.
+    - `reject_unknown`: words missing from the index are rejected. Only sensible with a
+      complete index, as spelling bee words are often rare.
+
+    The index is loaded once, on first use or at startup with `load`.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, max_length: int = 45,
+                 accept_known: bool = False, reject_unknown: bool = False):
+        self.path = path
+        self.max_length = max_length
+        self.accept_known = accept_known
+        self.reject_unknown = reject_unknown
+        self._index: Optional[WordIndex] = None
+        self._lock = threading.Lock()
+        self._stats = {"checks": 0, "accepted": 0, "passed": 0,
+                       "rejected": {}, "totalLatency": 0.0}
+
+    def load(self) -> WordIndex:
+        with self._lock:
+            if self._index is None:
+                try:
+                    self._index = WordIndex.load(self.path)
+                except OSError as e:
+                    print(f"Word index not loaded: {e}")
+                    self._index = WordIndex([])
+            return self._index
+
+    def check(self, word: str) -> Optional[bool]:
+        """
+        Returns:
+            Optional[bool]: True to accept the word, False to reject it, None to let the AI decide.
+        """
+        start = time.perf_counter()
+        verdict, reason = self._check(normalize(word))
+        latency = time.perf_counter() - start
+
+        with self._lock:
+            self._stats["checks"] += 1
+            self._stats["totalLatency"] += latency
+            if verdict is None:
+                self._stats["passed"] += 1
+            elif verdict:
+                self._stats["accepted"] += 1
+            else:
+                self._stats["rejected"][reason] = self._stats["rejected"].get(
+                    reason, 0) + 1
+        return verdict
+
+    def is_known(self, word: str) -> bool:
+        index = self._index or self.load()
+        return all(any(candidate in index for candidate in _candidates(part))
+                   for part in re.split(r"['\- ]", normalize(word)))
+
+    def stats(self) -> dict:
+        """
+        Returns the words checked, accepted, rejected per reason and passed on to the AI, the
+        share of AI calls saved and the average check latency.
+        """
+        with self._lock:
+            checks = self._stats["checks"]
+            rejected = sum(self._stats["rejected"].values())
+            return {
+                "indexWords": len(self._index) if self._index is not None else None,
+                "checks": checks,
+                "accepted": self._stats["accepted"],
+                "rejected": dict(self._stats["rejected"]),
+                "passed": self._stats["passed"],
+                "aiCallsSavedRate": (rejected + self._stats["accepted"]) / checks if checks else 0.0,
+                "averageLatencyMicroseconds": self._stats["totalLatency"] / checks * 1e6 if checks else 0.0,
+            }
+
+    def _check(self, text: str):
+        if not text:
+            return False, "empty"
+        if len(text) > self.max_length:
+            return False, "tooLong"
+        if not _WORD_SHAPE.fullmatch(text):
+            return False, "notLetters"
+        if _TRIPLE_LETTER.search(text):
+            return False, "repeatedLetters"
+
+        if self.accept_known or self.reject_unknown:
+            known = self.is_known(text)
+            if known and self.accept_known:
+                return True, None
+            if not known and self.reject_unknown:
+                return False, "unknown"
+        return None, None
+
+
+def _candidates(word: str) -> Iterable[str]:
+    yield word
+    for suffix, replacement in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            stem = word[:-len(suffix)]
+            yield stem + replacement
+            # e.g. "running" -> "run", "stopped" -> "stop"
+            if len(stem) >= 3 and stem[-1] == stem[-2] and not replacement:
+                yield stem[:-1]
+
+
+def build_index(source: str, output: str = DEFAULT_INDEX_PATH, min_length: int = 2) -> int:
+    """
+    Writes the lowercase, letters-only words of a word list to an index file.
+
+    Returns:
+        int: The number of words written.
+    """
+    words = set()
+    with open(source, encoding="utf-8", errors="ignore") as file:
+        for line in file:
+            word = line.strip()
+            # Proper nouns and abbreviations are not spelling words
+            if word.islower() and word.isalpha() and word.isascii() and len(word) >= min_length:
+                words.add(word)
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        file.write("\n".join(sorted(words)) + "\n")
+    return len(words)
+
+
+lexical_filter = LexicalFilter(
+    path=os.getenv("SPELLTRAIN2_LEXICON_PATH", DEFAULT_INDEX_PATH),
+    max_length=int(os.getenv("SPELLTRAIN2_LEXICON_MAX_LENGTH", "45")),
+    accept_known=os.getenv("SPELLTRAIN2_LEXICON_ACCEPT_KNOWN", "False") == "True",
+    reject_unknown=os.getenv("SPELLTRAIN2_LEXICON_REJECT_UNKNOWN", "False") == "True",
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds the English word index.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build", help="build the index from a word list")
+    build.add_argument("source", help="word list with one word per line")
+    build.add_argument("--output", default=DEFAULT_INDEX_PATH)
+    build.add_argument("--min-length", type=int, default=2)
+    args = parser.parse_args()
+
+    count = build_index(args.source, args.output, args.min_length)
+    print(f"Wrote {count} words to {args.output}.")
@@ -0,0 +1,245 @@
+"""
+Offline IPA pronunciations read from a compact index built from a CMUdict-style dictionary.
+
+The bundled index (api/data/pronunciations.idx) is built from a small sample
+(api/data/cmudict_sample.dict). Build a complete one from the CMU Pronouncing Dictionary:
+
+    python -m api.utils.pronunciation build cmudict-0.7b
+"""
+import argparse
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from typing import Dict, List, Optional
+from api.utils.ai_cache import normalize
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+DEFAULT_SOURCE_PATH = os.path.join(_DATA_DIR, "cmudict_sample.dict")
+DEFAULT_INDEX_PATH = os.path.join(_DATA_DIR, "pronunciations.idx")
+
+# File layout: magic, record count, count + 1 record offsets, then "word\0ipa" records sorted by word
+_MAGIC = b"STPRON1\0"
+_HEADER = struct.Struct("<8sI")
+_OFFSET = struct.Struct("<I")
+
+# "WORD(2)" marks an alternate pronunciation of WORD
+_ALTERNATE = re.compile(r"\(\d+\)$")
+
+_ARPABET_VOWELS = {
+    "AA": "ɑ", "AE": "æ", "AH": "ʌ", "AO": "ɔ", "AW": "aʊ", "AY": "aɪ", "EH": "ɛ", "ER": "ɝ",
+    "EY": "eɪ", "IH": "ɪ", "IY": "i", "OW": "oʊ", "OY": "ɔɪ", "UH": "ʊ", "UW": "u",
+}
+# Unstressed forms that differ from the stressed ones
+_ARPABET_REDUCED = {"AH": "ə", "ER": "ɚ"}
+_ARPABET_CONSONANTS = {
+    "B": "b", "CH": "tʃ", "D": "d", "DH": "ð", "F": "f", "G": "ɡ", "HH": "h", "JH": "dʒ",
+    "K": "k", "L": "l", "M": "m", "N": "n", "NG": "ŋ", "P": "p", "R": "ɹ", "S": "s",
+    "SH": "ʃ", "T": "t", "TH": "θ", "V": "v", "W": "w", "Y": "j", "Z": "z", "ZH": "ʒ",
+}
+_STRESS_MARKS = {"1": "ˈ", "2": "ˌ"}
+# Consonant pairs that can start an English syllable, e.g. "tr" in "astronaut"
+_ONSETS = {"pl", "bl", "kl", "ɡl", "fl", "sl", "pɹ", "bɹ", "tɹ", "dɹ", "kɹ", "ɡɹ", "fɹ", "θɹ",
+           "ʃɹ", "kw", "tw", "dw", "sw", "ɡw", "sp", "st", "sk", "sm", "sn", "pj", "bj", "kj",
+           "ɡj", "fj", "vj", "mj", "nj", "hj"}
+
+
+def arpabet_to_ipa(phones: List[str]) -> str:
+    """
+    Converts ARPAbet phones, e.g. ["G", "AE1", "L", "AH0", "K", "S", "IY0"], to IPA ("/ˈɡæləksi/").
+
+    Stress marks go before the consonants that start the stressed syllable.
+
+    Raises:
+        ValueError: If a phone is not ARPAbet.
+    """
+    symbols: List[str] = []
+    consonants = 0
+    for phone in phones:
+        base, stress = phone.rstrip("012"), phone[len(phone.rstrip("012")):]
+        if base in _ARPABET_VOWELS:
+            if stress in _STRESS_MARKS:
+                onset = consonants
+                if onset < len(symbols):
+                    # Leave the rest of the consonants to the syllable before
+                    onset = min(onset, 2 if "".join(symbols[-2:]) in _ONSETS else 1)
+                symbols.insert(len(symbols) - onset, _STRESS_MARKS[stress])
+            symbols.append(_ARPABET_REDUCED.get(base, _ARPABET_VOWELS[base]) if stress == "0"
+                           else _ARPABET_VOWELS[base])
+            consonants = 0
+        elif base in _ARPABET_CONSONANTS:
+            symbols.append(_ARPABET_CONSONANTS[base])
+            consonants += 1
+        else:
+            raise ValueError(f"Unknown ARPAbet phone: {phone}")
+    return "/" + "".join(symbols) + "/"
+
+
+class PronunciationIndex:
+    """
+    A read-only view of an index file through mmap, searched by bisection.
+
+    Nothing is copied into the process: every worker that opens the same file shares the
+    operating system's page cache.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a pronunciation index")
+        self._records = _HEADER.size + (self._count + 1) * _OFFSET.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get(self, word: str) -> Optional[str]:
+        target = word.encode()
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            start, end = self._record(middle)
+            key_end = self._map.find(b"\0", start, end)
+            key = self._map[start:key_end]
+            if key < target:
+                low = middle + 1
+            elif key > target:
+                high = middle
+            else:
+                return self._map[key_end + 1:end].decode()
+        return None
+
+    def close(self):
+        self._map.close()
+
+    def _record(self, index: int):
+        position = _HEADER.size + index * _OFFSET.size
+        start = _OFFSET.unpack_from(self._map, position)[0]
+        end = _OFFSET.unpack_from(self._map, position + _OFFSET.size)[0]
+        return self._records + start, self._records + end
+
+
+class PronunciationResolver:
+    """
+    Looks up the IPA pronunciation of a word, or of each word of a phrase, in the index.
+
+    The index is opened once, on first use or at startup with `load`. A missing index file
+    disables the lookups: every word is then left to the AI.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._index: Optional[PronunciationIndex] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "totalLatency": 0.0}
+
+    def load(self) -> Optional[PronunciationIndex]:
+        with self._lock:
+            if not self._loaded:
+                try:
+                    self._index = PronunciationIndex(self.path)
+                except (OSError, ValueError) as e:
+                    print(f"Pronunciation index not loaded: {e}")
+                self._loaded = True
+            return self._index
+
+    def lookup(self, word: str) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: The IPA pronunciation, or None if a word is not in the index.
+        """
+        start = time.perf_counter()
+        pronunciation = self._lookup(normalize(word))
+        latency = time.perf_counter() - start
+
+        with self._lock:
+            self._stats["lookups"] += 1
+            self._stats["hits"] += pronunciation is not None
+            self._stats["totalLatency"] += latency
+        return pronunciation
+
+    def stats(self) -> dict:
+        """
+        Returns the index size, the lookups made, how many were answered locally (AI calls
+        saved) and the average lookup latency.
+        """
+        with self._lock:
+            lookups = self._stats["lookups"]
+            return {
+                "indexWords": len(self._index) if self._index is not None else None,
+                "lookups": lookups,
+                "hits": self._stats["hits"],
+                "misses": lookups - self._stats["hits"],
+                "hitRate": self._stats["hits"] / lookups if lookups else 0.0,
+                "averageLatencyMicroseconds": self._stats["totalLatency"] / lookups * 1e6 if lookups else 0.0,
+            }
+
+    def _lookup(self, text: str) -> Optional[str]:
+        index = self._index if self._loaded else self.load()
+        if index is None or not text:
+            return None
+
+        pronunciations = []
+        for part in re.split(r"[\- ]", text):
+            pronunciation = index.get(part)
+            if pronunciation is None:
+                return None
+            pronunciations.append(pronunciation.strip("/"))
+        return "/" + " ".join(pronunciations) + "/"
+
+
+def build_index(source: str, output: str = DEFAULT_INDEX_PATH) -> int:
+    """
+    Converts a CMUdict-style dictionary ("WORD  W ER1 D" per line, ";;;" comments) to IPA and
+    writes it to an index file. Only the first pronunciation of each word is kept.
+
+    Returns:
+        int: The number of words written.
+    """
+    pronunciations: Dict[str, str] = {}
+    with open(source, encoding="latin-1") as file:
+        for line in file:
+            if not line.strip() or line.startswith(";;;"):
+                continue
+            word, *phones = line.split()
+            if _ALTERNATE.search(word) or not phones:
+                continue
+            try:
+                pronunciations.setdefault(word.lower(), arpabet_to_ipa(phones))
+            except ValueError as e:
+                print(f"Skipped {word}: {e}")
+
+    records = [f"{word}\0{ipa}".encode() for word, ipa in sorted(
+        pronunciations.items(), key=lambda item: item[0].encode())]
+    offsets = [0]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "wb") as file:
+        file.write(_HEADER.pack(_MAGIC, len(records)))
+        file.write(b"".join(_OFFSET.pack(offset) for offset in offsets))
+        file.write(b"".join(records))
+    return len(records)
+
+
+pronunciation_resolver = PronunciationResolver(
+    path=os.getenv("SPELLTRAIN2_PRONUNCIATIONS_PATH", DEFAULT_INDEX_PATH),
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds the pronunciation index.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build", help="build the index from a CMUdict-style file")
+    build.add_argument("source", nargs="?", default=DEFAULT_SOURCE_PATH)
+    build.add_argument("--output", default=DEFAULT_INDEX_PATH)
+    args = parser.parse_args()
+
+    count = build_index(args.source, args.output)
+    print(f"Wrote {count} pronunciations to {args.output}.")
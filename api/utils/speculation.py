@@ -0,0 +1,101 @@
+import asyncio
+import os
+import threading
+from typing import Awaitable, Dict, Optional
+
+
+class Speculation:
+    """
+    A call started before it is known to be needed. It is either used, by awaiting `result`,
+    or discarded with the reason it was not needed.
+    """
+
+    def __init__(self, speculator: "Speculator", task_name: str, task: asyncio.Task):
+        self._speculator = speculator
+        self._task_name = task_name
+        self._task = task
+        self._settled = False
+        task.add_done_callback(_retrieve_error)
+
+    async def result(self):
+        if not self._settled:
+            self._settled = True
+            self._speculator._count(self._task_name, "used")
+        return await self._task
+
+    def discard(self, reason: str):
+        """
+        Cancels the call if it is still running. Does nothing once the call was used or
+        discarded.
+        """
+        if self._settled:
+            return
+        self._settled = True
+        # A call that finished was paid for in full
+        self._speculator._count_wasted(self._task_name, reason, self._task.done())
+        self._task.cancel()
+
+
+class Speculator:
+    """
+    Starts calls speculatively, alongside the checks that decide whether they are needed, and
+    counts per task how many were used and how many were wasted, and why.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats: Dict[str, dict] = {}
+
+    def start(self, task_name: str, call: Awaitable) -> Optional[Speculation]:
+        """
+        Returns:
+            Optional[Speculation]: The started call, or None (the call is not made) when
+                speculation is disabled.
+        """
+        if not self.enabled:
+            call.close()
+            return None
+        self._count(task_name, "started")
+        return Speculation(self, task_name, asyncio.ensure_future(call))
+
+    def stats(self) -> dict:
+        """
+        Returns per task the calls started speculatively, used and wasted per reason, the share
+        wasted, and how many of the wasted calls had already finished (paid for in full).
+        """
+        with self._lock:
+            stats = {}
+            for task_name, counters in self._stats.items():
+                wasted = sum(counters["wasted"].values())
+                stats[task_name] = {
+                    **counters,
+                    "wasted": dict(counters["wasted"]),
+                    "wastedRate": wasted / counters["started"] if counters["started"] else 0.0,
+                }
+            return stats
+
+    def _counters(self, task_name: str) -> dict:
+        return self._stats.setdefault(
+            task_name, {"started": 0, "used": 0, "wasted": {}, "wastedCompleted": 0})
+
+    def _count(self, task_name: str, counter: str):
+        with self._lock:
+            self._counters(task_name)[counter] += 1
+
+    def _count_wasted(self, task_name: str, reason: str, completed: bool):
+        with self._lock:
+            counters = self._counters(task_name)
+            counters["wasted"][reason] = counters["wasted"].get(reason, 0) + 1
+            counters["wastedCompleted"] += completed
+
+
+def _retrieve_error(task: asyncio.Task):
+    # Discarded calls never have their error read
+    if not task.cancelled():
+        task.exception()
+
+
+speculator = Speculator(
+    enabled=os.getenv("SPELLTRAIN2_SPECULATIVE_WORD_LISTS", "False") == "True",
+)
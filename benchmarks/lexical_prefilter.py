@@ -0,0 +1,56 @@
+"""
+Measures how many word validation calls the local lexical pre-check saves, and how long a
+check takes, on a mix of real spelling words and typical garbage input.
+
+Runs offline. From the backend directory run:
+
+    python -m benchmarks.lexical_prefilter
+"""
+import random
+import statistics
+import string
+import time
+from api.utils.lexicon import LexicalFilter
+
+SAMPLES = 20000
+GARBAGE_SHARE = 0.3  # share of inputs that are not words
+
+
+def _garbage(rng: random.Random) -> str:
+    kind = rng.randrange(4)
+    if kind == 0:
+        return str(rng.randrange(10 ** 6))
+    if kind == 1:
+        return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randrange(41, 60)))
+    if kind == 2:
+        return "".join(rng.choice("bcdfghjklmnpqrstvwxz") for _ in range(rng.randrange(3, 9)))
+    return "".join(rng.choice(string.ascii_lowercase + string.digits + "!?#") for _ in range(rng.randrange(3, 9)))
+
+
+def main():
+    rng = random.Random(0)
+    lexical_filter = LexicalFilter()
+    words = list(lexical_filter.load())
+
+    inputs = [_garbage(rng) if rng.random() < GARBAGE_SHARE else rng.choice(words)
+              for _ in range(SAMPLES)]
+
+    for policy in ("shape only", "accept known words"):
+        lexical_filter = LexicalFilter(accept_known=policy == "accept known words")
+        lexical_filter.load()
+        latencies = []
+        for word in inputs:
+            start = time.perf_counter()
+            lexical_filter.check(word)
+            latencies.append(time.perf_counter() - start)
+
+        stats = lexical_filter.stats()
+        latencies.sort()
+        print(f"{policy}: {stats['aiCallsSavedRate']:.0%} of {SAMPLES} AI calls saved "
+              f"({sum(stats['rejected'].values())} rejected, {stats['accepted']} accepted), "
+              f"p50 {statistics.median(latencies) * 1e6:.1f}us, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compares the prompt size of asking for more words as a word list grows, when every existing
+word is sent to the model versus the capped sample sent now, and times the local removal of
+repeated words. Tokens are estimated offline.
+
+From the backend directory run:
+
+    python -m benchmarks.more_words_prompt
+"""
+import random
+import time
+from api.utils.ai_usage import estimate_tokens
+from api.utils.lexicon import LexicalFilter
+from api.utils.SpellTrainII_AI import SpellTrain2AI
+
+LIST_SIZES = (30, 60, 120, 240, 480, 960)
+
+
+def _prompt_tokens(messages) -> int:
+    return sum(estimate_tokens(message["content"]) for message in messages)
+
+
+def _unbounded_messages(ai: SpellTrain2AI, topic: str, existing_words: list) -> list:
+    # Every existing word, as the prompt used to send them
+    messages = ai._word_list_messages(topic)
+    messages.append(
+        {'role': 'system', 'content': f'Do not repeat any words from the following list: {existing_words}'})
+    return messages
+
+
+def main():
+    rng = random.Random(0)
+    ai = SpellTrain2AI()
+    vocabulary = list(LexicalFilter().load())
+    rng.shuffle(vocabulary)
+
+    print("words  all words (tokens)  capped sample (tokens)  local dedupe (ms)")
+    for size in LIST_SIZES:
+        existing_words = vocabulary[:size]
+        # Half of the answer repeats existing words, some of them as plurals
+        answer = [rng.choice(existing_words) + rng.choice(["", "s"]) for _ in range(6)] + \
+            vocabulary[size:size + 6]
+
+        start = time.perf_counter()
+        new_words = ai._new_words(answer, ai._word_deduper(existing_words),
+                                  ai._word_list_limit(existing_words))
+        dedupe = time.perf_counter() - start
+
+        assert not set(new_words) & set(existing_words)
+        print(f"{size:5}  {_prompt_tokens(_unbounded_messages(ai, 'Animals', existing_words)):18}  "
+              f"{_prompt_tokens(ai._word_list_messages('Animals', existing_words)):22}  "
+              f"{dedupe * 1000:17.2f}")
+
+
+if __name__ == "__main__":
+    main()
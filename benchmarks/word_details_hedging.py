@@ -0,0 +1,93 @@
+"""
+Compares get_word_details latency in sequential, hedged and race mode.
+
+Providers are simulated with randomized latencies and failure rates, so the benchmark
+runs offline. From the backend directory run:
+
+    python -m benchmarks.word_details_hedging
+"""
+import asyncio
+import contextlib
+import io
+import random
+import statistics
+import time
+from api.utils.SpellTrainII_AI import AsyncSpellTrain2AI
+from api.schemas.schemas import WordInfo
+
+SAMPLES = 500
+# (median latency in seconds, probability of a partial answer) per simulated model
+PROVIDERS = {
+    "gemini-pro": (0.8, 0.35),
+    "gpt-3.5-turbo-1106": (1.2, 0.10),
+    "gpt-4-1106-preview": (2.5, 0.02),
+}
+FIELD_LATENCY = 0.6
+TIME_SCALE = 0.01  # run the simulation 100x faster than real time
+
+
+def _latency(median: float) -> float:
+    # Long-tailed latency: most calls are near the median, a few are much slower.
+    return random.lognormvariate(0, 0.6) * median * TIME_SCALE
+
+
+def _word_info(partial: bool) -> WordInfo:
+    return WordInfo(
+        definition="a definition",
+        rootOrigin="a root",
+        usage="Unknown" if partial else "a usage",
+        languageOrigin="Latin",
+        partsOfSpeech="noun",
+        alternatePronunciation="/ipa/",
+    )
+
+
+class SimulatedAI(AsyncSpellTrain2AI):
+    async def _simulate(self, model: str) -> WordInfo:
+        median, partial_rate = PROVIDERS[model]
+        await asyncio.sleep(_latency(median))
+        return _word_info(random.random() < partial_rate)
+
+    async def _get_word_details_from_GEMINI_AI(self, word, topic, default_model='gemini-pro'):
+        return await self._simulate(default_model)
+
+    async def _get_word_details_from_OPENAI(self, word, topic, model):
+        return await self._simulate(model)
+
+    async def _get_word_field(self, field, word, topic):
+        await asyncio.sleep(_latency(FIELD_LATENCY))
+        return "refetched"
+
+
+async def _measure(mode: str, hedge_delay: float) -> list:
+    ai = SimulatedAI()
+    ai.word_info_cache = None
+    ai.provider_health = None
+    ai.hedge_delay = hedge_delay * TIME_SCALE
+    latencies = []
+    for _ in range(SAMPLES):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await ai.get_word_details("photosynthesis", "Science", mode=mode)
+        latencies.append((time.perf_counter() - start) / TIME_SCALE)
+    return latencies
+
+
+def _report(label: str, latencies: list):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<24} p50 {p50:6.2f}s   p99 {p99:6.2f}s   max {latencies[-1]:6.2f}s")
+
+
+async def main():
+    random.seed(42)
+    print(f"{SAMPLES} simulated get_word_details calls per mode\n")
+    _report("sequential", await _measure("sequential", 0))
+    for delay in (2.0, 1.0):
+        _report(f"hedged (delay {delay}s)", await _measure("hedged", delay))
+    _report("race", await _measure("race", 0))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""
+Compares how long _refetch_word_details takes to fill in unknown fields when they are
+requested one after another, concurrently, or in one combined request.
+
+The OpenAI calls are simulated with randomized latencies, so the benchmark runs offline.
+From the backend directory run:
+
+    python -m benchmarks.word_fields_refetch
+"""
+import asyncio
+import contextlib
+import io
+import random
+import statistics
+import time
+from api.utils.SpellTrainII_AI import AsyncSpellTrain2AI
+from api.schemas.schemas import WordInfo
+
+SAMPLES = 200
+FIELD_LATENCY = 0.6  # median seconds of a single-field request
+COMBINED_LATENCY = 0.9  # median seconds of a combined request, which has a longer answer
+TIME_SCALE = 0.01  # run the simulation 100x faster than real time
+FIELDS = list(AsyncSpellTrain2AI._WORD_FIELD_PROMPTS)
+
+
+def _latency(median: float) -> float:
+    return random.lognormvariate(0, 0.6) * median * TIME_SCALE
+
+
+class SimulatedAI(AsyncSpellTrain2AI):
+    async def _get_word_field(self, field, word, topic):
+        await asyncio.sleep(_latency(FIELD_LATENCY))
+        return "refetched"
+
+    async def _get_combined_word_fields(self, fields, word, topic):
+        await asyncio.sleep(_latency(COMBINED_LATENCY))
+        return {field: "refetched" for field in fields}
+
+
+def _partial_word_info(unknown_fields: int) -> WordInfo:
+    word_info = WordInfo(definition="a definition", rootOrigin="a root", usage="a usage",
+                         languageOrigin="Latin", partsOfSpeech="noun", alternatePronunciation="/ipa/")
+    for field in FIELDS[:unknown_fields]:
+        setattr(word_info, field, "Unknown")
+    return word_info
+
+
+async def _measure(mode: str, concurrency: int, unknown_fields: int) -> float:
+    ai = SimulatedAI()
+    ai.word_fields_mode = mode
+    ai.word_fields_concurrency = concurrency
+    latencies = []
+    for _ in range(SAMPLES):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await ai._refetch_word_details("photosynthesis", _partial_word_info(unknown_fields), "Science")
+        latencies.append((time.perf_counter() - start) / TIME_SCALE)
+    return statistics.median(latencies)
+
+
+async def main():
+    random.seed(42)
+    modes = [
+        ("serial", "separate", 1),
+        ("concurrent (3)", "separate", 3),
+        ("concurrent (6)", "separate", 6),
+        ("combined", "combined", 1),
+    ]
+    print(f"Median _refetch_word_details time over {SAMPLES} simulated words\n")
+    print(f"{'unknown fields':<16}" + "".join(f"{label:>16}" for label, _, _ in modes))
+    for unknown_fields in range(1, len(FIELDS) + 1):
+        medians = [await _measure(mode, concurrency, unknown_fields) for _, mode, concurrency in modes]
+        print(f"{unknown_fields:<16}" + "".join(f"{median:>15.2f}s" for median in medians))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())